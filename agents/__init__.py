@@ -12,6 +12,8 @@ from typing import Dict, Any, Optional
 from pathlib import Path
 import logging
 
+from utils.metrics import get_metrics, payload_size
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -35,6 +37,7 @@ class BaseAgent(ABC):
             retry_delay: Delay between retries in seconds
         """
         self.name = name
+        self.provider = None  # Set by subclasses that call an external API
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.logger = logging.getLogger(f"agents.{name}")
@@ -56,6 +59,9 @@ class BaseAgent(ABC):
         """
         Execute agent with retry logic and error handling.
         
+        Every execution (success or final failure) is recorded in the
+        metrics registry with its duration, attempts and payload sizes.
+        
         Args:
             input_data: Input data dictionary
             
@@ -66,6 +72,10 @@ class BaseAgent(ABC):
             Exception: If all retries fail
         """
         last_error = None
+        metrics = get_metrics()
+        started = time.time()
+        bytes_in = payload_size(input_data)
+        project_id = input_data.get("project_id") if isinstance(input_data, dict) else None
         
         for attempt in range(1, self.max_retries + 1):
             try:
@@ -77,6 +87,12 @@ class BaseAgent(ABC):
                 execution_time = time.time() - start_time
                 self.logger.info(f"Agent {self.name} - Completed in {execution_time:.2f}s")
                 
+                metrics.record(
+                    self.name, time.time() - started, provider=self.provider,
+                    operation="execute", attempts=attempt, bytes_in=bytes_in,
+                    bytes_out=payload_size(result), project_id=project_id
+                )
+                
                 return {
                     "success": True,
                     "output": result,
@@ -96,6 +112,11 @@ class BaseAgent(ABC):
                     self.logger.error(f"Agent {self.name} - All {self.max_retries} attempts failed")
         
         # All retries failed
+        metrics.record(
+            self.name, time.time() - started, provider=self.provider,
+            operation="execute", status="error", attempts=self.max_retries,
+            bytes_in=bytes_in, project_id=project_id
+        )
         raise Exception(
             f"Agent {self.name} failed after {self.max_retries} attempts. "
             f"Last error: {str(last_error)}"
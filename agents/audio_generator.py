@@ -6,6 +6,13 @@ from gtts import gTTS
 import streamlit as st
 import time
 
+from utils.asset_cache import AssetCache
+from utils.asset_store import atomic_output
+from utils.metrics import track
+
+# Tope del caché de narraciones (LRU)
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_MB", "200")) * 1024 * 1024
+
 class AudioGeneratorAgent:
     """
     Genera audio GRATIS con Google Text-to-Speech (gTTS).
@@ -18,21 +25,29 @@ class AudioGeneratorAgent:
         """
         self.lang = "es"  # Español
         self.tld = "com.mx"  # Acento mexicano
+        self.slow = False
         self.max_retries = 3
         self.retry_delay = 2
         self.default_voice = "es-MX (gTTS)"  # Para compatibilidad con app.py
         
+        # Caché por contenido: mismo (texto, idioma, acento, velocidad) = mismo MP3
+        self.cache = AssetCache("tts", TTS_CACHE_MAX_BYTES)
+        
     def is_ready(self):
         """Siempre listo, no requiere API Key."""
         return True
     
-    def generate_narration(self, text: str, filename: str) -> str:
+    def generate_narration(self, text: str, filename: str, store=None) -> str:
         """
         Genera archivo de audio .mp3 usando gTTS.
+        Si la narración ya se generó antes (mismo texto y voz) se copia
+        desde el caché sin llamar a gTTS.
         
         Args:
             text: Texto a narrar
             filename: Nombre de archivo (ej: scene_1.mp3)
+            store: ProjectAssetStore opcional; si se indica, el audio se
+                guarda en la carpeta del proyecto en lugar de assets/audio
             
         Returns:
             str: Path absoluto al archivo generado
@@ -42,42 +57,63 @@ class AudioGeneratorAgent:
             if filename.endswith(".wav"):
                 filename = filename.replace(".wav", ".mp3")
                 
-            output_dir = os.path.join("assets", "audio")
-            os.makedirs(output_dir, exist_ok=True)
-            output_path = os.path.join(output_dir, filename)
+            if store is not None:
+                output_path = store.path("audio", filename)
+            else:
+                output_dir = os.path.join("assets", "audio")
+                os.makedirs(output_dir, exist_ok=True)
+                output_path = os.path.join(output_dir, filename)
+            
+            cache_key = self.cache.key_for(text=text, lang=self.lang, tld=self.tld, slow=self.slow)
+            cached = self.cache.fetch(cache_key, ".mp3", output_path)
+            if cached:
+                print(f"[CACHE] Audio reutilizado: {text[:30]}...")
+                if store is not None:
+                    store.record("audio", filename, cache_key=cache_key)
+                return cached
             
             print(f"[*] Generando audio con gTTS: {text[:30]}...")
             
             # Generar con reintentos
-            for attempt in range(self.max_retries):
-                try:
-                    # Crear objeto gTTS
-                    tts = gTTS(
-                        text=text,
-                        lang=self.lang,
-                        tld=self.tld,
-                        slow=False
-                    )
+            with track("audio_generator", provider="gtts", operation="tts",
+                       bytes_in=len(text.encode("utf-8"))) as t:
+                for attempt in range(self.max_retries):
+                    t.attempts = attempt + 1
+                    try:
+                        # Crear objeto gTTS
+                        tts = gTTS(
+                            text=text,
+                            lang=self.lang,
+                            tld=self.tld,
+                            slow=self.slow
+                        )
                     
-                    # Guardar archivo
-                    tts.save(output_path)
+                        # Guardar archivo (temporal + rename, sin archivos a medias)
+                        with atomic_output(output_path) as tmp_path:
+                            tts.save(tmp_path)
                     
-                    # Validar
-                    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                        print(f"[SUCCESS] Audio generado en intento {attempt+1}")
-                        return output_path
-                    else:
-                        print(f"[FAIL] Archivo vacío en intento {attempt+1}")
+                        # Validar
+                        if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+                            print(f"[SUCCESS] Audio generado en intento {attempt+1}")
+                            t.bytes_out = os.path.getsize(output_path)
+                            self.cache.store(cache_key, output_path)
+                            if store is not None:
+                                store.record("audio", filename, cache_key=cache_key)
+                            return output_path
+                        else:
+                            print(f"[FAIL] Archivo vacío en intento {attempt+1}")
                         
-                except Exception as e:
-                    print(f"[ERROR] Intento {attempt+1} falló: {e}")
+                    except Exception as e:
+                        print(f"[ERROR] Intento {attempt+1} falló: {e}")
                     
-                    if attempt < self.max_retries - 1:
-                        if "streamlit" in str(type(st)):
-                            st.warning(f"⚠️ Reintentando audio (Intento {attempt+1}/{self.max_retries})...")
-                        time.sleep(self.retry_delay)
-                        continue
-                        
+                        if attempt < self.max_retries - 1:
+                            if "streamlit" in str(type(st)):
+                                st.warning(f"⚠️ Reintentando audio (Intento {attempt+1}/{self.max_retries})...")
+                            time.sleep(self.retry_delay)
+                            continue
+                
+                t.fail()
+            
             # Si llegamos aquí, todos los intentos fallaron
             st.error(f"❌ No se pudo generar audio para: {text[:30]}...")
             return None
@@ -26,6 +26,7 @@ class QualityInspectorAgent(BaseAgent):
             raise ValueError("GEMINI_API_KEY not configured")
         
         self.client = genai.Client(api_key=GEMINI_API_KEY)
+        self.provider = "gemini"
         self.model_name = GEMINI_VISION_MODEL or "gemini-2.0-flash"
     
     def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
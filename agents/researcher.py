@@ -1,20 +1,35 @@
-import streamlit as st
-import google.genai as genai
+import importlib.util
+import json
+
+from utils.gemini_client import DEFAULT_MODEL, GeminiMemo, get_gemini_client, get_memo
+from utils.http_cache import get_http_cache
+from utils.tracing import span, traced
+
+# lxml (si está instalado) parsea mucho más rápido que html.parser (Python puro)
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+# Subir al cambiar el prompt de extract_marketing_data (invalida el memo)
+EXTRACTION_VERSION = 1
 
 class ResearcherAgent:
     def __init__(self):
         """
         Agente encargado de investigar productos desde URLs.
         Extrae beneficios, ganchos (hooks) y características principales.
+
+        Las páginas se descargan con la sesión HTTP compartida y la caché de
+        GET condicional (utils.http_cache), y el JSON de marketing extraído se
+        memoiza por hash del contenido: re-analizar una página sin cambios no
+        repite ni la descarga completa ni la llamada a Gemini.
         """
-        self.api_key = st.secrets.get("GOOGLE_API_KEY")
-        self.client = None
-        if self.api_key:
-            self.client = genai.Client(api_key=self.api_key)
+        self.client = get_gemini_client()
+        self.model_name = DEFAULT_MODEL
+        self.http = get_http_cache()
 
     def is_ready(self):
         return self.client is not None
 
+    @traced("research.analyze_url")
     def analyze_url(self, url: str) -> dict:
         """
         Lee el contenido de una URL y extrae información de marketing usando Gemini.
@@ -24,19 +39,21 @@ class ResearcherAgent:
             return {"error": "Gemini not configured"}
 
         try:
-            import requests
             from bs4 import BeautifulSoup
-            import json
             
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-                "Accept-Language": "es-ES,es;q=0.9,en;q=0.8"
-            }
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status()
+            # Sesión keep-alive + caché condicional (ETag / Last-Modified)
+            with span("research.fetch") as s:
+                page = self.http.get(url)
+                s.set(source=page.source, bytes=len(page.text))
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Mismo contenido ya analizado: ni parseo ni Gemini
+            memo_key = GeminiMemo.key_for(self.model_name, page.digest, f"research.v{EXTRACTION_VERSION}")
+            cached = get_memo().get(memo_key)
+            if cached is not None:
+                return json.loads(cached)
+            
+            with span("research.parse", parser=HTML_PARSER):
+                soup = BeautifulSoup(page.text, HTML_PARSER)
             
             # 1. Búsqueda de DATOS ESTRUCTURADOS (TikTok / JSON-LD / Rehydration)
             extra_context = []
@@ -76,7 +93,12 @@ class ResearcherAgent:
             combined_content = "\n\n".join(context_pieces)
             
             # Limitar a los primeros 12000 caracteres (Gemini 2.0 tiene ventana grande)
-            return self.extract_marketing_data(combined_content[:12000])
+            data = self.extract_marketing_data(combined_content[:12000])
+            
+            # Solo se memoizan extracciones válidas (los errores se reintentan)
+            if isinstance(data, dict) and "error" not in data:
+                get_memo().put(memo_key, self.model_name, json.dumps(data, ensure_ascii=False))
+            return data
             
         except Exception as e:
             return {"error": str(e)}
@@ -108,10 +130,9 @@ RESPONDE ÚNICAMENTE EN FORMATO JSON:
 """
         try:
             response = self.client.models.generate_content(
-                model="gemini-2.0-flash",
+                model=self.model_name,
                 contents=prompt
             )
-            import json
             clean_json = response.text.replace("```json", "").replace("```", "").strip()
             data = json.loads(clean_json)
             
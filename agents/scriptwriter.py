@@ -5,11 +5,19 @@ import streamlit as st
 import os
 from typing import Dict, List, Optional
 
+from utils.gemini_client import get_gemini_client
+from utils.metrics import track
+from utils.tracing import traced
+
 # --- CONFIGURACIÓN DE SEGURIDAD ---
-if "GOOGLE_API_KEY" in st.secrets:
-    client = genai.Client(api_key=st.secrets["GOOGLE_API_KEY"])
-else:
-    client = None
+# Cliente compartido (None si no hay GOOGLE_API_KEY)
+client = get_gemini_client()
+
+# Fragmentos de transcripciones de competidores incluidos como referencia
+REFERENCE_SNIPPETS = 3
+# Rango bm25 mínimo de un fragmento (más negativo = más relevante): descarta
+# los que solo coinciden en palabras presentes en casi todas las transcripciones
+REFERENCE_MAX_RANK = -1.0
 
 class ScriptWriterAgent:
     def __init__(self, model_name: str = "gemini-2.0-flash"):
@@ -17,6 +25,7 @@ class ScriptWriterAgent:
         Inicializa el agente de guion con Gemini 2.0 Flash.
         """
         self.model_name = model_name
+        self.reference_snippets = REFERENCE_SNIPPETS
         
         # 🧠 CEREBRO DE VENTAS (Hooks de Fricción)
         self.hook_framework = """
@@ -36,6 +45,7 @@ class ScriptWriterAgent:
         - Adaptability: The visual style should match the topic (tech → modern/sleek, food → appetizing/warm, etc.)
         """
 
+    @traced("script.generate")
     def generate_script(self, topic: str, product_name: str = "Producto", num_scenes: int = 4) -> Optional[Dict]:
         """
         Genera un guion técnico completo en formato JSON usando Gemini.
@@ -55,7 +65,7 @@ class ScriptWriterAgent:
         {self.hook_framework}
         
         {self.visual_style}
-        
+        {self._competitor_references(topic)}
         FORMATO DE SALIDA (JSON ESTRICTO):
         Debes devolver UNICAMENTE un objeto JSON válido con esta estructura exacta:
         {{
@@ -92,27 +102,32 @@ class ScriptWriterAgent:
                 st.error("❌ Error: API key de Google no configurada en secrets.toml")
                 return None
             
-            # Solicitamos respuesta a Gemini
-            response = client.models.generate_content(
-                model=self.model_name,
-                contents=system_prompt
-            )
-            
-            # Limpieza del texto por si Gemini incluye bloques ```json ... ```
-            text_response = response.text.replace("```json", "").replace("```", "").strip()
-            
-            script_data = json.loads(text_response)
-            
-            # VALIDACIÓN: Asegurar que tenga el número correcto de escenas
-            if len(script_data.get('scenes', [])) != num_scenes:
-                st.warning(f"⚠️ Gemini generó {len(script_data['scenes'])} escenas en lugar de {num_scenes}. Reintentando...")
-                # Reintentar UNA vez
+            with track("scriptwriter", provider="gemini", operation=self.model_name,
+                       bytes_in=len(system_prompt.encode("utf-8"))) as t:
+                # Solicitamos respuesta a Gemini
                 response = client.models.generate_content(
                     model=self.model_name,
                     contents=system_prompt
                 )
+                
+                # Limpieza del texto por si Gemini incluye bloques ```json ... ```
                 text_response = response.text.replace("```json", "").replace("```", "").strip()
+                
                 script_data = json.loads(text_response)
+                
+                # VALIDACIÓN: Asegurar que tenga el número correcto de escenas
+                if len(script_data.get('scenes', [])) != num_scenes:
+                    st.warning(f"⚠️ Gemini generó {len(script_data['scenes'])} escenas en lugar de {num_scenes}. Reintentando...")
+                    # Reintentar UNA vez
+                    t.attempts = 2
+                    response = client.models.generate_content(
+                        model=self.model_name,
+                        contents=system_prompt
+                    )
+                    text_response = response.text.replace("```json", "").replace("```", "").strip()
+                    script_data = json.loads(text_response)
+                
+                t.bytes_out = len(text_response.encode("utf-8"))
             
             return script_data
             
@@ -120,5 +135,35 @@ class ScriptWriterAgent:
             st.error(f"❌ Error en ScriptWriter: {str(e)}")
             return None
 
+    def _competitor_references(self, topic: str) -> str:
+        """
+        Bloque del prompt con los fragmentos de transcripciones de
+        competidores (tabla video_transcripts) que mejor coinciden con el
+        tema. Vacío si no hay coincidencias o la base de datos no está
+        disponible.
+        """
+        if not self.reference_snippets:
+            return ""
+        try:
+            from utils.database import get_db
+            hits = get_db().search_transcripts(
+                topic, limit=self.reference_snippets, max_rank=REFERENCE_MAX_RANK
+            )
+        except Exception as e:
+            print(f"[ScriptWriter] Búsqueda de referencias omitida: {e}")
+            return ""
+        if not hits:
+            return ""
+
+        lines = [
+            f'- "{hit["snippet"]}" ({hit["title"] or hit["video_id"]}, {int(hit["start"])}s)'
+            for hit in hits
+        ]
+        return (
+            "\n        REFERENCIAS DE COMPETIDORES (fragmentos reales sobre el tema, "
+            "úsalos como inspiración de ritmo y ángulo, NO los copies):\n        "
+            + "\n        ".join(lines) + "\n"
+        )
+
 if __name__ == "__main__":
     print("✅ El archivo scriptwriter.py se ha cargado correctamente.")
\ No newline at end of file
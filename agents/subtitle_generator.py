@@ -10,41 +10,47 @@ if not hasattr(PIL.Image, 'ANTIALIAS'):
         PIL.Image.ANTIALIAS = PIL.Image.LANCZOS
 
 try:
-    from moviepy.editor import TextClip, CompositeVideoClip, ColorClip
+    from moviepy.editor import CompositeVideoClip, ColorClip
 except ImportError:
     print("⚠️ Error importando MoviePy")
 
+from utils.subtitle_sprites import get_caption_sprite, overlay_captions
+from utils.caption_alignment import SCENE_TAIL_SECONDS, get_caption_track
+
 FONT_NAME = 'Arial'
 
 class SubtitleGeneratorAgent:
     def __init__(self):
-        pass
+        self.fontsize = 50
+        self.color = 'yellow'
+        self.stroke_color = 'black'
+        self.stroke_width = 2
 
-    def generate_subtitles(self, script_data, total_duration, video_width=1080):
-        """
-        Genera subtítulos SIN usar SubtitlesClip (que está roto).
-        En su lugar, crea TextClips individuales y los compone.
+    def _subtitle_cues(self, script_data, total_duration):
         """
-        print(f"💬 Generando subtítulos (SIN SubtitlesClip)...")
-        print(f"   ⏱️ Duración Total Video: {total_duration}s")
+        Calcula (escena, texto, inicio, fin): sincronizado con la narración
+        si hay audios, o repartiendo la duración por escena.
         
+        Returns:
+            (cues, safe_duration)
+        """
         scenes = script_data.get("scenes", [])
-        if not scenes: 
-            print("⚠️ No hay escenas para subtitular")
-            return None
+        if not scenes:
+            return [], 0
 
         # Margen de seguridad MUY agresivo
         safe_duration = total_duration - 1.0
         if safe_duration <= 0:
             safe_duration = total_duration * 0.9
+        
+        # Si todas las escenas tienen narración en disco, sincronizar 1-3
+        # palabras con el audio en vez de repartir el tiempo a partes iguales
+        word_cues = self._word_cues(scenes, safe_duration)
+        if word_cues:
+            return word_cues, safe_duration
             
         scene_duration = safe_duration / len(scenes)
-        
-        # Configuración Visual
-        max_text_width = int(video_width * 0.85)
-        video_height = 1920  # Altura estándar para shorts
-        
-        subtitle_clips = []
+        cues = []
         
         for i, scene in enumerate(scenes):
             start_time = i * scene_duration
@@ -62,28 +68,82 @@ class SubtitleGeneratorAgent:
             if end_time > safe_duration:
                 end_time = safe_duration
             
-            duration = end_time - start_time
-            if duration <= 0:
+            if end_time - start_time <= 0:
                 continue
             
+            cues.append((i, text, start_time, end_time))
+        
+        return cues, safe_duration
+
+    def _word_cues(self, scenes, safe_duration):
+        """
+        Cues palabra a palabra a partir de las pistas de tiempos de cada
+        narración. Cada escena dura su audio + 0.2s, igual que en el editor.
+        
+        Returns:
+            Lista de (escena, texto, inicio, fin), o None si falta algún audio
+        """
+        if not all(scene.get("audio_path") and os.path.exists(scene["audio_path"]) for scene in scenes):
+            return None
+        
+        cues = []
+        offset = 0.0
+        try:
+            for i, scene in enumerate(scenes):
+                text = scene.get("narration", "").replace("*", "").strip()
+                track = get_caption_track(scene["audio_path"], text)
+                for chunk, start, end in track["captions"]:
+                    start_time = offset + start
+                    end_time = min(offset + end, safe_duration)
+                    if end_time > start_time:
+                        cues.append((i, chunk, start_time, end_time))
+                offset += track["duration"] + SCENE_TAIL_SECONDS
+        except Exception as e:
+            print(f"   ⚠️ Alineación de subtítulos falló, usando reparto uniforme: {e}")
+            return None
+        
+        return cues
+
+    def _sprite(self, text, max_text_width):
+        """Sprite Pillow cacheado para un bloque de texto."""
+        return get_caption_sprite(
+            text,
+            font=FONT_NAME,
+            fontsize=self.fontsize,
+            color=self.color,
+            stroke_color=self.stroke_color,
+            stroke_width=self.stroke_width,
+            max_width=max_text_width
+        )
+
+    def generate_subtitles(self, script_data, total_duration, video_width=1080):
+        """
+        Genera subtítulos SIN usar SubtitlesClip (que está roto) ni ImageMagick.
+        Cada texto se rasteriza una vez con Pillow (sprite cacheado en disco)
+        y se compone como ImageClip con máscara alfa.
+        """
+        print(f"💬 Generando subtítulos (sprites Pillow)...")
+        print(f"   ⏱️ Duración Total Video: {total_duration}s")
+        
+        cues, safe_duration = self._subtitle_cues(script_data, total_duration)
+        if not cues and not script_data.get("scenes"):
+            print("⚠️ No hay escenas para subtitular")
+            return None
+
+        # Configuración Visual
+        max_text_width = int(video_width * 0.85)
+        video_height = 1920  # Altura estándar para shorts
+        
+        subtitle_clips = []
+        
+        for i, text, start_time, end_time in cues:
             try:
-                # Crear TextClip individual para cada escena
-                txt_clip = TextClip(
-                    text,
-                    font=FONT_NAME,
-                    fontsize=50,
-                    color='yellow',
-                    stroke_color='black',
-                    stroke_width=2,
-                    method='caption',
-                    size=(max_text_width, None),
-                    align='center'
-                )
+                sprite = self._sprite(text, max_text_width)
                 
                 # Posicionar en la parte inferior
-                txt_clip = (txt_clip
+                txt_clip = (sprite.to_clip()
                     .set_start(start_time)
-                    .set_duration(duration)
+                    .set_duration(end_time - start_time)
                     .set_position(('center', video_height * 0.78))
                 )
                 
@@ -117,4 +177,23 @@ class SubtitleGeneratorAgent:
             
         except Exception as e:
             print(f"❌ Error al componer subtítulos: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def burn_subtitles(self, video_clip, script_data):
+        """
+        Dibuja los subtítulos directamente sobre los frames de video_clip,
+        mezclando solo el bounding box de cada sprite (sin CompositeVideoClip).
+        
+        Returns:
+            VideoClip con subtítulos, o el clip original si no hay texto
+        """
+        cues, _ = self._subtitle_cues(script_data, video_clip.duration)
+        if not cues:
+            return video_clip
+        
+        max_text_width = int(video_clip.w * 0.85)
+        sprite_cues = [
+            (self._sprite(text, max_text_width), start_time, end_time, None)
+            for _, text, start_time, end_time in cues
+        ]
+        return overlay_captions(video_clip, sprite_cues, y=int(video_clip.h * 0.78))
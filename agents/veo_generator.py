@@ -1,10 +1,14 @@
 import os
 import streamlit as st
 import time
+import uuid
 from google import genai
 from google.genai import types
 from typing import Optional
 
+from utils.asset_store import atomic_output
+from utils.metrics import track
+
 # Configuración de Vertex AI
 PROJECT_ID = "gen-lang-client-0706301797"
 LOCATION = "us-central1"
@@ -82,14 +86,102 @@ class VeoGeneratorAgent:
             traceback.print_exc()
             self.client = None
 
-    def generate_video_clip(self, prompt: str, aspect_ratio: str = "9:16", duration: str = "5s") -> Optional[str]:
+    def submit_video_clip(self, prompt: str, aspect_ratio: str = "9:16") -> str:
+        """
+        Lanza la operación de larga duración de Veo sin esperar el resultado.
+        
+        Returns:
+            Nombre de la operación (persistible para reanudar la espera)
+        """
+        with track("veo_generator", provider="veo", operation="submit", bytes_in=len(prompt)):
+            operation = self.client.models.generate_videos(
+                model=self.model_id,
+                prompt=prompt.strip(),
+                config=types.GenerateVideosConfig(
+                    aspect_ratio=aspect_ratio,
+                    # duration_seconds=5, # Opcional
+                )
+            )
+        return operation.name
+
+    def get_operation(self, operation_name: str):
+        """Consulta el estado de una operación Veo por su nombre."""
+        return self.client.operations.get(types.GenerateVideosOperation(name=operation_name))
+
+    def download_video(self, video, output_path: str, chunk_size: int = 1 << 20) -> str:
+        """
+        Guarda el video generado en disco por bloques.
+        
+        Si Veo devuelve una URL HTTP se descarga en streaming a un archivo
+        .part que se reanuda con Range tras un corte; los bytes en línea se
+        escriben por bloques y las URIs de almacenamiento se bajan con el SDK.
+        
+        Args:
+            video: types.Video (video_bytes o uri)
+            output_path: Ruta final del .mp4
+        """
+        with track("veo_generator", provider="veo", operation="download") as t:
+            self._download_video(video, output_path, chunk_size)
+            t.bytes_out = os.path.getsize(output_path)
+        return output_path
+
+    def _download_video(self, video, output_path: str, chunk_size: int) -> str:
+        if video.video_bytes:
+            data = memoryview(video.video_bytes)
+            with atomic_output(output_path) as tmp_path:
+                with open(tmp_path, "wb") as f:
+                    for start in range(0, len(data), chunk_size):
+                        f.write(data[start:start + chunk_size])
+            return output_path
+
+        if video.uri and video.uri.startswith(("http://", "https://")):
+            import requests
+            
+            part_path = output_path + ".part"
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            
+            with requests.get(video.uri, headers=headers, stream=True, timeout=60) as response:
+                if response.status_code == 416:
+                    # El .part ya estaba completo
+                    pass
+                else:
+                    response.raise_for_status()
+                    # 206 = el servidor aceptó el Range; 200 = empezar de cero
+                    mode = "ab" if response.status_code == 206 else "wb"
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            if chunk:
+                                f.write(chunk)
+            os.replace(part_path, output_path)
+            return output_path
+
+        # gs:// u otras referencias de archivo: descarga vía SDK
+        data = self.client.files.download(file=video)
+        with atomic_output(output_path) as tmp_path:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+        return output_path
+
+    def generate_video_clip(self, prompt: str, aspect_ratio: str = "9:16", duration: str = "5s",
+                            filename: Optional[str] = None, store=None,
+                            scene_number: Optional[int] = None) -> Optional[str]:
         """
         Genera un clip de video usando Google Veo.
         
+        La operación se registra en la base de datos (tabla veo_jobs) y se
+        consulta con backoff sin bloquear otros trabajos; si la página se
+        recarga, una nueva llamada con el mismo proyecto/escena/prompt
+        reanuda la espera en lugar de lanzar otro video.
+        
         Args:
             prompt: Descripción visual en inglés.
             aspect_ratio: Relación de aspecto (9:16 para TikTok).
             duration: Duración del clip (5s o 10s).
+            filename: Nombre del archivo (por defecto uno único veo_<ts>_<id>.mp4)
+            store: ProjectAssetStore opcional; si se indica, el clip se guarda
+                en la carpeta del proyecto
+            scene_number: Escena a la que pertenece el clip (para reanudar)
             
         Returns:
             Ruta al video generado (.mp4) o None si falla.
@@ -102,40 +194,28 @@ class VeoGeneratorAgent:
         prompt = prompt.strip()
         
         try:
-            st.info(f"🎬 Iniciando generación de video Veo (tardará ~60-90s)...")
+            from utils.veo_jobs import VeoJobManager
             
-            # Llamada al modelo Veo-001
-            # Nota: generate_videos es una operación de larga duración (LRO)
-            operation = self.client.models.generate_videos(
-                model=self.model_id,
-                prompt=prompt,
-                config=types.GenerateVideosConfig(
-                    aspect_ratio=aspect_ratio,
-                    # duration_seconds=5, # Opcional
-                )
-            )
-
-            # Esperar a que se complete la operación
-            # El SDK suele manejar el polling automáticamente si se accede al resultado
-            video_result = operation.result()
+            # Generar nombre de archivo único (el timestamp solo choca entre sesiones)
+            if not filename:
+                filename = f"veo_{int(time.time())}_{uuid.uuid4().hex[:8]}.mp4"
+            if store is not None:
+                output_path = store.path("videos", filename)
+            else:
+                output_path = os.path.join(self.output_dir, filename)
             
-            if not video_result.generated_videos:
-                st.error("❌ Veo no generó ningún video.")
-                return None
-
-            # Obtener el primer video generado
-            video = video_result.generated_videos[0]
+            st.info(f"🎬 Iniciando generación de video Veo (tardará ~60-90s)...")
             
-            # Generar nombre de archivo único
-            timestamp = int(time.time())
-            filename = f"veo_{timestamp}.mp4"
-            output_path = os.path.join(self.output_dir, filename)
+            project_id = store.project_id if store is not None else None
+            output_path = VeoJobManager(self).run(
+                prompt, output_path,
+                project_id=project_id,
+                scene_number=scene_number,
+                aspect_ratio=aspect_ratio
+            )
             
-            # Descargar/Guardar el video
-            # El objeto video suele tener bytes o una URI de GCS
-            # Si el SDK lo descarga directamente:
-            with open(output_path, "wb") as f:
-                f.write(video.video.data) # Acceso a los bytes según docs genai
+            if store is not None:
+                store.record("videos", filename, prompt=prompt[:200])
                 
             return output_path
 
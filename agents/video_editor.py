@@ -1,4 +1,13 @@
 import os
+import sys
+import types
+import shutil
+import tempfile
+import contextvars
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 import streamlit as st
 import PIL.Image
 # FIX: Parche ANTIALIAS para MoviePy 1.0.3 en Python 3.10+
@@ -14,6 +23,25 @@ except ImportError:
     # Fallback para algunas subversiones
     from moviepy.audio.fx.audio_loop import audio_loop
 
+from utils.ken_burns import KenBurnsRenderer
+from utils.ffmpeg_tools import FrameEncoder, build_narration_track, concat_segments, mix_background_music
+from utils.subtitle_sprites import get_caption_sprite, overlay_captions
+from utils.caption_alignment import SCENE_TAIL_SECONDS, get_caption_track
+from utils.asset_store import atomic_output
+from utils.asset_cache import AssetCache, file_digest
+from utils.media_probe import get_duration
+from utils.metrics import track
+from utils.render_profiles import DEFAULT_PROFILE, available_cores, get_profile
+from utils.tracing import attach, current_context, span
+
+# Caché de segmentos por escena del modo paralelo (re-render incremental)
+SEGMENT_CACHE_MAX_BYTES = int(os.getenv("SEGMENT_CACHE_MAX_MB", "2000")) * 1024 * 1024
+# Subir si cambia cómo se construye un segmento: invalida la caché
+SEGMENT_FORMAT_VERSION = 1
+
+# Alto de la franja de subtítulos en el layout base 1080x1920 (se escala por perfil)
+CAPTION_Y = 1400
+
 class VideoEditorAgent:
     def __init__(self):
         """
@@ -30,10 +58,65 @@ class VideoEditorAgent:
         self.color = 'yellow'
         self.stroke_color = 'black'
         self.stroke_width = 2
+        
+        # Subtítulos: "words" (1-3 palabras sincronizadas) | "block" (narración completa)
+        self.caption_mode = "words"
+        self.caption_max_words = 3
+        self.word_fontsize = 80
+        
+        self.music_volume = 0.15  # Audio ducking: música al 15%
+        
+        # Fuera del hilo del script (render_in_background) st.* no muestra
+        # nada: los errores se relanzan para que los reciba el Future
+        self.raise_errors = False
+        
+        # Segmentos ya codificados, por huella de sus insumos (modo paralelo)
+        self.segment_cache = AssetCache("segments", SEGMENT_CACHE_MAX_BYTES)
+        
+        # Perfil de render (tamaño, fps, preset x264): fija self.size, self.fps
+        # y la calidad del zoom Ken Burns ("fast" | "balanced" | "high")
+        self.use_profile(DEFAULT_PROFILE)
+
+    def use_profile(self, profile):
+        """
+        Selecciona el perfil de render ("preview", "final", "social").
+        El layout se define sobre 1080x1920 y se escala al tamaño del perfil.
+        """
+        self.profile = get_profile(profile)
+        self.size = self.profile.size
+        self.fps = self.profile.fps
+        self.zoom_quality = self.profile.zoom_quality
+
+    def _scaled(self, value):
+        """Convierte una medida del layout base 1080x1920 al tamaño del perfil."""
+        return max(1, round(value * self.profile.scale))
 
-    def create_zoom_clip(self, img_path, duration):
+    def create_zoom_clip(self, img_path, duration, quality=None):
         """
-        Aplica efecto Ken Burns (zoom suave) compatible con MoviePy 1.0.3.
+        Aplica efecto Ken Burns (zoom suave 1.0 -> 1.02) con el renderer vectorizado.
+        La imagen se decodifica y escala una sola vez; cada frame es un recorte
+        + escalado afín sobre esa base (sin resize completo por frame).
+        
+        Args:
+            img_path: Ruta a la imagen
+            duration: Duración del clip en segundos
+            quality: "fast", "balanced" o "high" (por defecto self.zoom_quality)
+        
+        Returns:
+            VideoClip del tamaño del perfil con efecto zoom aplicado
+        """
+        renderer = KenBurnsRenderer(
+            img_path,
+            size=self.size,
+            zoom=0.02,
+            quality=quality or self.zoom_quality
+        )
+        return renderer.make_clip(duration)
+
+    def create_zoom_clip_moviepy(self, img_path, duration):
+        """
+        Ken Burns original con clip.resize(zoom_function) de MoviePy 1.0.3.
+        Se conserva como referencia para benchmarks (resize LANCZOS por frame).
         
         Args:
             img_path: Ruta a la imagen
@@ -45,12 +128,13 @@ class VideoEditorAgent:
         # Cargar imagen
         clip = ImageClip(img_path).set_duration(duration)
         
-        # Redimensionar para cubrir formato 9:16 (1080x1920)
-        clip = clip.resize(height=1920)
+        # Redimensionar para cubrir formato 9:16 (alto del perfil)
+        width, height = self.size
+        clip = clip.resize(height=height)
         
-        # Recortar al centro para obtener 1080 de ancho exacto
+        # Recortar al centro para obtener el ancho exacto
         w, h = clip.size
-        clip = clip.crop(x1=w/2 - 540, y1=0, width=1080, height=1920)
+        clip = clip.crop(x1=w/2 - width/2, y1=0, width=width, height=height)
         
         # Efecto zoom suave (1.0 -> 1.02 sobre la duración)
         # Usamos resize con función lambda
@@ -59,7 +143,123 @@ class VideoEditorAgent:
         
         return clip.resize(zoom_function)
 
-    def assemble_video(self, scenes, music_path=None, output_filename="final_video.mp4"):
+    def caption_cues(self, text, audio_path, duration):
+        """
+        Cues (sprite, inicio, fin, x) de subtítulos para una escena.
+        
+        En modo "words" se muestran 1-3 palabras sincronizadas con la
+        narración (pista de tiempos cacheada junto al audio). Si la
+        alineación falla se usa el bloque completo.
+        """
+        if self.caption_mode == "words":
+            try:
+                timing = get_caption_track(audio_path, text, max_words=self.caption_max_words)
+                cues = [
+                    (self._caption_sprite(chunk, self.word_fontsize), start, min(end, duration), None)
+                    for chunk, start, end in timing["captions"]
+                ]
+                if cues:
+                    return cues
+            except Exception as e:
+                print(f"[WARN] Alineación de subtítulos falló, usando bloque completo: {e}")
+
+        return [(self._caption_sprite(text, self.fontsize), 0, duration, None)]
+
+    def _caption_sprite(self, text, fontsize):
+        return get_caption_sprite(
+            text,
+            font=self.font,
+            fontsize=self._scaled(fontsize),
+            color=self.color,
+            stroke_color=self.stroke_color,
+            stroke_width=self._scaled(self.stroke_width),
+            max_width=self._scaled(900)
+        )
+
+    def _warn(self, message):
+        """Aviso en la página, o en el log si el render va en segundo plano."""
+        if self.raise_errors:
+            print(f"[VideoEditor] ⚠️ {message}")
+        else:
+            st.warning(f"⚠️ {message}")
+
+    def _error(self, message):
+        """Error en la página, o RuntimeError si el render va en segundo plano."""
+        if self.raise_errors:
+            raise RuntimeError(message)
+        st.error(f"❌ {message}")
+
+    def _scene_assets_ok(self, scene, index):
+        """Valida que la escena tenga audio e imagen/video en disco."""
+        audio_path = scene.get('audio_path')
+        img_path = scene.get('image_path')
+        
+        if not audio_path or not os.path.exists(audio_path):
+            self._warn(f"Saltando escena {index+1}: Falta audio")
+            return False
+        if not img_path or not os.path.exists(img_path):
+            self._warn(f"Saltando escena {index+1}: Falta imagen")
+            return False
+        return True
+
+    def build_scene_clip(self, scene, index):
+        """
+        Construye el clip de una escena: Imagen/Video + Zoom + Texto + Narración.
+        
+        Args:
+            scene: Escena con audio_path, image_path, narration
+            index: Índice de la escena (0-based, para mensajes)
+        
+        Returns:
+            VideoClip con audio asignado
+        """
+        audio_path = scene.get('audio_path')
+        img_path = scene.get('image_path')
+
+        # 1. Cargar audio y definir duración
+        audio_clip = AudioFileClip(audio_path)
+        duration = audio_clip.duration + SCENE_TAIL_SECONDS  # Buffer para transiciones suaves
+        
+        # 2. Crear el clip visual (Imagen o Video)
+        is_video = img_path.lower().endswith('.mp4')
+        
+        if is_video:
+            # Cargar Video Clip (sin su audio: la voz en off lo reemplaza)
+            v_clip = VideoFileClip(img_path, audio=False)
+            
+            # Redimensionar al alto del perfil
+            width, height = self.size
+            v_clip = v_clip.resize(height=height)
+            
+            # Recortar al centro al ancho del perfil
+            vw, vh = v_clip.size
+            video_clip = v_clip.crop(x1=vw/2 - width/2, y1=0, width=width, height=height)
+            
+            # Ajustar duración (el audio manda; si es corto se extiende el último cuadro)
+            video_clip = video_clip.set_duration(duration)
+        else:
+            # Crear video clip con efecto zoom (para imágenes estáticas)
+            video_clip = self.create_zoom_clip(img_path, duration)
+        
+        # 3. Subtítulos estilo Hormozi: sprites Pillow cacheados (sin ImageMagick),
+        # mezclados solo sobre su bounding box
+        txt_content = scene.get('narration', '').strip()
+        
+        if txt_content:
+            try:
+                cues = self.caption_cues(txt_content, audio_path, duration)
+                video_clip = overlay_captions(video_clip, cues, y=self._scaled(CAPTION_Y))
+                
+            except Exception as e:
+                self._warn(f"No se pudo generar texto para escena {index+1}: {e}")
+                # Si falla, continuar sin texto
+
+        # 4. Asignar audio al video
+        # Si el original era video, quitamos su audio previo para poner la voz en off
+        return video_clip.set_audio(audio_clip)
+
+    def assemble_video(self, scenes, music_path=None, output_filename="final_video.mp4",
+                       parallel=False, max_workers=None, store=None, streaming=False, profile=None):
         """
         Ensambla el video final: Imagen + Zoom + Audio + Texto + Música.
         
@@ -67,126 +267,425 @@ class VideoEditorAgent:
             scenes: Lista de escenas con audio_path, image_path, narration
             music_path: Ruta opcional a música de fondo
             output_filename: Nombre del archivo de salida
+            parallel: Codificar cada escena en un proceso separado y unir
+                los segmentos con ffmpeg (concat sin re-codificar); las
+                escenas sin cambios se toman de la caché de segmentos
+            max_workers: Procesos para el modo paralelo (por defecto: núcleos)
+            store: ProjectAssetStore opcional; el video se guarda en la
+                carpeta "final" del proyecto en lugar de assets/final_output
+            streaming: Renderizar escena por escena enviando frames crudos a
+                un solo ffmpeg (memoria constante; ignorado si parallel)
+            profile: Perfil de render ("preview", "final", "social"); por
+                defecto se mantiene el perfil actual del editor
         
         Returns:
             str: Ruta del video generado, o None si falla
         """
-        try:
-            clips = []
+        if profile is not None:
+            self.use_profile(profile)
+        project_id = store.project_id if store is not None else None
+        mode = "parallel" if parallel else "streaming" if streaming else "serial"
+        with span("render.assemble", mode=mode, profile=self.profile.name, scenes=len(scenes)), \
+                track("video_editor", provider="moviepy" if mode == "serial" else "ffmpeg",
+                      operation=f"assemble_{mode}", project_id=project_id) as t:
+            if parallel:
+                output_path = self.assemble_video_parallel(scenes, music_path, output_filename, max_workers, store)
+            elif streaming:
+                output_path = self.assemble_video_streaming(scenes, music_path, output_filename, store)
+            else:
+                output_path = self._assemble_video_serial(scenes, music_path, output_filename, store)
             
-            for i, scene in enumerate(scenes):
-                # 1. Validar que existan los assets
-                audio_path = scene.get('audio_path')
-                img_path = scene.get('image_path')
-                
-                if not audio_path or not os.path.exists(audio_path):
-                    st.warning(f"⚠️ Saltando escena {i+1}: Falta audio")
-                    continue
-                if not img_path or not os.path.exists(img_path):
-                    st.warning(f"⚠️ Saltando escena {i+1}: Falta imagen")
-                    continue
+            if output_path and os.path.exists(output_path):
+                t.bytes_out = os.path.getsize(output_path)
+            else:
+                t.fail()
+        return output_path
 
-                # 2. Cargar audio y definir duración
-                audio_clip = AudioFileClip(audio_path)
-                duration = audio_clip.duration + 0.2  # Buffer para transiciones suaves
-                
-                # 3. Crear el clip visual (Imagen o Video)
-                is_video = img_path.lower().endswith('.mp4')
+    def _assemble_video_serial(self, scenes, music_path, output_filename, store):
+        """Render en un solo proceso con MoviePy (ver assemble_video)."""
+        clips = []
+        try:
+            with span("render.load", scenes=len(scenes)):
+                for i, scene in enumerate(scenes):
+                    if not self._scene_assets_ok(scene, i):
+                        continue
+                    clips.append(self.build_scene_clip(scene, i))
+
+            if not clips:
+                self._error("No hay clips válidos para ensamblar")
+                return None
+
+            with span("render.compose", clips=len(clips)):
+                # Concatenar todos los clips
+                final_video = concatenate_videoclips(clips, method="compose")
+            
+                # Añadir música de fondo con audio ducking
+                if music_path and os.path.exists(music_path):
+                    bg_music = AudioFileClip(music_path)
                 
-                if is_video:
-                    # Cargar Video Clip
-                    v_clip = VideoFileClip(img_path)
-                    
-                    # Redimensionar al alto de 1920
-                    v_clip = v_clip.resize(height=1920)
-                    
-                    # Recortar al centro para 1080 de ancho
-                    vw, vh = v_clip.size
-                    video_clip = v_clip.crop(x1=vw/2 - 540, y1=0, width=1080, height=1920)
-                    
-                    # Ajustar duración si es necesario (el audio manda)
-                    if video_clip.duration < duration:
-                        # Si es corto, podemos loopear o simplemente extender el último cuadro
-                        video_clip = video_clip.set_duration(duration)
+                    # Loop de música si es más corta que el video
+                    if bg_music.duration < final_video.duration:
+                        bg_music = audio_loop(bg_music, duration=final_video.duration)
                     else:
-                        video_clip = video_clip.set_duration(duration)
-                else:
-                    # Crear video clip con efecto zoom (para imágenes estáticas)
-                    video_clip = self.create_zoom_clip(img_path, duration)
+                        bg_music = bg_music.subclip(0, final_video.duration)
                 
-                # 4. Crear subtítulos estilo Hormozi
-                txt_content = scene.get('narration', '')
+                    # Audio Ducking: Bajar volumen de música al 15%
+                    bg_music = bg_music.volumex(self.music_volume)
                 
-                # Intentar crear TextClip (requiere ImageMagick)
-                try:
-                    txt_clip = (TextClip(txt_content, 
-                                         fontsize=self.fontsize, 
-                                         font=self.font, 
-                                         color=self.color, 
-                                         stroke_color=self.stroke_color, 
-                                         stroke_width=self.stroke_width,
-                                         size=(900, None), 
-                                         method='caption')
-                                .set_position(('center', 1400))  # Posición inferior
-                                .set_duration(duration))
-                    
-                    # Componer imagen/video + texto
-                    video_clip = CompositeVideoClip([video_clip, txt_clip])
-                    
-                except Exception as e:
-                    st.warning(f"⚠️ No se pudo generar texto para escena {i+1}. Verifica ImageMagick: {e}")
-                    # Si falla, continuar sin texto
-                    pass
+                    # Mezclar narración + música
+                    final_audio = CompositeAudioClip([final_video.audio, bg_music])
+                    final_video = final_video.set_audio(final_audio)
 
-                # 5. Asignar audio al video
-                # Si el original era video, quitamos su audio previo para poner la voz en off
-                video_clip = video_clip.set_audio(audio_clip)
-                clips.append(video_clip)
+            # Exportar video final (a un temporal que se renombra al terminar)
+            output_path = self._output_path(output_filename, store)
+            
+            with span("render.encode"), atomic_output(output_path) as tmp_path:
+                final_video.write_videofile(
+                    tmp_path, 
+                    fps=self.fps,  # FPS del perfil (24 cinematográfico en "final")
+                    codec="libx264", 
+                    audio_codec="aac",
+                    audio_bitrate=self.profile.audio_bitrate,
+                    threads=self.profile.threads(),
+                    preset=self.profile.preset,
+                    ffmpeg_params=self.profile.x264_args()
+                )
+            
+            if store is not None:
+                store.record("final", output_filename, scenes=len(clips))
+            
+            return output_path
 
-            if not clips:
-                st.error("❌ No hay clips válidos para ensamblar")
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            st.error(f"❌ Error crítico en VideoEditor (MoviePy 1.0.3): {e}")
+            import traceback
+            st.code(traceback.format_exc())
+            return None
+        finally:
+            for clip in clips:
+                _close_clip(clip)
+
+    def assemble_video_streaming(self, scenes, music_path=None, output_filename="final_video.mp4",
+                                 store=None):
+        """
+        Modo streaming: recorre la línea de tiempo escena por escena y envía
+        los frames crudos a un único proceso ffmpeg a través de una cola
+        acotada. Cada escena se construye, se renderiza y se cierra antes de
+        abrir la siguiente, así la memoria pico no crece con la duración.
+        La narración se une (con el silencio de cada escena) en una pista
+        aparte y la música se mezcla en el mismo ffmpeg.
+        
+        Args:
+            scenes: Lista de escenas con audio_path, image_path, narration
+            music_path: Ruta opcional a música de fondo
+            output_filename: Nombre del archivo de salida
+            store: ProjectAssetStore opcional (ver assemble_video)
+        
+        Returns:
+            str: Ruta del video generado, o None si falla
+        """
+        output_path = self._output_path(output_filename, store)
+        work_dir = tempfile.mkdtemp(prefix="stream_", dir=os.path.dirname(output_path))
+        try:
+            valid = [(i, scene) for i, scene in enumerate(scenes) if self._scene_assets_ok(scene, i)]
+            if not valid:
+                self._error("No hay clips válidos para ensamblar")
                 return None
 
-            # 6. Concatenar todos los clips
-            final_video = concatenate_videoclips(clips, method="compose")
+            with span("render.load", scenes=len(valid)):
+                durations = [self._scene_duration(scene) for _, scene in valid]
+                narration_path = os.path.join(work_dir, "narration.m4a")
+                build_narration_track([scene['audio_path'] for _, scene in valid], durations, narration_path,
+                                      audio_bitrate=self.profile.audio_bitrate)
+
+            music = music_path if music_path and os.path.exists(music_path) else None
             
-            # 7. Añadir música de fondo con audio ducking
-            if music_path and os.path.exists(music_path):
-                bg_music = AudioFileClip(music_path)
-                
-                # Loop de música si es más corta que el video
-                if bg_music.duration < final_video.duration:
-                    bg_music = audio_loop(bg_music, duration=final_video.duration)
-                else:
-                    bg_music = bg_music.subclip(0, final_video.duration)
-                
-                # Audio Ducking: Bajar volumen de música al 15%
-                bg_music = bg_music.volumex(0.15)
+            with atomic_output(output_path) as tmp_path:
+                encoder = FrameEncoder(
+                    tmp_path, self.size, self.fps,
+                    audio_path=narration_path, music_path=music, music_volume=self.music_volume,
+                    preset=self.profile.preset, video_args=self.profile.x264_args(),
+                    audio_bitrate=self.profile.audio_bitrate,
+                    # Máximo 4: x264 reserva un buffer por hilo y aquí importa la memoria
+                    threads=min(self.profile.threads(), 4)
+                )
+                with encoder:
+                    # Frames por escena según la línea de tiempo acumulada (sin deriva)
+                    start, frame_index = 0.0, 0
+                    for (i, scene), duration in zip(valid, durations):
+                        end = start + duration
+                        with span("render.compose", scene=i + 1):
+                            clip = self.build_scene_clip(scene, i)
+                            try:
+                                last_frame = round(end * self.fps)
+                                while frame_index < last_frame:
+                                    t = min(max(frame_index / self.fps - start, 0.0), clip.duration - 1e-3)
+                                    encoder.write(clip.get_frame(t))
+                                    frame_index += 1
+                            finally:
+                                _close_clip(clip)
+                        start = end
+                    
+                    with span("render.encode", frames=frame_index):
+                        encoder.close()
+            
+            if store is not None:
+                store.record("final", output_filename, scenes=len(valid))
+            
+            return output_path
+
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            st.error(f"❌ Error crítico en VideoEditor (modo streaming): {e}")
+            import traceback
+            st.code(traceback.format_exc())
+            return None
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _scene_duration(self, scene):
+        """
+        Duración de la escena en el video (narración + cola), igual que
+        build_scene_clip, leída de la cabecera del audio sin decodificarlo.
+        """
+        return get_duration(scene['audio_path']) + SCENE_TAIL_SECONDS
+
+    def assemble_video_parallel(self, scenes, music_path=None, output_filename="final_video.mp4",
+                                max_workers=None, store=None, use_cache=True):
+        """
+        Modo paralelo: cada escena se codifica a un segmento MP4 en un pool de
+        procesos, luego se unen con el concat demuxer de ffmpeg (stream copy).
+        La música de fondo se mezcla al final en una pasada solo de audio.
+        
+        Los segmentos se guardan en assets/cache/segments con la huella de
+        sus insumos (segment_key); al volver a renderizar solo se codifican
+        las escenas que cambiaron y el resto se une desde la caché.
+        
+        Args:
+            scenes: Lista de escenas con audio_path, image_path, narration
+            music_path: Ruta opcional a música de fondo
+            output_filename: Nombre del archivo de salida
+            max_workers: Procesos de codificación (por defecto: núcleos)
+            store: ProjectAssetStore opcional (ver assemble_video)
+            use_cache: Reutilizar y guardar segmentos en la caché
+        
+        Returns:
+            str: Ruta del video generado, o None si falla
+        """
+        output_path = self._output_path(output_filename, store)
+        segments_dir = tempfile.mkdtemp(prefix="segments_", dir=os.path.dirname(output_path))
+        try:
+            jobs = []
+            segment_paths = {}
+            for i, scene in enumerate(scenes):
+                if not self._scene_assets_ok(scene, i):
+                    continue
+                key = self.segment_key(scene) if use_cache else None
+                cached = self.segment_cache.get(key, ".mp4") if key else None
+                if cached is not None:
+                    segment_paths[i] = str(cached)
+                    continue
+                segment_path = os.path.join(segments_dir, f"segment_{i+1:03d}.mp4")
+                jobs.append((dict(scene), i, segment_path, key))
+
+            if not jobs and not segment_paths:
+                self._error("No hay clips válidos para ensamblar")
+                return None
+
+            if jobs:
+                workers = max_workers or available_cores()
+                workers = max(1, min(workers, len(jobs)))
+                settings = self.render_settings()
+                # Los núcleos se reparten entre los procesos que codifican a la vez
+                threads = self.profile.threads(workers)
                 
-                # Mezclar narración + música
-                final_audio = CompositeAudioClip([final_video.audio, bg_music])
-                final_video = final_video.set_audio(final_audio)
+                # "spawn" evita heredar hilos de Streamlit en los procesos hijos
+                ctx = multiprocessing.get_context("spawn")
+                with span("render.segments", workers=workers, encoded=len(jobs), reused=len(segment_paths)), \
+                        ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as executor:
+                    # Los workers continúan la traza de este span
+                    trace_context = current_context()
+                    # Los workers se lanzan durante los submit()
+                    with _detached_script_main():
+                        futures = [
+                            executor.submit(_render_scene_segment, scene, i, segment_path, settings,
+                                            threads=threads, trace_context=trace_context)
+                            for scene, i, segment_path, key in jobs
+                        ]
+                    for (scene, i, segment_path, key), future in zip(jobs, futures):
+                        segment_paths[i] = future.result()
+                        if key:
+                            self.segment_cache.store(key, segment_paths[i],
+                                                     meta={"scene": i + 1, "profile": self.profile.name})
 
-            # 8. Exportar video final
-            output_path = os.path.join(self.output_dir, output_filename)
+            segment_paths = [segment_paths[i] for i in sorted(segment_paths)]
+            with span("render.concat", music=bool(music_path)), atomic_output(output_path) as tmp_path:
+                if music_path and os.path.exists(music_path):
+                    joined_path = os.path.join(segments_dir, "joined.mp4")
+                    concat_segments(segment_paths, joined_path)
+                    # Audio Ducking: pasada final solo de audio (video copiado)
+                    mix_background_music(joined_path, music_path, tmp_path, volume=self.music_volume,
+                                         audio_bitrate=self.profile.audio_bitrate)
+                else:
+                    concat_segments(segment_paths, tmp_path)
             
-            final_video.write_videofile(
-                output_path, 
-                fps=24,  # FPS cinematográfico estándar
-                codec="libx264", 
-                audio_codec="aac",
-                threads=4,
-                preset="medium"  # Balance velocidad/calidad
-            )
+            if store is not None:
+                store.record("final", output_filename, scenes=len(segment_paths))
             
             return output_path
 
         except Exception as e:
-            st.error(f"❌ Error crítico en VideoEditor (MoviePy 1.0.3): {e}")
+            if self.raise_errors:
+                raise
+            st.error(f"❌ Error crítico en VideoEditor (modo paralelo): {e}")
             import traceback
             st.code(traceback.format_exc())
             return None
-    
+        finally:
+            shutil.rmtree(segments_dir, ignore_errors=True)
+
+    def segment_key(self, scene):
+        """
+        Huella de los insumos de una escena: contenido de la imagen/video y
+        del audio, texto, estilo de subtítulos y perfil de render. Mientras
+        no cambie, el segmento codificado en caché sirve tal cual.
+        """
+        return AssetCache.key_for(
+            image=file_digest(scene['image_path']),
+            audio=file_digest(scene['audio_path']),
+            narration=scene.get('narration', '').strip(),
+            settings=self.render_settings(),
+            profile=self.profile._asdict(),
+            tail=SCENE_TAIL_SECONDS,
+            version=SEGMENT_FORMAT_VERSION
+        )
+
+    def _output_path(self, output_filename, store=None):
+        """Ruta del video final: carpeta del proyecto o assets/final_output."""
+        if store is not None:
+            return store.path("final", output_filename)
+        return os.path.join(self.output_dir, output_filename)
+
+    def render_settings(self):
+        """Ajustes del editor que deben viajar a los procesos de render."""
+        return {
+            "profile": self.profile.name,
+            "font": self.font,
+            "fontsize": self.fontsize,
+            "color": self.color,
+            "stroke_color": self.stroke_color,
+            "stroke_width": self.stroke_width,
+            "caption_mode": self.caption_mode,
+            "caption_max_words": self.caption_max_words,
+            "word_fontsize": self.word_fontsize,
+            "zoom_quality": self.zoom_quality,
+            "fps": self.fps,
+        }
+
+    def write_segment(self, clip, segment_path, threads=1):
+        """
+        Codifica un segmento con parámetros idénticos para todas las escenas,
+        requisito para unirlos con concat sin re-codificar.
+        """
+        clip.write_videofile(
+            segment_path,
+            fps=self.fps,
+            codec="libx264",
+            audio_codec="aac",
+            audio_fps=44100,
+            audio_bitrate=self.profile.audio_bitrate,
+            threads=threads,
+            preset=self.profile.preset,
+            ffmpeg_params=self.profile.x264_args(),
+            temp_audiofile=segment_path.replace(".mp4", "_audio.m4a"),
+            logger=None
+        )
+        return segment_path
+
     def is_ready(self):
         """Verifica si el agente está listo (siempre True, MoviePy es local)"""
         return True
+
+
+def _close_clip(clip):
+    """Libera lectores de archivo y procesos ffmpeg de un clip y de su audio."""
+    for part in (clip.audio, clip):
+        if part is None:
+            continue
+        try:
+            part.close()
+        except Exception:
+            pass
+
+
+# Serializa el intercambio de __main__ entre renders concurrentes
+_main_swap_lock = threading.Lock()
+
+
+@contextmanager
+def _detached_script_main():
+    """
+    Streamlit registra app.py como módulo __main__; con "spawn" cada proceso
+    hijo lo volvería a ejecutar completo. Mientras se lanzan los workers se
+    expone un __main__ vacío.
+
+    Desde el render en segundo plano esto corre fuera del hilo del script:
+    si un rerun de Streamlit reemplazó __main__ entretanto, se conserva el
+    nuevo en lugar de restaurar el anterior.
+    """
+    with _main_swap_lock:
+        script_main = sys.modules.get("__main__")
+        placeholder = types.ModuleType("__main__")
+        sys.modules["__main__"] = placeholder
+        try:
+            yield
+        finally:
+            if script_main is not None and sys.modules.get("__main__") is placeholder:
+                sys.modules["__main__"] = script_main
+
+
+def _render_scene_segment(scene, index, segment_path, settings, threads=1, trace_context=None):
+    """
+    Worker del pool de procesos: renderiza una escena a un segmento MP4.
+    Debe ser una función de módulo para poder serializarse.
+    """
+    editor = VideoEditorAgent()
+    settings = dict(settings)
+    editor.use_profile(settings.pop("profile"))
+    for key, value in settings.items():
+        setattr(editor, key, value)
+    
+    with attach(trace_context), span("render.segment", scene=index + 1):
+        with span("render.load"):
+            clip = editor.build_scene_clip(scene, index)
+        try:
+            with span("render.encode"):
+                return editor.write_segment(clip, segment_path, threads=threads)
+        finally:
+            _close_clip(clip)
+
+
+# Renders en segundo plano de a uno: un render final no compite por núcleos con otro
+_background_renders = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+
+
+def render_in_background(scenes, **assemble_kwargs):
+    """
+    Ejecuta assemble_video en un hilo aparte, continuando la traza activa.
+    
+    Args:
+        scenes: Lista de escenas (ver assemble_video)
+        **assemble_kwargs: Argumentos de assemble_video (profile, store, ...)
+    
+    Returns:
+        Future con la ruta del video generado; result() relanza el error
+        del render (en este hilo st.error no llegaría a la página)
+    """
+    editor = VideoEditorAgent()
+    editor.raise_errors = True
+    return _background_renders.submit(
+        contextvars.copy_context().run, editor.assemble_video, list(scenes), **assemble_kwargs
+    )
@@ -29,6 +29,7 @@ class VideoGeneratorAgent(BaseAgent):
         
         self.use_together = bool(TOGETHER_API_KEY)
         self.use_stability = bool(STABILITY_API_KEY)
+        self.provider = "together" if self.use_together else "stability"
         
         if not self.use_together and not self.use_stability:
             raise ValueError("At least one of TOGETHER_API_KEY or STABILITY_API_KEY must be configured")
@@ -3,6 +3,35 @@ import streamlit as st
 from together import Together
 import base64
 
+from utils.asset_cache import AssetCache
+from utils.asset_store import atomic_output
+from utils.gemini_client import generate_text
+from utils.metrics import track
+
+ENHANCE_MODEL = "gemini-2.0-flash"
+
+# Reglas fijas de Art Direction 2.0 para mejorar prompts visuales
+ART_DIRECTION_INSTRUCTIONS = """Eres un experto en prompts para generación de imágenes AI (Flux).
+
+Tu tarea es crear un prompt visual en INGLÉS que sea 100% coherente con la narración y que NO GENERE TEXTO.
+
+REGLAS DE ORO PARA EVITAR TEXTO:
+1. Si mencionas un libro, manual, guía o papel: descríbelo como "completely BLANK white cover", "clean unprinted paper", "generic white booklet with no text whatsoever".
+2. PROHIBIDO mencionar: "title", "design", "label", "text", "words", "letters", "branding", "marketing logo".
+3. Describe el objeto por su FORMA física y TEXTURA (ej: "rough matte paper texture", "grainy terracotta surface").
+
+DIRECCIÓN DE ARTE CINEMATOGRÁFICA (NIVEL PROFESIONAL):
+- Iluminación: Inyecta "Rembrandt lighting", "golden hour volumetric god rays", "global illumination", o "cinematic soft shadows".
+- Composición: Usa "rule of thirds", "shallow depth of field", "bokeh background", "macro photography detail".
+- Texturas: Describe poros de la piel, vetas de las hojas, humedad en la tierra, reflejos naturales en el agua. Evita que la imagen se vea "lisa" o "plástica".
+- NUNCA uses la palabra "pots" sola; usa "terracotta plant pots" o "heavy garden planters".
+
+Responde SOLO con el prompt final en inglés, asegurando que empiece por: "A professional cinematic photograph of...". Agrega al final: ", 8k, highly detailed, sharp focus, RAW photo quality, Kodak Portra 400 style, NO TEXT, no words, no letters, no labels, blank surfaces"
+"""
+
+# Tope del caché de imágenes (LRU), configurable con IMAGE_CACHE_MAX_MB
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_MB", "500")) * 1024 * 1024
+
 class VisualGeneratorAgent:
     def __init__(self):
         """
@@ -12,6 +41,15 @@ class VisualGeneratorAgent:
         self.api_key = st.secrets.get("TOGETHER_API_KEY")
         self.client = None
         
+        # Parámetros de Flux-Schnell (forman parte de la clave del caché)
+        self.model = "black-forest-labs/FLUX.1-schnell"
+        self.width = 1024
+        self.height = 1792
+        self.steps = 4
+        self.seed = None  # None = semilla aleatoria del proveedor
+        
+        self.cache = AssetCache("images", IMAGE_CACHE_MAX_BYTES)
+        
         if self.api_key:
             try:
                 self.client = Together(api_key=self.api_key)
@@ -26,90 +64,107 @@ class VisualGeneratorAgent:
         """
         Usa Gemini para mejorar el prompt visual asegurando coherencia con la narración.
         Implementa Art Direction 2.0 (Nivel Pippit AI).
+        
+        Las reglas fijas viajan como system instruction y la respuesta se
+        memoriza por (modelo, prompt): re-ejecutar el mismo guion no repite
+        la llamada.
         """
         try:
-            import google.genai as genai
-            
-            if "GOOGLE_API_KEY" not in st.secrets:
-                return original_prompt
-            
-            client = genai.Client(api_key=st.secrets["GOOGLE_API_KEY"])
-            
-            enhancement_prompt = f"""Eres un experto en prompts para generación de imágenes AI (Flux).
-
-NARRACIÓN DEL VIDEO: "{narration}"
+            enhancement_prompt = f"""NARRACIÓN DEL VIDEO: "{narration}"
 PROMPT VISUAL ORIGINAL: "{original_prompt}"
-
-Tu tarea es crear un prompt visual en INGLÉS que sea 100% coherente con la narración y que NO GENERE TEXTO.
-
-REGLAS DE ORO PARA EVITAR TEXTO:
-1. Si mencionas un libro, manual, guía o papel: descríbelo como "completely BLANK white cover", "clean unprinted paper", "generic white booklet with no text whatsoever".
-2. PROHIBIDO mencionar: "title", "design", "label", "text", "words", "letters", "branding", "marketing logo".
-3. Describe el objeto por su FORMA física y TEXTURA (ej: "rough matte paper texture", "grainy terracotta surface").
-
-DIRECCIÓN DE ARTE CINEMATOGRÁFICA (NIVEL PROFESIONAL):
-- Iluminación: Inyecta "Rembrandt lighting", "golden hour volumetric god rays", "global illumination", o "cinematic soft shadows".
-- Composición: Usa "rule of thirds", "shallow depth of field", "bokeh background", "macro photography detail".
-- Texturas: Describe poros de la piel, vetas de las hojas, humedad en la tierra, reflejos naturales en el agua. Evita que la imagen se vea "lisa" o "plástica".
-- NUNCA uses la palabra "pots" sola; usa "terracotta plant pots" o "heavy garden planters".
-
-Responde SOLO con el prompt final en inglés, asegurando que empiece por: "A professional cinematic photograph of...". Agrega al final: ", 8k, highly detailed, sharp focus, RAW photo quality, Kodak Portra 400 style, NO TEXT, no words, no letters, no labels, blank surfaces"
 """
 
-            response = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=enhancement_prompt
+            enhanced = generate_text(
+                enhancement_prompt,
+                model=ENHANCE_MODEL,
+                system_instruction=ART_DIRECTION_INSTRUCTIONS,
+                agent="visual_generator"
             )
             
-            enhanced = response.text.strip()
+            enhanced = enhanced.strip()
             enhanced = enhanced.strip('"').strip("'")
-            return enhanced
+            return enhanced or original_prompt
             
         except Exception as e:
             return original_prompt
 
 
-    def generate_image(self, prompt: str, filename: str) -> str:
+    def generate_image(self, prompt: str, filename: str, use_cache: bool = True, store=None) -> str:
         """
         Genera imagen usando Flux-Schnell.
+        Si el mismo prompt final ya se generó con los mismos parámetros,
+        se reutiliza la imagen del caché sin llamar a la API.
         
         Args:
             prompt: Prompt visual en inglés (mejorado)
             filename: Nombre del archivo
+            use_cache: False para forzar una imagen nueva (botón Regenerar);
+                el resultado reemplaza la entrada del caché
+            store: ProjectAssetStore opcional; si se indica, la imagen se
+                guarda en la carpeta del proyecto en lugar de assets/images
         """
         if not self.is_ready():
             st.error("❌ Together Client no inicializado.")
             return None
 
         try:
-            output_dir = os.path.join("assets", "images")
-            os.makedirs(output_dir, exist_ok=True)
-
             if not filename.lower().endswith(".png"):
                 filename = filename.rsplit(".", 1)[0] + ".png"
             
-            output_path = os.path.join(output_dir, filename)
+            if store is not None:
+                output_path = store.path("images", filename)
+            else:
+                output_dir = os.path.join("assets", "images")
+                os.makedirs(output_dir, exist_ok=True)
+                output_path = os.path.join(output_dir, filename)
 
             # ✨ REFUERZO DE SEGURIDAD CONTRA TEXTO (Pesado al inicio)
             # Ponemos las restricciones al inicio porque los modelos dan más peso a las primeras palabras
             final_prompt = f"CLEAN IMAGE WITHOUT ANY TEXT OR WORDS, NO LETTERS, NO TYPOGRAPHY, NO LABELS, {prompt}"
 
-            response = self.client.images.generate(
+            cache_key = self.cache.key_for(
+                prompt=final_prompt, model=self.model, width=self.width,
+                height=self.height, steps=self.steps, seed=self.seed
+            )
+            if use_cache:
+                cached = self.cache.fetch(cache_key, ".png", output_path)
+                if cached:
+                    print(f"[CACHE] Imagen reutilizada: {prompt[:40]}...")
+                    if store is not None:
+                        store.record("images", filename, prompt=prompt[:200])
+                    return cached
+
+            request = dict(
                 prompt=final_prompt,
-                model="black-forest-labs/FLUX.1-schnell",
-                width=1024,
-                height=1792,
-                steps=4,
+                model=self.model,
+                width=self.width,
+                height=self.height,
+                steps=self.steps,
                 n=1,
                 response_format="b64_json"
             )
-
-            if response.data and len(response.data) > 0:
-                image_data = base64.b64decode(response.data[0].b64_json)
-                with open(output_path, "wb") as f:
-                    f.write(image_data)
+            if self.seed is not None:
+                request["seed"] = self.seed
+
+            image_data = None
+            with track("visual_generator", provider="together", operation="image",
+                       bytes_in=len(final_prompt)) as t:
+                response = self.client.images.generate(**request)
+                if response.data and len(response.data) > 0:
+                    image_data = base64.b64decode(response.data[0].b64_json)
+                    t.bytes_out = len(image_data)
+                else:
+                    t.fail()
+
+            if image_data:
+                with atomic_output(output_path) as tmp_path:
+                    with open(tmp_path, "wb") as f:
+                        f.write(image_data)
                 
                 if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+                    self.cache.store(cache_key, output_path, meta={"prompt": prompt[:200]})
+                    if store is not None:
+                        store.record("images", filename, prompt=prompt[:200])
                     return output_path
                 
             return None
@@ -24,6 +24,7 @@ class VisualPromptGeneratorAgent(BaseAgent):
             raise ValueError("GEMINI_API_KEY not configured")
         
         self.client = genai.Client(api_key=GEMINI_API_KEY)
+        self.provider = "gemini"
         self.model_name = GEMINI_MODEL or "gemini-2.0-flash"
     
     def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
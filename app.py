@@ -1,6 +1,7 @@
 import streamlit as st
 import json
 import os
+import hashlib
 import PIL.Image
 # FIX: Parche de compatibilidad para MoviePy 1.0.3 con Pillow reciente
 if not hasattr(PIL.Image, 'ANTIALIAS'):
@@ -10,9 +11,16 @@ if not hasattr(PIL.Image, 'ANTIALIAS'):
 from agents.scriptwriter import ScriptWriterAgent
 from agents.audio_generator import AudioGeneratorAgent
 from agents.visual_generator import VisualGeneratorAgent
-from agents.video_editor import VideoEditorAgent
+from agents.video_editor import VideoEditorAgent, render_in_background
 from agents.veo_generator import VeoGeneratorAgent
 from agents.researcher import ResearcherAgent
+from utils.asset_scheduler import generate_scene_assets
+from utils.gemini_client import get_gemini_client, generate_text
+from utils.asset_store import ProjectAssetStore
+from utils.veo_jobs import VeoJobManager
+from utils.tracing import start_trace, write_project_report
+from utils.render_profiles import PROFILES, get_profile
+from utils.database import get_db, create_project, update_project_script, update_scene_image, update_scene_audio
   # NUEVO AGENTE - Fase 4
 
 
@@ -139,6 +147,15 @@ Precio promocional: $17 USD
 PRODUCTO_TEMPLATE = PRODUCTOS_DISPONIBLES["🍊 Frutíferas en Macetas"]["template"]
 HOOK_TO_CHAPTER = PRODUCTOS_DISPONIBLES["🍊 Frutíferas en Macetas"]["hooks"]
 
+# --- ASSETS POR PROYECTO ---
+def get_asset_store():
+    """
+    Store de assets del proyecto activo (carpeta propia por proyecto, para
+    que varias sesiones no se pisen los scene_N). None si aún no hay proyecto.
+    """
+    project_id = st.session_state.get('project_id')
+    return ProjectAssetStore(project_id) if project_id else None
+
 # --- GENERADOR DE IDEAS DE TEMAS ---
 def generate_ideas_tema(producto_tipo: str = "general") -> list:
     """
@@ -150,7 +167,7 @@ def generate_ideas_tema(producto_tipo: str = "general") -> list:
     Returns:
         Lista de 5 ideas de temas
     """
-    from agents.scriptwriter import client
+    client = get_gemini_client()
     
     if not client:
         return ["❌ Gemini no disponible - verifica API key"]
@@ -233,15 +250,11 @@ def generate_auto_escenas(tema: str, producto: str, hook: str, producto_config:
     Returns:
         Lista de diccionarios con 'texto' y 'prompt' para cada escena
     """
-    from google import genai
-    
-    # Validar cliente Gemini
-    if "GOOGLE_API_KEY" not in st.secrets:
+    # Validar cliente Gemini (compartido)
+    if not get_gemini_client():
         st.error("❌ GOOGLE_API_KEY no configurado en secrets.toml")
         return []
     
-    client = genai.Client(api_key=st.secrets["GOOGLE_API_KEY"])
-    
     # Si no se proporciona producto_config, usar valores legacy
     if producto_config is None:
         producto_config = PRODUCTOS_DISPONIBLES["🍊 Frutíferas en Macetas"]
@@ -323,22 +336,17 @@ EJEMPLOS INCORRECTOS:
 """
 
     try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt
-        )
+        # Sin memo: cada clic en AUTO-GENERAR debe dar escenas nuevas
+        response_text = generate_text(prompt, model="gemini-2.0-flash", memo=False)
         
         # Parsear respuesta
-        escenas = parse_gemini_scenes(response.text)
+        escenas = parse_gemini_scenes(response_text)
         
         if len(escenas) != 4:
             st.warning(f"⚠️ Se esperaban 4 escenas, se obtuvieron {len(escenas)}. Reintentando...")
             # Reintentar una vez
-            response = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=prompt
-            )
-            escenas = parse_gemini_scenes(response.text)
+            response_text = generate_text(prompt, model="gemini-2.0-flash", memo=False)
+            escenas = parse_gemini_scenes(response_text)
         
         return escenas
         
@@ -430,6 +438,8 @@ if 'assets_ready' not in st.session_state:
     st.session_state['assets_ready'] = False
 if 'final_video_path' not in st.session_state:
     st.session_state['final_video_path'] = None
+if 'preview_video_path' not in st.session_state:
+    st.session_state['preview_video_path'] = None
 if 'audio_agent' not in st.session_state:
     st.session_state.audio_agent = AudioGeneratorAgent()
 if 'visual_agent' not in st.session_state:
@@ -439,6 +449,12 @@ if 'researcher_agent' not in st.session_state:
 if 'url_data' not in st.session_state:
     st.session_state.url_data = None
 
+# Traza de la producción actual: los spans de cada paso (y de cada rerun) se
+# agrupan bajo el mismo trace_id hasta que se empieza un proyecto nuevo
+st.session_state['trace_id'] = start_trace(
+    st.session_state.get('trace_id'), st.session_state.get('project_id')
+)
+
 # --- BARRA LATERAL (OPS CENTER) ---
 with st.sidebar:
     st.title("🎬 OPS CENTER v2.0")
@@ -495,11 +511,43 @@ with st.sidebar:
     st.markdown("**🎵 Música de Fondo (Opcional):**")
     uploaded_music = st.file_uploader("Subir MP3/WAV", type=["mp3", "wav"], key="music_upload")
     if uploaded_music:
-        os.makedirs("assets", exist_ok=True)
-        music_path = os.path.join("assets", "background_music.mp3")
-        with open(music_path, "wb") as f:
-            f.write(uploaded_music.getbuffer())
+        # Nombre por contenido: cada sesión conserva su propia pista
+        music_bytes = uploaded_music.getbuffer()
+        music_dir = os.path.join("assets", "music")
+        os.makedirs(music_dir, exist_ok=True)
+        music_ext = os.path.splitext(uploaded_music.name)[1].lower() or ".mp3"
+        music_path = os.path.join(music_dir, hashlib.sha1(music_bytes).hexdigest() + music_ext)
+        if not os.path.exists(music_path):
+            with open(music_path, "wb") as f:
+                f.write(music_bytes)
+        st.session_state['music_path'] = music_path
         st.success(" Música lista para Fase 4")
+    else:
+        st.session_state['music_path'] = None
+    
+    st.markdown("---")
+    
+    # Render por escenas (un proceso por núcleo + caché de segmentos) para Fase 4
+    st.markdown("**⚡ Renderizado:**")
+    st.session_state.parallel_render = st.checkbox(
+        "Render por escena (paralelo e incremental)",
+        value=st.session_state.get('parallel_render', True),
+        help="Codifica cada escena en un proceso separado y une los segmentos sin re-codificar. Los segmentos quedan en caché: al regenerar una imagen o un audio solo se vuelve a codificar esa escena."
+    )
+    st.session_state.streaming_render = st.checkbox(
+        "Render streaming (memoria baja)",
+        value=st.session_state.get('streaming_render', False),
+        disabled=st.session_state.parallel_render,
+        help="Renderiza escena por escena enviando los frames a un solo ffmpeg. La memoria no crece con la duración del video; útil en servidores pequeños."
+    )
+    final_profiles = [name for name in PROFILES if name != "preview"]
+    st.session_state.render_profile = st.selectbox(
+        "Perfil del render final",
+        final_profiles,
+        index=final_profiles.index(st.session_state.get('render_profile', 'final')),
+        format_func=lambda name: PROFILES[name].label,
+        help="La Fase 4 muestra primero un preview 540p en segundos y genera este perfil en segundo plano. 'Social upload' usa 30 fps y limita el bitrate pico para las plataformas."
+    )
     
     st.markdown("---")
     if st.button("🔄 Nuevo Proyecto"):
@@ -507,6 +555,12 @@ with st.sidebar:
         st.session_state['script_data'] = {}
         st.session_state['assets_ready'] = False
         st.session_state['final_video_path'] = None
+        st.session_state['preview_video_path'] = None
+        st.session_state['final_render'] = None
+        st.session_state['final_render_error'] = False
+        st.session_state['project_id'] = None
+        st.session_state['trace_id'] = None
+        st.session_state['trace_report'] = None
         st.rerun()
 
 # ========================================================================
@@ -926,6 +980,13 @@ elif st.session_state['step'] == 2:
             else:
                 # Todo OK, guardar cambios y avanzar
                 st.session_state['script_data']['scenes'] = updated_scenes
+                
+                # Proyecto en la base de datos: su id aísla los assets de esta sesión
+                if not st.session_state.get('project_id'):
+                    st.session_state['project_id'] = create_project(
+                        st.session_state['script_data'].get('title', 'Video')
+                    )
+                update_project_script(st.session_state['project_id'], st.session_state['script_data'])
                 st.session_state['step'] = 3
                 st.success("✅ Plan aprobado. Iniciando motores de producción...")
                 st.rerun()
@@ -947,6 +1008,12 @@ elif st.session_state['step'] == 3:
     else:
         st.header("🎨 Fase 3: Producción de Assets")
         st.info(f"🚀 Modo Activo: {'🎥 VIDEO (Veo)' if st.session_state.use_video else '🖼️ IMAGEN (Flux)'}")
+        
+        # Clips Veo lanzados antes de una recarga: se reanudan, no se vuelven a pedir
+        if st.session_state.get('project_id') and st.session_state.veo_agent.is_ready():
+            pending_veo = VeoJobManager(st.session_state.veo_agent).pending_jobs(st.session_state['project_id'])
+            if pending_veo:
+                st.info(f"⏳ {len(pending_veo)} clip(s) Veo en curso de una sesión anterior; se reanudarán al generar los assets.")
 
     if st.button("🚀 GENERAR / ACTUALIZAR TODOS LOS ASSETS"):
         # Preparar contenedores
@@ -956,59 +1023,28 @@ elif st.session_state['step'] == 3:
         # Procesar escenas
         scenes = st.session_state['script_data'].get('scenes', [])
         total_scenes = len(scenes)
-        total_steps = total_scenes * 2
-        current_step = 0
         
-        generated_assets = []
-        errors = []
+        status_text.markdown(f"### 🎬 Procesando {total_scenes} escenas en paralelo...")
         
-        # 🎬 PROCESAR CADA ESCENA
-        for i, scene in enumerate(scenes):
-            scene_num = i + 1
-            status_text.markdown(f"### 🎬 Procesando Escena {scene_num}/{total_scenes}...")
-            
-            # 1️⃣ GENERAR AUDIO
-            status_text.text(f"🎙️ Generando audio para escena {scene_num}...")
-            audio_file = f"scene_{scene_num}.mp3"
-            audio_path = st.session_state.audio_agent.generate_narration(scene['narration'], audio_file)
-            
-            if audio_path:
-                scene['audio_path'] = audio_path
-            else:
-                errors.append(f"Audio escena {scene_num}")
-            
-            current_step += 1
-            asset_progress.progress(current_step / total_steps)
-            
-            # 2️⃣ GENERAR VISUAL (Imagen o Video)
-            if st.session_state.use_video:
-                status_text.text(f"🎥 Generando video Veo para escena {scene_num} (espera ~60s)...")
-                video_path = st.session_state.veo_agent.generate_video_clip(scene['visual_prompt'])
-                if video_path:
-                    scene['image_path'] = video_path
-                else:
-                    errors.append(f"Video Veo escena {scene_num}")
-            else:
-                status_text.text(f"🖼️ Mejorando prompt y generando imagen para escena {scene_num}...")
-                
-                # 🆕 MEJORAR PROMPT VISUAL para coherencia con la narración
-                original_prompt = scene['visual_prompt']
-                narration = scene.get('narration', '')
-                enhanced_prompt = st.session_state.visual_agent.enhance_visual_prompt(original_prompt, narration)
-                
-                # Guardar el prompt mejorado para debug
-                scene['enhanced_prompt'] = enhanced_prompt
-                
-                img_file = f"scene_{scene_num}.png"
-                image_path = st.session_state.visual_agent.generate_image(enhanced_prompt, img_file)
-                if image_path:
-                    scene['image_path'] = image_path
-                else:
-                    errors.append(f"Imagen Flux escena {scene_num}")
-            
-            current_step += 1
-            asset_progress.progress(current_step / total_steps)
-            generated_assets.append(scene)
+        def update_progress(done, total, message):
+            asset_progress.progress(done / total)
+            status_text.text(f"{message} ({done}/{total})")
+        
+        # 🎬 PROCESAR TODAS LAS ESCENAS EN PARALELO (límites por proveedor)
+        errors = generate_scene_assets(
+            scenes,
+            audio_agent=st.session_state.audio_agent,
+            visual_agent=st.session_state.visual_agent,
+            veo_agent=st.session_state.veo_agent,
+            use_video=st.session_state.use_video,
+            on_progress=update_progress,
+            store=get_asset_store()
+        )
+        generated_assets = scenes
+        
+        # Persistir rutas y prompts de todo el lote en una sola transacción
+        if st.session_state.get('project_id'):
+            get_db().upsert_scenes(st.session_state['project_id'], scenes)
             
         # 🎉 RESULTADO FINAL
         asset_progress.progress(1.0)
@@ -1104,12 +1140,14 @@ elif st.session_state['step'] == 3.5:
                             prompt_to_use = new_prompt if new_prompt.strip() else scene.get('visual_prompt', '')
                             scene['visual_prompt'] = prompt_to_use  # Actualizar en sesión
                             
-                            # Generar nueva imagen
+                            # Generar nueva imagen (sin caché: se pide una variante nueva)
                             img_file = f"scene_{scene_num}.png"
-                            img_path = visual_agent.generate_image(prompt_to_use, img_file)
+                            img_path = visual_agent.generate_image(prompt_to_use, img_file, use_cache=False, store=get_asset_store())
                             
                             if img_path:
                                 scene['image_path'] = img_path
+                                if st.session_state.get('project_id'):
+                                    update_scene_image(st.session_state['project_id'], scene_num, img_path)
                                 st.success("✅ Imagen regenerada")
                                 st.rerun()
                             else:
@@ -1124,10 +1162,12 @@ elif st.session_state['step'] == 3.5:
                             
                             # Generar nuevo audio
                             audio_file = f"scene_{scene_num}.mp3"
-                            audio_path = audio_agent.generate_narration(scene['narration'], audio_file)
+                            audio_path = audio_agent.generate_narration(scene['narration'], audio_file, store=get_asset_store())
                             
                             if audio_path:
                                 scene['audio_path'] = audio_path
+                                if st.session_state.get('project_id'):
+                                    update_scene_audio(st.session_state['project_id'], scene_num, audio_path)
                                 st.success("✅ Audio regenerado")
                                 st.rerun()
                             else:
@@ -1153,6 +1193,11 @@ elif st.session_state['step'] == 3.5:
             
             if all_ready:
                 if st.button("🎬 Continuar al Ensamblaje Final", use_container_width=True, type="primary"):
+                    # Re-render con los assets actuales (las escenas sin cambios salen de la caché)
+                    st.session_state['final_video_path'] = None
+                    st.session_state['preview_video_path'] = None
+                    st.session_state['final_render'] = None
+                    st.session_state['final_render_error'] = False
                     st.session_state['step'] = 4
                     st.rerun()
             else:
@@ -1165,27 +1210,34 @@ elif st.session_state['step'] == 4:
     st.title("🎬 Fase 4: Renderizado Final")
     st.markdown("Ensamblando video con: **Zoom Ken Burns + Subtítulos Hormozi + Audio Ducking**")
     
-    # Si no se ha renderizado aún
-    if not st.session_state['final_video_path']:
-        with st.spinner("🔥 Ensamblando clips, aplicando zoom y mezclando audio... (Esto puede tardar 1-3 min)"):
+    scenes = st.session_state['script_data']['scenes']
+    
+    # Verificar si hay música de fondo cargada
+    music_file = st.session_state.get('music_path')
+    if not music_file or not os.path.exists(music_file):
+        music_file = None
+    
+    render_options = dict(
+        music_path=music_file,
+        parallel=st.session_state.get('parallel_render', False),
+        streaming=st.session_state.get('streaming_render', False),
+        store=get_asset_store()
+    )
+    
+    # 1) Preview rápido (540p, ultrafast) para revisar en segundos
+    if not st.session_state['final_video_path'] and not st.session_state['preview_video_path']:
+        if music_file:
+            st.info("🎵 Música de fondo detectada. Aplicando audio ducking al 15%.")
+        else:
+            st.info("ℹ️ Sin música de fondo. Generando video solo con narración.")
+        
+        with st.spinner("⚡ Generando preview rápido (540p)..."):
             try:
-                editor = VideoEditorAgent()
-                scenes = st.session_state['script_data']['scenes']
-                
-                # Verificar si hay música de fondo cargada
-                music_file = os.path.join("assets", "background_music.mp3")
-                if not os.path.exists(music_file):
-                    music_file = None
-                    st.info("ℹ️ Sin música de fondo. Generando video solo con narración.")
-                else:
-                    st.info("🎵 Música de fondo detectada. Aplicando audio ducking al 15%.")
-                
-                # Ensamblar video
-                video_path = editor.assemble_video(scenes, music_path=music_file)
-                
-                if video_path:
-                    st.session_state['final_video_path'] = video_path
-                    st.balloons()
+                preview_path = VideoEditorAgent().assemble_video(
+                    scenes, output_filename="preview_video.mp4", profile="preview", **render_options
+                )
+                if preview_path:
+                    st.session_state['preview_video_path'] = preview_path
                 else:
                     st.error("❌ Error en el renderizado. Revisa los logs arriba para más detalles.")
                     
@@ -1193,6 +1245,36 @@ elif st.session_state['step'] == 4:
                 st.error(f"❌ Error crítico durante renderizado: {e}")
                 import traceback
                 st.code(traceback.format_exc())
+    
+    # 2) Render final en segundo plano (perfil elegido en la barra lateral)
+    if st.session_state['preview_video_path'] and not st.session_state['final_video_path'] \
+            and st.session_state.get('final_render') is None and not st.session_state.get('final_render_error'):
+        st.session_state['final_profile'] = st.session_state.get('render_profile', 'final')
+        st.session_state['final_render'] = render_in_background(
+            scenes,
+            output_filename=f"{st.session_state['final_profile']}_video.mp4",
+            profile=st.session_state['final_profile'],
+            **render_options
+        )
+    
+    final_render = st.session_state.get('final_render')
+    if final_render is not None and final_render.done():
+        st.session_state['final_render'] = None
+        render_error = None
+        try:
+            video_path = final_render.result()
+        except Exception as e:
+            render_error = str(e)
+            video_path = None
+        
+        if video_path:
+            st.session_state['final_video_path'] = video_path
+            if st.session_state.get('project_id'):
+                st.session_state['trace_report'] = write_project_report(st.session_state['project_id'])
+            st.balloons()
+        else:
+            # El motivo se conserva para mostrarlo junto al preview
+            st.session_state['final_render_error'] = render_error or True
 
     # Mostrar resultado si existe
     if st.session_state['final_video_path']:
@@ -1205,13 +1287,14 @@ elif st.session_state['step'] == 4:
         st.markdown("---")
         
         # Información del video
+        final_profile = get_profile(st.session_state.get('final_profile'))
         col1, col2 = st.columns(2)
         with col1:
             st.metric("Formato", "9:16 Vertical (Shorts/Reels/TikTok)")
-            st.metric("FPS", "24 (Cinematográfico)")
+            st.metric("FPS", str(final_profile.fps))
         with col2:
             st.metric("Codec", "H.264 + AAC")
-            st.metric("Resolución", "1080x1920")
+            st.metric("Resolución", f"{final_profile.width}x{final_profile.height}")
         
         st.markdown("---")
         
@@ -1225,6 +1308,18 @@ elif st.session_state['step'] == 4:
                 use_container_width=True
             )
         
+        # Timeline de la producción (dónde se fue el tiempo de cada paso)
+        trace_report = st.session_state.get('trace_report')
+        if trace_report and os.path.exists(trace_report):
+            with open(trace_report, "rb") as file:
+                st.download_button(
+                    label="📊 Descargar timeline de producción (HTML)",
+                    data=file,
+                    file_name=os.path.basename(trace_report),
+                    mime="text/html",
+                    use_container_width=True
+                )
+        
         st.markdown("---")
         
         # Opciones adicionales
@@ -1234,7 +1329,13 @@ elif st.session_state['step'] == 4:
                 st.session_state['step'] = 1
                 st.session_state['script_data'] = {}
                 st.session_state['final_video_path'] = None
+                st.session_state['preview_video_path'] = None
+                st.session_state['final_render'] = None
+                st.session_state['final_render_error'] = False
                 st.session_state['assets_ready'] = False
+                st.session_state['project_id'] = None
+                st.session_state['trace_id'] = None
+                st.session_state['trace_report'] = None
                 st.rerun()
         
         with col_back:
@@ -1242,6 +1343,34 @@ elif st.session_state['step'] == 4:
                 st.session_state['step'] = 3
                 st.rerun()
     
+    elif st.session_state['preview_video_path']:
+        st.subheader("👀 Preview rápido (540p)")
+        st.video(st.session_state['preview_video_path'])
+        
+        render_error = st.session_state.get('final_render_error')
+        if render_error:
+            reason = f": {render_error}" if isinstance(render_error, str) else ""
+            st.error(f"❌ Falló el render final{reason}. El preview sigue disponible.")
+            if st.button("🔁 Reintentar render final", use_container_width=True):
+                st.session_state['final_render_error'] = False
+                st.rerun()
+        else:
+            # Se consulta el render en segundo plano sin bloquear la página
+            @st.fragment(run_every=2)
+            def final_render_status():
+                final_render = st.session_state.get('final_render')
+                if final_render is None or final_render.done():
+                    st.rerun()
+                profile = get_profile(st.session_state.get('final_profile'))
+                st.info(f"⏳ Renderizando la versión final ({profile.label}) en segundo plano. "
+                        "Puedes revisar el preview mientras tanto.")
+            
+            final_render_status()
+        
+        if st.button("← Volver a Producción de Assets"):
+            st.session_state['step'] = 3
+            st.rerun()
+    
     else:
         # Si falló el renderizado, permitir volver
         if st.button("← Volver a Producción de Assets"):
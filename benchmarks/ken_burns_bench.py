@@ -0,0 +1,64 @@
+"""
+Ken Burns throughput benchmark.
+
+Compares frames/s of the original MoviePy resize path against the
+vectorized KenBurnsRenderer at each quality level.
+
+Usage:
+    python benchmarks/ken_burns_bench.py [--image path.png] [--frames 48]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from agents.video_editor import VideoEditorAgent
+from utils.ken_burns import ZOOM_QUALITIES
+
+
+def make_test_image(path: str, width: int = 1024, height: int = 1792) -> str:
+    """Write a gradient + noise PNG with the Flux-Schnell output size."""
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    noise = np.random.default_rng(0).integers(0, 32, (height, width), dtype=np.uint8)
+    rgb = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    rgb = np.clip(rgb + noise[..., None], 0, 255).astype(np.uint8)
+    Image.fromarray(rgb).save(path)
+    return path
+
+
+def measure(clip, frames: int, duration: float) -> float:
+    """Render `frames` evenly spaced frames and return frames/s."""
+    start = time.perf_counter()
+    for i in range(frames):
+        clip.get_frame(duration * i / frames)
+    return frames / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--image", help="Still image to animate (default: synthetic 1024x1792)")
+    parser.add_argument("--frames", type=int, default=48, help="Frames to render per case")
+    parser.add_argument("--duration", type=float, default=5.0, help="Clip duration in seconds")
+    args = parser.parse_args()
+
+    image = args.image or make_test_image(os.path.join(tempfile.gettempdir(), "ken_burns_bench.png"))
+    editor = VideoEditorAgent()
+
+    baseline = measure(editor.create_zoom_clip_moviepy(image, args.duration), args.frames, args.duration)
+    print(f"{'moviepy resize':<16} {baseline:8.1f} fps   1.00x")
+
+    for quality in ZOOM_QUALITIES:
+        fps = measure(editor.create_zoom_clip(image, args.duration, quality=quality), args.frames, args.duration)
+        print(f"{'renderer ' + quality:<16} {fps:8.1f} fps {fps / baseline:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
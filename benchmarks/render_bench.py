@@ -0,0 +1,308 @@
+"""
+Render benchmark.
+
+Synthesizes N scenes (gradient PNGs, sine-burst narration MP3s and,
+optionally, short MP4 clips) and times VideoEditorAgent.assemble_video
+(serial, parallel and streaming, per render
+profile) and SubtitleGeneratorAgent.generate_subtitles for every scene
+count / scene duration combination. The "incremental" mode renders once
+with the segment cache, replaces one scene's image and times the
+re-render (parallel mode, one dirty scene). Each case runs in its own
+process (with its own scratch database), so peak RSS is per case and the
+real project database is never touched. Reports frames/s, wall time, peak
+RSS of the Python process and of its largest child (ffmpeg, render
+workers), output size and the time spent in each traced render phase.
+
+Usage:
+    python benchmarks/render_bench.py [--scenes 3 5] [--durations 3 6]
+        [--modes serial parallel streaming incremental subtitles] [--video-scenes]
+        [--profiles preview final social]
+        [--output results.json] [--compare baseline.json]
+
+Subtitle sprites are cached under assets/cache/subtitles, so runs after
+the first one measure a warm sprite cache.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.render_profiles import PROFILES
+
+MODES = ("serial", "parallel", "streaming", "incremental", "subtitles")
+
+NARRATION = "Tu jardín puede dar frutas todo el año sin ocupar espacio"
+
+# Timing metrics compared against a baseline (True: higher is better)
+COMPARED_METRICS = {"wall_time": False, "fps": True}
+
+
+def make_gradient_image(path: str, index: int, width: int = 1024, height: int = 1792) -> str:
+    """Write a gradient PNG (Flux-Schnell output size), tinted per scene."""
+    import numpy as np
+    from PIL import Image
+
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    tint = (index * 53) % 256
+    rgb = np.stack([255 * x + 0 * y, 255 * y + 0 * x, tint + 0 * (x + y)], axis=-1)
+    Image.fromarray(np.clip(rgb, 0, 255).astype(np.uint8)).save(path)
+    return path
+
+
+def make_narration(path: str, duration: float, index: int) -> str:
+    """Write an MP3 of sine bursts (word-like on/off regions for caption alignment)."""
+    from utils.ffmpeg_tools import run_ffmpeg
+
+    frequency = 180 + 40 * index
+    expression = f"0.5*sin(2*PI*{frequency}*t)*gt(sin(2*PI*1.6*t),-0.3)"
+    run_ffmpeg([
+        "-f", "lavfi", "-i", f"aevalsrc='{expression}':s=44100:d={duration}",
+        "-c:a", "libmp3lame", "-b:a", "128k", path
+    ])
+    return path
+
+
+def make_clip(path: str, duration: float) -> str:
+    """Write a short synthetic MP4 (stand-in for a Veo clip)."""
+    from utils.ffmpeg_tools import run_ffmpeg
+
+    run_ffmpeg([
+        "-f", "lavfi", "-i", f"testsrc2=size=720x1280:rate=24:duration={duration}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", path
+    ])
+    return path
+
+
+def synthesize_scenes(directory: str, count: int, duration: float, video_scenes: bool = False) -> list:
+    """Create the assets of `count` scenes; every other scene is a clip with video_scenes."""
+    scenes = []
+    for i in range(count):
+        audio_path = make_narration(os.path.join(directory, f"scene_{i + 1}.mp3"), duration, i)
+        if video_scenes and i % 2 == 1:
+            image_path = make_clip(os.path.join(directory, f"scene_{i + 1}.mp4"), duration)
+        else:
+            image_path = make_gradient_image(os.path.join(directory, f"scene_{i + 1}.png"), i)
+        scenes.append({
+            "id": i + 1,
+            "narration": NARRATION,
+            "audio_path": audio_path,
+            "image_path": image_path,
+        })
+    return scenes
+
+
+def peak_rss_mb(children: bool = False) -> float:
+    """
+    Peak resident set size in MB of this process, or of its largest finished
+    child (ffmpeg encoders/readers, render workers) with children=True.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(case: dict) -> dict:
+    """Run one case in this process and return its measurements."""
+    work_dir = tempfile.mkdtemp(prefix="render_bench_")
+    try:
+        return _measure_case(case, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _measure_case(case: dict, work_dir: str) -> dict:
+    from utils.database import get_db
+    from utils.tracing import flush, start_trace
+
+    scenes = synthesize_scenes(work_dir, case["scenes"], case["duration"], case["video_scenes"])
+    trace_id = start_trace()
+
+    if case["mode"] == "subtitles":
+        from agents.subtitle_generator import SubtitleGeneratorAgent
+
+        total_duration = sum(case["duration"] + 0.2 for _ in scenes)
+        fps = 24
+        start = time.perf_counter()
+        composite = SubtitleGeneratorAgent().generate_subtitles({"scenes": scenes}, total_duration)
+        frames = sum(1 for _ in composite.iter_frames(fps=fps)) if composite else 0
+        wall_time = time.perf_counter() - start
+        output_bytes = None
+    else:
+        from agents.video_editor import VideoEditorAgent
+        from utils.asset_cache import AssetCache
+
+        editor = VideoEditorAgent()
+        editor.output_dir = work_dir
+        # Scratch segment cache: cases never reuse segments from other runs
+        editor.segment_cache = AssetCache("segments", editor.segment_cache.max_bytes, root=work_dir)
+        render = dict(
+            output_filename="bench.mp4", max_workers=case.get("workers"), profile=case.get("profile"),
+            parallel=case["mode"] in ("parallel", "incremental"), streaming=case["mode"] == "streaming"
+        )
+        if case["mode"] == "incremental":
+            # Warm the cache, then regenerate one scene as step 3.5 would
+            if not editor.assemble_video(scenes, **render):
+                raise RuntimeError("assemble_video returned no output")
+            scenes[0]["image_path"] = make_gradient_image(
+                os.path.join(work_dir, "scene_1_regenerated.png"), len(scenes) + 1
+            )
+            trace_id = start_trace()
+
+        start = time.perf_counter()
+        output_path = editor.assemble_video(scenes, **render)
+        wall_time = time.perf_counter() - start
+        if not output_path:
+            raise RuntimeError("assemble_video returned no output")
+        frames = int(sum(case["duration"] + 0.2 for _ in scenes) * editor.fps)
+        output_bytes = os.path.getsize(output_path)
+
+    flush()
+    phases = {}
+    for span in get_db().get_trace_spans(trace_id=trace_id):
+        if span["name"].startswith("render.") and span["name"] != "render.assemble":
+            phases[span["name"]] = round(phases.get(span["name"], 0.0) + span["duration"], 3)
+
+    return dict(
+        case,
+        wall_time=round(wall_time, 3),
+        frames=frames,
+        fps=round(frames / wall_time, 2) if wall_time else 0.0,
+        peak_rss_mb=round(peak_rss_mb(), 1),
+        child_peak_rss_mb=round(peak_rss_mb(children=True), 1),
+        output_bytes=output_bytes,
+        phases=phases,
+    )
+
+
+def case_key(case: dict) -> str:
+    clips = "+clips" if case["video_scenes"] else ""
+    profile = case.get("profile") or "final"
+    profile = "" if profile == "final" else f"@{profile}"
+    return f"{case['mode']}{clips}{profile} {case['scenes']}x{case['duration']:g}s"
+
+
+def run_isolated(case: dict, db_path: str) -> dict:
+    """Run a case in a fresh interpreter (per-case peak RSS, scratch database)."""
+    env = dict(os.environ, VIDEO_STUDIO_DB=db_path)
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-case", json.dumps(case)],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+    if result.returncode != 0 or not lines:
+        return dict(case, error=(result.stderr.strip().splitlines() or ["no output"])[-1])
+    return json.loads(lines[-1])
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def compare(results: list, baseline_path: str, threshold: float) -> int:
+    """Print deltas against a baseline file; return the number of regressions."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {case_key(case): case for case in baseline.get("cases", []) if "error" not in case}
+
+    print(f"\nComparison with {baseline_path} (commit {baseline.get('commit') or '?'}):")
+    regressions = 0
+    for case in results:
+        old = previous.get(case_key(case))
+        if old is None or "error" in case:
+            continue
+        deltas = []
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if not old.get(metric):
+                continue
+            change = (case[metric] - old[metric]) / old[metric] * 100
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > threshold:
+                flag = " REGRESSION"
+                regressions += 1
+            deltas.append(f"{metric} {old[metric]:g} -> {case[metric]:g} ({change:+.1f}%){flag}")
+        print(f"  {case_key(case):<28} " + "; ".join(deltas))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenes", type=int, nargs="+", default=[3, 5], help="Scene counts")
+    parser.add_argument("--durations", type=float, nargs="+", default=[3.0], help="Seconds per scene")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--video-scenes", action="store_true", help="Use MP4 clips for every other scene")
+    parser.add_argument("--profiles", nargs="+", choices=list(PROFILES), default=["final"],
+                        help="Render profiles for the editor modes (default: final)")
+    parser.add_argument("--workers", type=int, help="Processes for the parallel mode (default: cores)")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON from a previous run")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Percent slowdown reported as a regression (default: 10)")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(json.loads(args.run_case))))
+        return
+
+    cases = [
+        {"mode": mode, "scenes": scenes, "duration": duration, "profile": profile,
+         "video_scenes": args.video_scenes, "workers": args.workers}
+        for mode in args.modes
+        for profile in (args.profiles if mode != "subtitles" else ["final"])
+        for scenes in args.scenes for duration in args.durations
+    ]
+
+    results = []
+    print(f"{'case':<28} {'wall':>8} {'fps':>8} {'rss MB':>8} {'child MB':>9} {'size KB':>9}")
+    with tempfile.TemporaryDirectory(prefix="render_bench_db_") as db_dir:
+        for case in cases:
+            result = run_isolated(case, os.path.join(db_dir, "bench.db"))
+            results.append(result)
+            if "error" in result:
+                print(f"{case_key(case):<28} ERROR: {result['error']}")
+                continue
+            size = f"{result['output_bytes'] / 1024:9.0f}" if result["output_bytes"] else f"{'-':>9}"
+            print(f"{case_key(case):<28} {result['wall_time']:7.2f}s {result['fps']:8.1f} "
+                  f"{result['peak_rss_mb']:8.1f} {result['child_peak_rss_mb']:9.1f} {size}")
+
+    report = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "cases": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
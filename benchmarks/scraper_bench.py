@@ -0,0 +1,247 @@
+"""
+Channel scraping benchmark (offline).
+
+Runs YouTubeScraper.scrape_channel against a stand-in channel listing
+(pages of 30 videos with a fixed page latency) and a stand-in transcript
+transport (random per-video latency, some videos without transcripts),
+once with a single worker (the old sequential behaviour) and once per
+requested pool size. Then times refresh_channel against a scratch
+database: a first full refresh, a refresh after --new-videos uploads and
+a refresh with no changes, counting listed items and transcript requests.
+Then fills the transcript store with --search-videos synthetic
+transcripts and times full-text searches over it. Finally runs a
+--channels channel batch (utils.channel_batch) that is interrupted after
+--interrupt-after analysis requests and resumed, counting requests and
+prompt tokens against one analysis call per channel.
+
+Usage:
+    python benchmarks/scraper_bench.py [--videos 50] [--latency 0.4] [--workers 4 8 16]
+        [--new-videos 2] [--search-videos 2000] [--channels 100] [--interrupt-after 3]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.youtube_scraper import YouTubeScraper
+
+PAGE_SIZE = 30
+
+WORDS = (
+    "dinero ahorro truco cocina receta error rápido secreto nadie sabe esto "
+    "cambia todo minutos casa fácil barato mejor peor nunca siempre pregunta "
+    "productividad hábito mañana noche gimnasio rutina energía sueño café"
+).split()
+
+
+def fake_channel(count: int, page_latency: float, first: int = 0, stats: dict = None):
+    """Video source stand-in: scrapetube-like renderers, paged, newest first."""
+    def video_source(channel_id=None, channel_url=None):
+        for n, i in enumerate(range(first + count - 1, first - 1, -1)):
+            if n and n % PAGE_SIZE == 0:
+                time.sleep(page_latency)
+            if stats is not None:
+                stats["listed"] = stats.get("listed", 0) + 1
+            yield {
+                "videoId": f"vid{i:05d}",
+                "channelName": "Bench Channel",
+                "title": {"runs": [{"text": f"Video {i}"}]},
+                "viewCountText": {"simpleText": f"{1000 + i} views"},
+                "publishedTimeText": {"simpleText": "1 day ago"},
+                "lengthText": {"simpleText": "0:59"},
+            }
+    return video_source
+
+
+def fake_segments(rng: random.Random, seconds: float = 60.0):
+    """Timed segments of a short: one 6-12 word line every ~2.5 s."""
+    segments, start = [], 0.0
+    while start < seconds:
+        duration = 1.5 + 2 * rng.random()
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 12)))
+        segments.append({"text": text, "start": round(start, 2), "duration": round(duration, 2)})
+        start += duration
+    return segments
+
+
+def fake_transcripts(latency: float, seed: int = 0, stats: dict = None):
+    """Transcript transport stand-in: latency in [0.5, 1.5] x latency, 10% missing."""
+    rng = random.Random(seed)
+    delays = {}
+
+    def fetcher(video_id, languages, timeout):
+        if stats is not None:
+            stats["transcripts"] = stats.get("transcripts", 0) + 1
+        delay = delays.setdefault(video_id, latency * (0.5 + rng.random()))
+        time.sleep(min(delay, timeout))
+        if video_id.endswith("9"):
+            return None
+        return fake_segments(random.Random(video_id))
+    return fetcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--videos", type=int, default=50, help="Videos to scrape")
+    parser.add_argument("--latency", type=float, default=0.4, help="Mean seconds per transcript request")
+    parser.add_argument("--page-latency", type=float, default=0.3, help="Seconds per listing page")
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 8, 16], help="Pool sizes to compare")
+    parser.add_argument("--new-videos", type=int, default=2, help="Uploads between refreshes")
+    parser.add_argument("--search-videos", type=int, default=2000, help="Transcripts in the search benchmark")
+    parser.add_argument("--channels", type=int, default=100, help="Channels in the batch benchmark")
+    parser.add_argument("--channel-videos", type=int, default=10, help="Videos per channel in the batch benchmark")
+    parser.add_argument("--rate", type=float, default=100.0, help="Batch requests per second to the fake host")
+    parser.add_argument("--interrupt-after", type=int, default=3, help="Analysis requests before the simulated crash")
+    args = parser.parse_args()
+
+    fetcher = fake_transcripts(args.latency)
+    baseline = None
+    for workers in [1] + args.workers:
+        scraper = YouTubeScraper(
+            video_source=fake_channel(args.videos, args.page_latency),
+            transcript_fetcher=fetcher,
+            max_workers=workers
+        )
+        start = time.perf_counter()
+        data = scraper.scrape_channel("https://www.youtube.com/@bench", max_videos=args.videos)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+
+        ids = [video["video_id"] for video in data["videos"]]
+        assert ids == sorted(ids, reverse=True), "videos out of listing order"
+        with_transcript = sum(1 for video in data["videos"] if video["transcript"])
+        print(f"workers={workers:<3} {elapsed:7.2f}s {baseline / elapsed:6.1f}x  "
+              f"{data['video_count']} videos, {with_transcript} transcripts, channel={data['channel_name']!r}")
+
+    bench_refresh(args, fetcher)
+
+
+def bench_refresh(args, fetcher):
+    from utils.database import Database
+
+    print()
+    with tempfile.TemporaryDirectory(prefix="scraper_bench_") as db_dir:
+        db = Database(os.path.join(db_dir, "bench.db"))
+        analyses = []
+        steps = (("first refresh", 0), (f"+{args.new_videos} uploads", args.new_videos), ("no changes", args.new_videos))
+        for label, first in steps:
+            stats = {}
+            scraper = YouTubeScraper(
+                video_source=fake_channel(args.videos, args.page_latency, first=first, stats=stats),
+                transcript_fetcher=fake_transcripts(args.latency, stats=stats)
+            )
+            # Offline: count analyses instead of calling Gemini
+            scraper.analyze_channel = lambda data: analyses.append(data) or {"insights": "bench"}
+            start = time.perf_counter()
+            data = scraper.refresh_channel("https://www.youtube.com/@bench", max_videos=args.videos, db=db)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<16} {elapsed:7.2f}s  listed={stats.get('listed', 0):<3} "
+                  f"transcripts={stats.get('transcripts', 0):<3} new={len(data['new_video_ids']):<3} "
+                  f"analysis={'reused' if data['analysis_reused'] else 'run'}")
+        
+        bench_search(args, db)
+        bench_batch(args, db)
+
+
+def fake_channels(videos: int, stats: dict):
+    """Multi-channel video source: ids derived from the channel handle."""
+    def video_source(channel_id=None, channel_url=None):
+        handle = (channel_url or channel_id).rsplit("@", 1)[-1]
+        for i in range(videos - 1, -1, -1):
+            stats["listed"] = stats.get("listed", 0) + 1
+            yield {
+                "videoId": f"{handle}-{i:03d}",
+                "channelName": handle,
+                "title": {"runs": [{"text": f"{handle} video {i}"}]},
+                "viewCountText": {"simpleText": f"{1000 + i} views"},
+            }
+    return video_source
+
+
+def fake_generate(stats: dict, interrupt_after: int = None):
+    """Analysis stand-in: one analysis per channel URL found in the prompt."""
+    def generate(prompt):
+        if interrupt_after is not None and stats.get("requests", 0) >= interrupt_after:
+            raise KeyboardInterrupt("simulated crash")
+        urls = re.findall(r'"channel_url": "([^"]+)"', prompt)
+        stats["requests"] = stats.get("requests", 0) + 1
+        stats["tokens"] = stats.get("tokens", 0) + len(prompt) // 4
+        stats["channels"] = stats.get("channels", 0) + len(urls)
+        return json.dumps({url: {"insights": f"bench {url}"} for url in urls})
+    return generate
+
+
+def bench_batch(args, db):
+    from utils.channel_batch import ChannelBatch, HostRateLimiter
+
+    print()
+    stats = {}
+    urls = [f"https://www.youtube.com/@batch{i:03d}" for i in range(args.channels)]
+
+    def make_batch(interrupt_after=None):
+        return ChannelBatch(
+            db=db,
+            video_source=fake_channels(args.channel_videos, stats),
+            transcript_fetcher=fake_transcripts(args.latency / 4, stats=stats),
+            generate=fake_generate(stats, interrupt_after),
+            limiter=HostRateLimiter(rate=args.rate, burst=int(args.rate))
+        )
+
+    batch_id = make_batch().create(urls, name="bench", videos_per_channel=args.channel_videos)
+    start = time.perf_counter()
+    try:
+        make_batch(args.interrupt_after).run(batch_id)
+    except KeyboardInterrupt:
+        pass
+    elapsed = time.perf_counter() - start
+    batch = db.get_channel_batch(batch_id)
+    print(f"interrupted run  {elapsed:7.2f}s  status={batch['status']} items={batch['counts']} "
+          f"listed={stats.get('listed', 0)} transcripts={stats.get('transcripts', 0)} "
+          f"requests={stats.get('requests', 0)}")
+
+    before = dict(stats)
+    start = time.perf_counter()
+    batch = make_batch().resume()
+    elapsed = time.perf_counter() - start
+    print(f"resumed run      {elapsed:7.2f}s  status={batch['status']} items={batch['counts']} "
+          f"listed={stats.get('listed', 0) - before.get('listed', 0)} "
+          f"transcripts={stats.get('transcripts', 0) - before.get('transcripts', 0)} "
+          f"requests={stats['requests'] - before.get('requests', 0)}")
+    print(f"analysis: {stats['requests']} requests for {args.channels} channels "
+          f"({stats['channels'] / stats['requests']:.1f} channels, "
+          f"~{stats['tokens'] // stats['requests']} prompt tokens per request) vs {args.channels} per-channel calls")
+
+
+def bench_search(args, db, queries=("secreto cocina", '"nadie sabe"', "productividad café mañana")):
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for i in range(args.search_videos):
+        db.save_video_transcript(
+            f"search{i:06d}", fake_segments(rng),
+            channel_url=f"https://www.youtube.com/@bench{i % 20}", title=f"Video {i}", commit=False
+        )
+    db.conn.commit()
+    elapsed = time.perf_counter() - start
+    stored = db.conn.execute("SELECT COUNT(*), SUM(char_count), SUM(LENGTH(segments)) FROM video_transcripts").fetchone()
+    print(f"\nstored {stored[0]} transcripts in {elapsed:.2f}s: "
+          f"{stored[1] / 1e6:.1f} MB text -> {stored[2] / 1e6:.1f} MB compressed segments")
+    
+    for query in queries:
+        runs = 20
+        start = time.perf_counter()
+        for _ in range(runs):
+            hits = db.search_transcripts(query, limit=10)
+        elapsed = (time.perf_counter() - start) / runs
+        best = f"{hits[0]['video_id']}@{hits[0]['start']:.0f}s {hits[0]['snippet'][:60]!r}" if hits else "-"
+        print(f"search {query!r:<28} {elapsed * 1000:7.2f} ms  {len(hits)} hits  best={best}")
+
+
+if __name__ == "__main__":
+    main()
@@ -216,3 +216,33 @@ Provide a JSON response with this structure:
     ],
     "insights": "Overall insights"
 }}"""
+
+# YouTube Batch Analysis Prompt (several channels per request, see utils.channel_batch)
+YOUTUBE_BATCH_ANALYSIS_PROMPT = """Analyze each of the following YouTube channels separately and provide insights per channel.
+Each video lists its title, views and transcript excerpts: the hook (opening seconds) and the closing lines.
+
+Channels:
+{channels_data}
+
+For each channel provide:
+1. Most successful topics/themes
+2. Content patterns that work well (hooks, structure, calls to action)
+3. Trends in the channel
+4. Suggestions for new videos based on successful patterns
+
+Provide a JSON object keyed by the exact channel_url of every channel above, each value with this structure:
+{{
+    "<channel_url>": {{
+        "successful_topics": ["topic1", "topic2"],
+        "content_patterns": ["pattern1", "pattern2"],
+        "trends": ["trend1", "trend2"],
+        "video_suggestions": [
+            {{
+                "idea": "Video idea",
+                "reason": "Why this would work",
+                "estimated_success": "high/medium/low"
+            }}
+        ],
+        "insights": "Overall insights"
+    }}
+}}"""
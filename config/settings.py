@@ -8,7 +8,8 @@ BASE_DIR = Path(__file__).parent.parent
 ASSETS_DIR = BASE_DIR / "assets"
 OUTPUT_DIR = BASE_DIR / "output"
 TEMP_DIR = BASE_DIR / "temp"
-DATABASE_PATH = BASE_DIR / "video_studio.db"
+# VIDEO_STUDIO_DB permite usar otra base (benchmarks, pruebas) sin tocar la real
+DATABASE_PATH = Path(os.getenv("VIDEO_STUDIO_DB") or BASE_DIR / "video_studio.db")
 
 # Crear carpetas necesarias
 ASSETS_DIR.mkdir(exist_ok=True)
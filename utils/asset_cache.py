@@ -0,0 +1,227 @@
+"""
+Asset Cache
+
+Content-addressed disk cache for generated media (TTS audio, images).
+Entries are keyed by a hash of the generation parameters and stored once
+under assets/cache/<namespace>/. A file's mtime doubles as its last-use
+time, so least-recently-used eviction only needs a directory scan and is
+safe to share between threads and render processes. Each namespace also
+keeps an index.json (key -> file, size, metadata); a store only scans the
+directory for eviction once the sizes summed in the index exceed the cap.
+The index is otherwise advisory and entries whose files are gone are
+dropped on eviction. Every AssetCache on the same directory shares one
+lock, so instances built by different agents/sessions do not lose each
+other's index updates.
+
+file_digest() hashes a file's content (memoized by path, size and mtime)
+for cache keys that depend on input files rather than on parameters.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+import logging
+
+from utils.asset_store import atomic_output
+
+logger = logging.getLogger(__name__)
+
+ASSET_CACHE_DIR = os.path.join("assets", "cache")
+
+PathLike = Union[str, Path]
+
+_directory_locks: Dict[Path, threading.Lock] = {}
+_directory_locks_guard = threading.Lock()
+
+
+def _directory_lock(directory: Path) -> threading.Lock:
+    """Process-wide lock for one cache directory (shared by all its instances)."""
+    key = directory.resolve()
+    with _directory_locks_guard:
+        return _directory_locks.setdefault(key, threading.Lock())
+
+
+def file_digest(path: PathLike) -> str:
+    """
+    SHA-256 of a file's content. Unchanged files (same size and mtime) are
+    not read again.
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    stat = os.stat(path)
+    return _file_digest(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=1024)
+def _file_digest(path: str, size: int, mtime_ns: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AssetCache:
+    """LRU, size-capped store of generated files keyed by their inputs."""
+
+    def __init__(self, namespace: str, max_bytes: int, root: PathLike = ASSET_CACHE_DIR):
+        """
+        Args:
+            namespace: Subdirectory for this kind of asset ("tts", "images")
+            max_bytes: Total size above which least recently used entries
+                are evicted
+            root: Cache root directory
+        """
+        self.directory = Path(root) / namespace
+        self.index_path = self.directory / "index.json"
+        self.max_bytes = max_bytes
+        self._lock = _directory_lock(self.directory)
+
+    @staticmethod
+    def key_for(**params: Any) -> str:
+        """Content hash of the generation parameters."""
+        payload = json.dumps(params, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str, suffix: str) -> Path:
+        return self.directory / key[:2] / f"{key}{suffix}"
+
+    def get(self, key: str, suffix: str) -> Optional[Path]:
+        """
+        Return the cached file for key, or None on a miss.
+
+        A hit refreshes the entry's last-use time.
+        """
+        path = self.path_for(key, suffix)
+        try:
+            if path.stat().st_size == 0:
+                return None
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def fetch(self, key: str, suffix: str, output_path: PathLike) -> Optional[str]:
+        """
+        Copy a cached entry to output_path.
+
+        Returns:
+            output_path on a hit, None on a miss
+        """
+        cached = self.get(key, suffix)
+        if cached is None:
+            return None
+        try:
+            with atomic_output(output_path) as tmp_path:
+                shutil.copyfile(cached, tmp_path)
+        except OSError as e:
+            logger.warning(f"Cache copy failed for {cached}: {e}")
+            return None
+        return str(output_path)
+
+    def load_index(self) -> Dict[str, Dict[str, Any]]:
+        """Return the index (key -> entry info), or {} if missing/unreadable."""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index: Dict[str, Dict[str, Any]]) -> None:
+        tmp_path = self.index_path.with_name(f"index.json.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.warning(f"Could not write cache index {self.index_path}: {e}")
+            tmp_path.unlink(missing_ok=True)
+
+    def store(self, key: str, source_path: PathLike, meta: Optional[Dict[str, Any]] = None) -> Optional[Path]:
+        """
+        Add a generated file to the cache (atomic rename into place).
+
+        Args:
+            key: Key from key_for()
+            source_path: File to copy; its suffix is kept
+            meta: Optional JSON-serializable info recorded in the index
+
+        Returns:
+            Cached path, or None if the file could not be stored
+        """
+        source_path = Path(source_path)
+        path = self.path_for(key, source_path.suffix)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not cache {source_path}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return None
+
+        with self._lock:
+            index = self.load_index()
+            index[key] = {
+                "file": str(path.relative_to(self.directory)),
+                "size": path.stat().st_size,
+                "stored_at": round(time.time(), 3),
+                "meta": meta or {},
+            }
+            self._save_index(index)
+            over_cap = sum(entry.get("size", 0) for entry in index.values()) > self.max_bytes
+
+        if over_cap:
+            self.evict()
+        return path
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries until the cache fits max_bytes.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.directory.glob("*/*"):
+                if path.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                    total -= size
+                    removed += 1
+                except OSError:
+                    continue
+
+            if removed:
+                logger.info(f"Evicted {removed} entries from {self.directory}")
+                index = self.load_index()
+                live = {
+                    key: entry for key, entry in index.items()
+                    if (self.directory / entry.get("file", "")).is_file()
+                }
+                if len(live) != len(index):
+                    self._save_index(live)
+            return removed
@@ -0,0 +1,247 @@
+"""
+Asset Scheduler
+
+Runs the per-scene asset steps of the production pipeline (narration,
+visual prompt enhancement and image/Veo generation) concurrently, with a
+bounded number of in-flight requests per provider.
+"""
+
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Maximum concurrent requests per provider
+DEFAULT_PROVIDER_LIMITS = {
+    "gtts": 4,
+    "gemini": 4,
+    "together": 2,
+    "veo": 4,
+}
+
+
+def _attach_streamlit_context(ctx) -> None:
+    """Attach the Streamlit script context to the current worker thread."""
+    if ctx is None:
+        return
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx
+        add_script_run_ctx(threading.current_thread(), ctx)
+    except Exception:
+        pass
+
+
+def _current_streamlit_context():
+    """Return the Streamlit script context of the calling thread, if any."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        return get_script_run_ctx()
+    except Exception:
+        return None
+
+
+class AssetScheduler:
+    """Thread pool with per-provider concurrency limits."""
+
+    def __init__(self, provider_limits: Optional[Dict[str, int]] = None, max_workers: Optional[int] = None):
+        """
+        Initialize scheduler.
+
+        Args:
+            provider_limits: Max concurrent calls per provider name
+            max_workers: Worker threads (defaults to the sum of provider limits)
+        """
+        self.provider_limits = dict(DEFAULT_PROVIDER_LIMITS)
+        if provider_limits:
+            self.provider_limits.update(provider_limits)
+
+        self._semaphores = {
+            name: threading.BoundedSemaphore(max(1, limit))
+            for name, limit in self.provider_limits.items()
+        }
+        self.max_workers = max_workers or sum(self.provider_limits.values())
+        self._ctx = _current_streamlit_context()
+        self._jobs: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def limit(self, provider: str):
+        """Hold a concurrency slot for the given provider."""
+        semaphore = self._semaphores.get(provider)
+        if semaphore is None:
+            yield
+            return
+        with semaphore:
+            yield
+
+    def submit(self, label: str, fn: Callable[..., Any], *args, **kwargs):
+        """
+        Queue a job. Jobs start when run() is called.
+
+        Args:
+            label: Human readable job label (used for progress messages)
+            fn: Callable to execute
+        """
+        self._jobs.append({"label": label, "fn": fn, "args": args, "kwargs": kwargs})
+
+    def run(self, on_result: Optional[Callable[[Dict[str, Any], int, int], None]] = None) -> List[Dict[str, Any]]:
+        """
+        Execute all queued jobs and wait for them.
+
+        on_result is called from the calling thread as each job finishes, so it
+        can safely update Streamlit widgets. Each job runs in a copy of the
+        caller's context, so its trace spans nest under the caller's span.
+
+        Args:
+            on_result: Callback (job, completed_count, total_count)
+
+        Returns:
+            List of jobs in submission order, each with "result" and "error" keys
+        """
+        jobs, self._jobs = self._jobs, []
+        total = len(jobs)
+        if not total:
+            return []
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, total),
+            thread_name_prefix="asset",
+            initializer=_attach_streamlit_context,
+            initargs=(self._ctx,)
+        ) as executor:
+            futures = {
+                executor.submit(contextvars.copy_context().run, job["fn"], *job["args"], **job["kwargs"]): job
+                for job in jobs
+            }
+
+            completed = 0
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    job["result"] = future.result()
+                    job["error"] = None
+                except Exception as e:
+                    logger.error(f"Asset job '{job['label']}' failed: {str(e)}")
+                    job["result"] = None
+                    job["error"] = e
+
+                completed += 1
+                if on_result:
+                    on_result(job, completed, total)
+
+        return jobs
+
+
+def generate_scene_assets(
+    scenes: List[Dict[str, Any]],
+    audio_agent,
+    visual_agent,
+    veo_agent=None,
+    use_video: bool = False,
+    on_progress: Optional[Callable[[int, int, str], None]] = None,
+    scheduler: Optional[AssetScheduler] = None,
+    store=None
+) -> List[str]:
+    """
+    Generate narration and visuals for every scene concurrently.
+
+    Scenes are updated in place with audio_path, image_path and
+    enhanced_prompt, exactly like the sequential loop did.
+
+    Args:
+        scenes: Scene dictionaries (narration, visual_prompt)
+        audio_agent: AudioGeneratorAgent instance
+        visual_agent: VisualGeneratorAgent instance
+        veo_agent: VeoGeneratorAgent instance (required when use_video)
+        use_video: Generate Veo clips instead of Flux images
+        on_progress: Callback (completed_steps, total_steps, message)
+        scheduler: Optional pre-configured scheduler
+        store: Optional ProjectAssetStore; assets are written into the
+            project's namespace instead of the shared assets/ folders
+
+    Returns:
+        List of error labels (empty if everything succeeded)
+    """
+    scheduler = scheduler or AssetScheduler()
+
+    def build_audio(scene_num: int, narration: str):
+        with scheduler.limit("gtts"), span("asset.audio", scene=scene_num):
+            return audio_agent.generate_narration(narration, f"scene_{scene_num}.mp3", store=store)
+
+    def build_image(scene_num: int, visual_prompt: str, narration: str):
+        with scheduler.limit("gemini"), span("asset.enhance_prompt", scene=scene_num):
+            enhanced_prompt = visual_agent.enhance_visual_prompt(visual_prompt, narration)
+        with scheduler.limit("together"), span("asset.image", scene=scene_num):
+            image_path = visual_agent.generate_image(enhanced_prompt, f"scene_{scene_num}.png", store=store)
+        return {"image_path": image_path, "enhanced_prompt": enhanced_prompt}
+
+    def build_video(scene_num: int, visual_prompt: str):
+        with scheduler.limit("veo"), span("asset.video", scene=scene_num):
+            return {"image_path": veo_agent.generate_video_clip(
+                visual_prompt, filename=f"scene_{scene_num}.mp4" if store else None,
+                store=store, scene_number=scene_num
+            )}
+
+    for i, scene in enumerate(scenes):
+        scene_num = i + 1
+        scheduler.submit(
+            f"audio:{scene_num}", build_audio, scene_num, scene.get("narration", "")
+        )
+        if use_video:
+            scheduler.submit(
+                f"video:{scene_num}", build_video, scene_num, scene.get("visual_prompt", "")
+            )
+        else:
+            scheduler.submit(
+                f"image:{scene_num}", build_image, scene_num,
+                scene.get("visual_prompt", ""), scene.get("narration", "")
+            )
+
+    error_names = {
+        "audio": "Audio escena {}",
+        "video": "Video Veo escena {}",
+        "image": "Imagen Flux escena {}",
+    }
+    done_messages = {
+        "audio": "🎙️ Audio listo: escena {}",
+        "video": "🎥 Video Veo listo: escena {}",
+        "image": "🖼️ Imagen lista: escena {}",
+    }
+    errors = []
+
+    def apply_result(job: Dict[str, Any], completed: int, total: int):
+        kind, scene_num = job["label"].split(":")
+        scene = scenes[int(scene_num) - 1]
+        result = job["result"]
+
+        if kind == "audio":
+            ok = bool(result)
+            if ok:
+                scene["audio_path"] = result
+        else:
+            result = result or {}
+            if result.get("enhanced_prompt"):
+                scene["enhanced_prompt"] = result["enhanced_prompt"]
+            ok = bool(result.get("image_path"))
+            if ok:
+                scene["image_path"] = result["image_path"]
+
+        if not ok:
+            errors.append(error_names[kind].format(scene_num))
+
+        if on_progress:
+            message = done_messages[kind] if ok else "⚠️ Falló: " + error_names[kind]
+            on_progress(completed, total, message.format(scene_num))
+
+    with span("assets.generate", scenes=len(scenes), use_video=use_video) as current:
+        scheduler.run(on_result=apply_result)
+        current.set(errors=len(errors))
+
+    # Keep error order stable regardless of completion order
+    errors.sort(key=lambda label: (int(label.rsplit(" ", 1)[-1]), label))
+    return errors
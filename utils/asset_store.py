@@ -0,0 +1,122 @@
+"""
+Project Asset Store
+
+Per-project asset namespace: every production writes under
+assets/projects/project_<id>/ (audio, images, videos, final), so several
+Streamlit sessions can produce videos on the same server without
+overwriting each other's scene_N files. Files are written to a temporary
+name and renamed into place, and each project keeps a manifest.json of
+the assets it owns.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROJECTS_DIR = os.path.join("assets", "projects")
+
+# Asset kinds and their subdirectories
+ASSET_KINDS = ("audio", "images", "videos", "final")
+
+PathLike = Union[str, Path]
+
+
+@contextmanager
+def atomic_output(path: PathLike) -> Iterator[str]:
+    """
+    Yield a temporary path next to `path` and rename it into place if the
+    block finishes without error; the partial file is removed otherwise.
+
+    The temporary name keeps the original extension, so encoders that infer
+    the format from it (gTTS, ffmpeg, Pillow) still work.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp{path.suffix}")
+    try:
+        yield str(tmp_path)
+        if not tmp_path.exists() or tmp_path.stat().st_size == 0:
+            raise OSError(f"Nothing was written to {tmp_path}")
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+class ProjectAssetStore:
+    """Asset directory and manifest of one project (Database project id)."""
+
+    def __init__(self, project_id: int, root: PathLike = PROJECTS_DIR):
+        self.project_id = project_id
+        self.root = Path(root) / f"project_{project_id}"
+        self.manifest_path = self.root / "manifest.json"
+        self._lock = threading.Lock()
+
+    def directory(self, kind: str) -> Path:
+        """Return (and create) the directory for an asset kind."""
+        if kind not in ASSET_KINDS:
+            raise ValueError(f"Unknown asset kind '{kind}'. Use one of: {', '.join(ASSET_KINDS)}")
+        path = self.root / kind
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def path(self, kind: str, filename: str) -> str:
+        """Return the final path of an asset in this project."""
+        return str(self.directory(kind) / filename)
+
+    @contextmanager
+    def write(self, kind: str, filename: str, **meta: Any) -> Iterator[str]:
+        """
+        Atomically write an asset and record it in the manifest.
+
+        Usage:
+            with store.write("audio", "scene_1.mp3", text=narration) as tmp:
+                tts.save(tmp)
+
+        Yields:
+            Temporary path to write to
+        """
+        final_path = self.path(kind, filename)
+        with atomic_output(final_path) as tmp_path:
+            yield tmp_path
+        self.record(kind, filename, **meta)
+
+    def record(self, kind: str, filename: str, **meta: Any) -> None:
+        """Add or refresh a manifest entry for an asset already on disk."""
+        final_path = Path(self.path(kind, filename))
+        entry = {
+            "kind": kind,
+            "path": str(final_path),
+            "size": final_path.stat().st_size if final_path.exists() else 0,
+            "updated_at": round(time.time(), 3),
+        }
+        entry.update(meta)
+
+        with self._lock:
+            manifest = self.manifest()
+            manifest["assets"][f"{kind}/{filename}"] = entry
+            manifest["updated_at"] = entry["updated_at"]
+            self._save_manifest(manifest)
+
+    def manifest(self) -> Dict[str, Any]:
+        """Return the project manifest (empty skeleton if none yet)."""
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"project_id": self.project_id, "assets": {}}
+
+    def _save_manifest(self, manifest: Dict[str, Any]) -> None:
+        try:
+            with atomic_output(self.manifest_path) as tmp_path:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(manifest, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            logger.warning(f"Could not write manifest {self.manifest_path}: {e}")
+
@@ -9,6 +9,8 @@ from typing import Optional, Tuple
 from pydub import AudioSegment
 import logging
 
+from utils.media_probe import get_duration
+
 logger = logging.getLogger(__name__)
 
 
@@ -66,7 +68,8 @@ def adjust_volume(audio_path: Path, volume_change_db: float) -> AudioSegment:
 
 def get_audio_duration(audio_path: Path) -> float:
     """
-    Get audio duration in seconds.
+    Get audio duration in seconds from the file headers (no decoding,
+    memoized per file version; see utils.media_probe).
     
     Args:
         audio_path: Path to audio file
@@ -74,8 +77,7 @@ def get_audio_duration(audio_path: Path) -> float:
     Returns:
         Duration in seconds
     """
-    audio = AudioSegment.from_file(str(audio_path))
-    return len(audio) / 1000.0
+    return get_duration(audio_path)
 
 
 def convert_audio_format(
@@ -0,0 +1,278 @@
+"""
+Caption Alignment
+
+Offline word timing for narration audio. The narration is decoded once,
+split into speech/silence regions from its energy envelope, and the known
+script text is laid over the speech regions: phrase boundaries (punctuation)
+are anchored to detected pauses and words inside a phrase are spread by
+estimated syllable weight.
+
+The result is a compact timing track (words + 1-3 word caption chunks)
+cached next to the audio file as <audio>.captions.json.
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Tuple, Union
+import numpy as np
+import logging
+
+from utils.ffmpeg_tools import decode_audio_pcm
+
+logger = logging.getLogger(__name__)
+
+TRACK_VERSION = 1
+
+SAMPLE_RATE = 16000
+FRAME_MS = 10
+
+# Silence shorter than this is treated as part of the word
+MIN_PAUSE_MS = 120
+# Speech islands shorter than this are treated as noise
+MIN_SPEECH_MS = 40
+
+# Silence kept after each scene's narration; the editor extends every scene
+# by it, so caption offsets across scenes must include it too
+SCENE_TAIL_SECONDS = 0.2
+
+PUNCTUATION = ",.;:!?…"
+VOWEL_GROUPS = re.compile(r"[aeiouáéíóúüy]+", re.IGNORECASE)
+
+
+def track_path_for(audio_path: Union[str, Path]) -> Path:
+    """Return the cache path of the timing track for an audio file."""
+    return Path(f"{audio_path}.captions.json")
+
+
+def _word_weight(word: str) -> float:
+    """Rough spoken length of a word (syllables, plus a bit for long words)."""
+    letters = re.sub(r"[^\w]", "", word)
+    syllables = len(VOWEL_GROUPS.findall(letters)) or 1
+    return syllables + 0.05 * len(letters)
+
+
+def speech_regions(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> List[Tuple[float, float]]:
+    """
+    Find speech regions in a mono signal.
+
+    Args:
+        samples: Mono float samples
+        sample_rate: Sample rate in Hz
+
+    Returns:
+        List of (start, end) times in seconds
+    """
+    hop = int(sample_rate * FRAME_MS / 1000)
+    frames = len(samples) // hop
+    if frames == 0:
+        return []
+
+    energy = samples[:frames * hop].reshape(frames, hop)
+    db = 10 * np.log10(np.mean(energy ** 2, axis=1) + 1e-10)
+
+    # Threshold between the noise floor and the loud parts of the narration
+    floor, peak = np.percentile(db, 10), np.percentile(db, 95)
+    threshold = max(floor + 10, peak - 30)
+    voiced = db > threshold
+
+    # Collect voiced runs
+    regions = []
+    start = None
+    for i, is_voiced in enumerate(voiced):
+        if is_voiced and start is None:
+            start = i
+        elif not is_voiced and start is not None:
+            regions.append([start, i])
+            start = None
+    if start is not None:
+        regions.append([start, frames])
+
+    # Merge runs split by short gaps, drop tiny islands
+    min_gap = MIN_PAUSE_MS // FRAME_MS
+    merged = []
+    for region in regions:
+        if merged and region[0] - merged[-1][1] < min_gap:
+            merged[-1][1] = region[1]
+        else:
+            merged.append(region)
+
+    min_len = MIN_SPEECH_MS // FRAME_MS
+    step = FRAME_MS / 1000
+    return [(s * step, e * step) for s, e in merged if e - s >= min_len]
+
+
+def align_words(text: str, regions: List[Tuple[float, float]], duration: float) -> List[Tuple[str, float, float]]:
+    """
+    Lay script words over speech regions.
+
+    Args:
+        text: Narration text
+        regions: Speech regions from speech_regions()
+        duration: Audio duration in seconds
+
+    Returns:
+        List of (word, start, end)
+    """
+    words = text.replace("*", "").split()
+    if not words:
+        return []
+    if not regions:
+        regions = [(0.0, duration)]
+
+    # Speech-time axis: silences removed
+    lengths = [end - start for start, end in regions]
+    speech_total = sum(lengths)
+    pause_at = np.cumsum(lengths)[:-1]  # speech-time where each pause occurs
+
+    weights = np.array([_word_weight(w) for w in words])
+    cumulative = np.concatenate([[0.0], np.cumsum(weights)])
+    total_weight = cumulative[-1]
+
+    # Anchor phrase boundaries (after punctuation) to the nearest pause
+    anchors = [(0, 0.0)]
+    tolerance = 0.15 * speech_total
+    next_pause = 0
+    for j in range(1, len(words)):
+        if words[j - 1][-1] not in PUNCTUATION:
+            continue
+        predicted = cumulative[j] / total_weight * speech_total
+        best = None
+        for k in range(next_pause, len(pause_at)):
+            if pause_at[k] <= anchors[-1][1]:
+                continue
+            distance = abs(pause_at[k] - predicted)
+            if distance <= tolerance and (best is None or distance < abs(pause_at[best] - predicted)):
+                best = k
+        if best is not None:
+            anchors.append((j, float(pause_at[best])))
+            next_pause = best + 1
+    anchors.append((len(words), speech_total))
+
+    # Spread words between anchors by weight
+    speech_times = np.empty(len(words) + 1)
+    for (j0, s0), (j1, s1) in zip(anchors, anchors[1:]):
+        span = cumulative[j1] - cumulative[j0]
+        for j in range(j0, j1 + 1):
+            fraction = (cumulative[j] - cumulative[j0]) / span if span else 0.0
+            speech_times[j] = s0 + fraction * (s1 - s0)
+
+    region_starts = np.concatenate([[0.0], np.cumsum(lengths)])
+
+    def to_real(speech_time: float, is_start: bool) -> float:
+        # Boundaries between regions map to the next region's start for word
+        # starts and to the previous region's end for word ends
+        side = "right" if is_start else "left"
+        index = int(np.searchsorted(region_starts, speech_time, side=side)) - 1
+        index = min(max(index, 0), len(regions) - 1)
+        return float(regions[index][0] + (speech_time - region_starts[index]))
+
+    return [
+        (word, round(to_real(speech_times[i], True), 3), round(to_real(speech_times[i + 1], False), 3))
+        for i, word in enumerate(words)
+    ]
+
+
+def chunk_captions(
+    words: List[Tuple[str, float, float]],
+    duration: float,
+    max_words: int = 3,
+    max_chars: int = 18,
+    max_gap: float = 0.25
+) -> List[Tuple[str, float, float]]:
+    """
+    Group timed words into short "Hormozi" captions.
+
+    Chunks break at punctuation, at audible pauses, and when they reach
+    max_words or max_chars. Each chunk stays on screen until the next one.
+
+    Returns:
+        List of (text, start, end)
+    """
+    chunks: List[List[Tuple[str, float, float]]] = []
+    current: List[Tuple[str, float, float]] = []
+
+    for word in words:
+        if current:
+            text_len = len(" ".join(w for w, _, _ in current + [word]))
+            gap = word[1] - current[-1][2]
+            if (
+                len(current) >= max_words
+                or text_len > max_chars
+                or gap > max_gap
+                or current[-1][0][-1] in PUNCTUATION
+            ):
+                chunks.append(current)
+                current = []
+        current.append(word)
+    if current:
+        chunks.append(current)
+
+    captions = []
+    for i, chunk in enumerate(chunks):
+        start = chunk[0][1]
+        if i + 1 < len(chunks):
+            end = chunks[i + 1][0][1]
+        else:
+            end = min(chunk[-1][2] + 0.3, duration)
+        captions.append((" ".join(w for w, _, _ in chunk), float(start), float(max(end, start + 0.05))))
+    return captions
+
+
+def _fingerprint(audio_path: Union[str, Path], text: str) -> Dict[str, Any]:
+    stat = os.stat(audio_path)
+    return {
+        "version": TRACK_VERSION,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "text_sha1": hashlib.sha1(text.encode("utf-8")).hexdigest(),
+    }
+
+
+def get_caption_track(audio_path: Union[str, Path], text: str, max_words: int = 3) -> Dict[str, Any]:
+    """
+    Return the timing track for a narration, computing it on a cache miss.
+
+    Args:
+        audio_path: Narration audio file
+        text: Script text spoken in the audio
+        max_words: Maximum words per caption chunk
+
+    Returns:
+        Dictionary with "duration", "words" and "captions"; words and
+        captions are [text, start, end] lists in seconds
+    """
+    fingerprint = _fingerprint(audio_path, text)
+    fingerprint["max_words"] = max_words
+    cache_path = track_path_for(audio_path)
+
+    if cache_path.exists():
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("key") == fingerprint:
+                return cached
+        except (OSError, ValueError):
+            logger.warning(f"Unreadable caption track, recomputing: {cache_path}")
+
+    samples = decode_audio_pcm(audio_path, SAMPLE_RATE)
+    duration = len(samples) / SAMPLE_RATE
+    regions = speech_regions(samples, SAMPLE_RATE)
+    words = align_words(text, regions, duration)
+    captions = chunk_captions(words, duration, max_words=max_words)
+
+    track = {
+        "key": fingerprint,
+        "duration": round(duration, 3),
+        "words": [list(w) for w in words],
+        "captions": [[t, round(s, 3), round(e, 3)] for t, s, e in captions],
+    }
+
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(track, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, cache_path)
+
+    return track
@@ -0,0 +1,464 @@
+"""
+Channel Batch
+
+Competitor research over many channels as one resumable job. Channels are
+scraped concurrently (incrementally against their stored rows, see
+YouTubeScraper.sync_channel) behind a per-host token-bucket rate limit,
+then their video summaries (title, views, hook and closing excerpts) are
+packed into token-budgeted Gemini requests that analyze several channels
+at once.
+
+Progress is checkpointed per channel in channel_batch_items
+(pending -> scraped -> analyzed, or failed after MAX_ATTEMPTS errors), so
+an interrupted run resumes where it stopped. Analysis responses are
+memoized once every channel in them parses, and a group holding a channel
+that already failed skips the memo lookup, so a bad answer is never
+replayed.
+
+Usage:
+    python -m utils.channel_batch channels.txt [--name weekly] [--videos 30]
+    python -m utils.channel_batch --resume [BATCH_ID]
+"""
+
+import argparse
+import contextvars
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import logging
+
+import scrapetube
+from config.prompts import YOUTUBE_BATCH_ANALYSIS_PROMPT
+from utils.database import get_db
+from utils.gemini_client import DEFAULT_MODEL, GeminiMemo, generate_text, get_memo
+from utils.tracing import span
+from utils.youtube_scraper import (
+    TranscriptFetcher, VideoSource, YouTubeScraper, fetch_transcript, transcript_excerpt
+)
+
+logger = logging.getLogger(__name__)
+
+YOUTUBE_HOST = "www.youtube.com"
+REQUESTS_PER_SECOND = 4.0  # Per host, listing pages and transcripts together
+REQUEST_BURST = 8
+LISTING_PAGE_SIZE = 30     # Videos per channel listing request
+
+CHANNEL_WORKERS = 4
+TRANSCRIPT_WORKERS = 4     # Per channel (the host limit bounds the total rate)
+VIDEOS_PER_CHANNEL = 30
+
+BATCH_TOKEN_BUDGET = 30000     # Prompt tokens per Gemini request
+MAX_CHANNELS_PER_REQUEST = 8   # Bounds the response (one analysis per channel)
+CHARS_PER_TOKEN = 4            # Rough estimate for mixed Spanish/English text
+
+MAX_ATTEMPTS = 3
+
+# Item statuses that still have work to do
+OPEN_STATUSES = ("pending", "scraped")
+
+
+class HostRateLimiter:
+    """Token bucket per host: `rate` requests per second, bursts up to `burst`."""
+
+    def __init__(
+        self,
+        rate: float = REQUESTS_PER_SECOND,
+        burst: int = REQUEST_BURST,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.clock = clock
+        self.sleep = sleep
+        self._buckets: Dict[str, List[float]] = {}  # host -> [tokens, last refill]
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str):
+        """Block until a request to `host` is allowed."""
+        while True:
+            with self._lock:
+                now = self.clock()
+                bucket = self._buckets.setdefault(host, [float(self.burst), now])
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                if bucket[0] >= 1:
+                    bucket[0] -= 1
+                    return
+                wait = (1 - bucket[0]) / self.rate
+            self.sleep(wait)
+
+
+def rate_limited_source(
+    source: VideoSource,
+    limiter: HostRateLimiter,
+    host: str = YOUTUBE_HOST,
+    page_size: int = LISTING_PAGE_SIZE
+) -> VideoSource:
+    """Wrap a channel listing so every page request waits for the limiter."""
+    def video_source(**kwargs) -> Iterable[Dict[str, Any]]:
+        videos = iter(source(**kwargs))
+        count = 0
+        while True:
+            if count % page_size == 0:
+                limiter.acquire(host)
+            try:
+                video = next(videos)
+            except StopIteration:
+                return
+            yield video
+            count += 1
+    return video_source
+
+
+def rate_limited_fetcher(
+    fetcher: TranscriptFetcher,
+    limiter: HostRateLimiter,
+    host: str = YOUTUBE_HOST
+) -> TranscriptFetcher:
+    """Wrap a transcript fetcher so every request waits for the limiter."""
+    def fetch(video_id, languages, timeout):
+        limiter.acquire(host)
+        return fetcher(video_id, languages, timeout)
+    return fetch
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def channel_summary(
+    channel: Dict[str, Any],
+    transcripts: Dict[str, Dict[str, Any]],
+    max_videos: int = VIDEOS_PER_CHANNEL
+) -> Dict[str, Any]:
+    """
+    Compact view of a stored channel for the batch prompt.
+
+    Args:
+        channel: youtube_channels row (videos_data decoded)
+        transcripts: Stored transcripts by video ID
+        max_videos: Videos included (newest first)
+    """
+    videos = []
+    for video in (channel.get("videos_data") or [])[:max_videos]:
+        transcript = transcripts.get(video.get("video_id"))
+        excerpt = transcript_excerpt(transcript["segments"] if transcript else None)
+        videos.append({
+            "title": video.get("title", ""),
+            "views": video.get("view_count", ""),
+            "hook": excerpt["hook"],
+            "closing": excerpt["closing"],
+        })
+    return {
+        "channel_url": channel["channel_url"],
+        "channel_name": channel.get("channel_name") or "",
+        "videos": videos,
+    }
+
+
+def pack_requests(
+    summaries: List[Dict[str, Any]],
+    token_budget: int = BATCH_TOKEN_BUDGET,
+    max_channels: int = MAX_CHANNELS_PER_REQUEST
+) -> List[List[Dict[str, Any]]]:
+    """
+    Group channel summaries into requests of at most token_budget prompt
+    tokens and max_channels channels, in order. A channel that alone
+    exceeds the budget keeps only its newest videos that fit.
+    """
+    base = estimate_tokens(YOUTUBE_BATCH_ANALYSIS_PROMPT)
+    groups, current, used = [], [], base
+    for summary in summaries:
+        cost = estimate_tokens(json.dumps(summary, ensure_ascii=False))
+        while cost > token_budget - base and len(summary["videos"]) > 1:
+            summary = dict(summary, videos=summary["videos"][:-1])
+            cost = estimate_tokens(json.dumps(summary, ensure_ascii=False))
+
+        if current and (used + cost > token_budget or len(current) >= max_channels):
+            groups.append(current)
+            current, used = [], base
+        current.append(summary)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _parse_batch_response(text: str) -> Dict[str, Any]:
+    """Analyses by channel URL from a Gemini response (JSON, possibly fenced)."""
+    if "```json" in text:
+        text = text.split("```json")[1].split("```")[0]
+    result = json.loads(text.strip())
+    if not isinstance(result, dict):
+        raise ValueError("batch response is not a JSON object")
+    return result
+
+
+class ChannelBatch:
+    """Create, run and resume multi-channel analysis batches."""
+
+    def __init__(
+        self,
+        db=None,
+        video_source: Optional[VideoSource] = None,
+        transcript_fetcher: Optional[TranscriptFetcher] = None,
+        generate: Optional[Callable[[str], str]] = None,
+        limiter: Optional[HostRateLimiter] = None,
+        channel_workers: int = CHANNEL_WORKERS,
+        transcript_workers: int = TRANSCRIPT_WORKERS,
+        token_budget: int = BATCH_TOKEN_BUDGET,
+        max_channels_per_request: int = MAX_CHANNELS_PER_REQUEST,
+        max_attempts: int = MAX_ATTEMPTS
+    ):
+        """
+        Args:
+            db: Database instance (default: shared get_db())
+            video_source: Channel listing (default: scrapetube.get_channel)
+            transcript_fetcher: Transcript transport (default: fetch_transcript)
+            generate: prompt -> response text (default: Gemini call; only
+                the default is memoized)
+            limiter: Shared per-host rate limiter
+            channel_workers: Channels scraped at once
+            transcript_workers: Concurrent transcript requests per channel
+            token_budget: Prompt tokens per analysis request
+            max_channels_per_request: Channels per analysis request
+            max_attempts: Errors before a channel is marked failed
+        """
+        self.db = db or get_db()
+        self.limiter = limiter or HostRateLimiter()
+        self.scraper = YouTubeScraper(
+            video_source=rate_limited_source(video_source or scrapetube.get_channel, self.limiter),
+            transcript_fetcher=rate_limited_fetcher(transcript_fetcher or fetch_transcript, self.limiter),
+            max_workers=transcript_workers
+        )
+        self.generate = generate or (lambda prompt: generate_text(prompt, memo=False, agent="channel_batch"))
+        self.memo = get_memo() if generate is None else None
+        self.channel_workers = max(1, channel_workers)
+        self.token_budget = token_budget
+        self.max_channels_per_request = max_channels_per_request
+        self.max_attempts = max_attempts
+
+    def create(
+        self,
+        channel_urls: List[str],
+        name: Optional[str] = None,
+        videos_per_channel: int = VIDEOS_PER_CHANNEL,
+        force: bool = False
+    ) -> int:
+        """
+        Register a batch (nothing is scraped yet).
+
+        Args:
+            channel_urls: Channels to analyze (duplicates dropped)
+            name: Label, e.g. "weekly 2026-W42"
+            videos_per_channel: Videos kept and analyzed per channel
+            force: Re-scrape and re-analyze channels with a stored result
+
+        Returns:
+            Batch ID
+        """
+        urls = [url.strip() for url in channel_urls if url and url.strip()]
+        params = {"videos_per_channel": videos_per_channel, "force": force}
+        return self.db.create_channel_batch(urls, name=name, params=params)
+
+    def resume(self, batch_id: Optional[int] = None, progress=None) -> Dict[str, Any]:
+        """Run a batch again, by default the newest one not completed."""
+        if batch_id is None:
+            unfinished = [b for b in self.db.list_channel_batches() if b["status"] != "completed"]
+            if not unfinished:
+                raise ValueError("No unfinished channel batch to resume")
+            batch_id = unfinished[0]["id"]
+        return self.run(batch_id, progress=progress)
+
+    def run(
+        self,
+        batch_id: int,
+        progress: Optional[Callable[[str, int, int, str], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Scrape the pending channels, then analyze the scraped ones.
+
+        Args:
+            batch_id: Batch to run (already finished items are skipped)
+            progress: Callback (stage, done, total, channel_url), called
+                from the calling thread
+
+        Returns:
+            Batch row with item counts by status
+
+        Raises:
+            ValueError: If the batch does not exist
+        """
+        batch = self.db.get_channel_batch(batch_id)
+        if batch is None:
+            raise ValueError(f"Channel batch {batch_id} not found")
+        params = batch["params"]
+        videos_per_channel = params.get("videos_per_channel", VIDEOS_PER_CHANNEL)
+        force = params.get("force", False)
+
+        self.db.update_channel_batch_status(batch_id, "running")
+        status = "incomplete"
+        try:
+            with span("channel_batch.run", batch_id=batch_id):
+                self._scrape(batch_id, videos_per_channel, force, progress)
+                self._analyze(batch_id, videos_per_channel, progress)
+            open_items = [
+                item for item in self.db.get_channel_batch_items(batch_id)
+                if item["status"] in OPEN_STATUSES
+            ]
+            status = "incomplete" if open_items else "completed"
+        finally:
+            self.db.update_channel_batch_status(batch_id, status)
+        return self.db.get_channel_batch(batch_id)
+
+    def _open_items(self, batch_id: int, status: str) -> List[Dict[str, Any]]:
+        return [
+            item for item in self.db.get_channel_batch_items(batch_id, status)
+            if item["attempts"] < self.max_attempts
+        ]
+
+    def _failed(self, batch_id: int, item: Dict[str, Any], error: Exception):
+        """Record an error; the item is marked failed once out of attempts."""
+        logger.warning(f"Channel batch {batch_id}: {item['channel_url']} failed: {error}")
+        status = "failed" if item["attempts"] + 1 >= self.max_attempts else None
+        self.db.update_channel_batch_item(batch_id, item["channel_url"], status=status, error_message=str(error))
+
+    def _scrape(self, batch_id: int, videos_per_channel: int, force: bool, progress):
+        items = self._open_items(batch_id, "pending")
+        if not items:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.channel_workers, thread_name_prefix="channel_batch") as executor:
+            futures = {
+                executor.submit(
+                    contextvars.copy_context().run,
+                    self._scrape_one, batch_id, item["channel_url"], videos_per_channel, force
+                ): item
+                for item in items
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                item = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    self._failed(batch_id, item, e)
+                if progress:
+                    progress("scrape", done, len(items), item["channel_url"])
+
+    def _scrape_one(self, batch_id: int, channel_url: str, videos_per_channel: int, force: bool):
+        with span("channel_batch.scrape", channel=channel_url) as s:
+            data = self.scraper.sync_channel(channel_url, videos_per_channel, db=self.db, force=force)
+            stored_analysis = data.pop("stored_analysis")
+            legacy_migrated = data.pop("legacy_migrated")
+            s.set(new_videos=len(data["new_video_ids"]))
+
+            # Unchanged channel with a stored analysis: nothing left to do
+            # (beyond dropping migrated transcripts from the stored row)
+            if not force and isinstance(stored_analysis, dict) and stored_analysis and not data["video_set_changed"]:
+                if legacy_migrated:
+                    self.scraper.save_channel(self.db, data, stored_analysis)
+                status = "analyzed"
+            else:
+                # Checkpoint the videos; the stale analysis is cleared
+                self.scraper.save_channel(self.db, data, None)
+                status = "scraped"
+            self.db.update_channel_batch_item(batch_id, channel_url, status=status, video_count=data["video_count"])
+
+    def _analyze(self, batch_id: int, videos_per_channel: int, progress):
+        items = {item["channel_url"]: item for item in self._open_items(batch_id, "scraped")}
+        if not items:
+            return
+
+        summaries, channels = [], {}
+        for url in items:
+            channel = self.db.get_youtube_channel(url)
+            if channel is None or not isinstance(channel.get("videos_data"), list):
+                self._failed(batch_id, items[url], ValueError("stored channel row missing"))
+                continue
+            channels[url] = channel
+            video_ids = [v.get("video_id") for v in channel["videos_data"][:videos_per_channel]]
+            summaries.append(channel_summary(channel, self.db.get_video_transcripts(video_ids), videos_per_channel))
+
+        done = 0
+        for group in pack_requests(summaries, self.token_budget, self.max_channels_per_request):
+            urls = [summary["channel_url"] for summary in group]
+            with span("channel_batch.analyze", channels=len(group)):
+                prompt = YOUTUBE_BATCH_ANALYSIS_PROMPT.format(
+                    channels_data=json.dumps(group, ensure_ascii=False, indent=1)
+                )
+                # Retried channels skip the lookup: the memo may hold the answer they failed on
+                memo_key = GeminiMemo.key_for(DEFAULT_MODEL, prompt)
+                retry = any(items[url]["attempts"] > 0 for url in urls)
+                cached = self.memo.get(memo_key) if self.memo and not retry else None
+                try:
+                    text = cached if cached is not None else self.generate(prompt)
+                    analyses = _parse_batch_response(text)
+                except Exception as e:
+                    analyses, error = {}, e
+                else:
+                    error = ValueError("channel missing from the batch response")
+                    # Only answers covering the whole group are memoized
+                    complete = all(isinstance(analyses.get(url), dict) and analyses[url] for url in urls)
+                    if self.memo and cached is None and complete:
+                        self.memo.put(memo_key, DEFAULT_MODEL, text)
+
+            for url in urls:
+                analysis = analyses.get(url)
+                if isinstance(analysis, dict) and analysis:
+                    channel = channels[url]
+                    self.scraper.save_channel(self.db, {
+                        "channel_url": url,
+                        "channel_name": channel.get("channel_name"),
+                        "videos": channel["videos_data"],
+                    }, analysis)
+                    self.db.update_channel_batch_item(batch_id, url, status="analyzed")
+                else:
+                    self._failed(batch_id, items[url], error)
+                done += 1
+                if progress:
+                    progress("analyze", done, len(summaries), url)
+
+
+def _read_channel_list(path: str) -> List[str]:
+    """Channel URLs from a text file: one per line, '#' comments."""
+    with open(path, encoding="utf-8") as f:
+        lines = (line.split("#", 1)[0].strip() for line in f)
+        return [line for line in lines if line]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Scrape and analyze a list of YouTube channels as a resumable batch.")
+    parser.add_argument("channels", nargs="?", help="Text file with one channel URL per line")
+    parser.add_argument("--resume", nargs="?", type=int, const=0, metavar="BATCH_ID",
+                        help="Resume a batch (default: the newest unfinished one)")
+    parser.add_argument("--name", help="Batch label")
+    parser.add_argument("--videos", type=int, default=VIDEOS_PER_CHANNEL, help="Videos per channel")
+    parser.add_argument("--force", action="store_true", help="Ignore stored results")
+    parser.add_argument("--workers", type=int, default=CHANNEL_WORKERS, help="Channels scraped at once")
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND, help="Requests per second to YouTube")
+    args = parser.parse_args(argv)
+    if not args.channels and args.resume is None:
+        parser.error("a channel list file or --resume is required")
+
+    batch = ChannelBatch(limiter=HostRateLimiter(rate=args.rate), channel_workers=args.workers)
+
+    def progress(stage, done, total, channel_url):
+        print(f"[{stage} {done}/{total}] {channel_url}", flush=True)
+
+    if args.resume is not None:
+        result = batch.resume(args.resume or None, progress=progress)
+    else:
+        batch_id = batch.create(_read_channel_list(args.channels), name=args.name,
+                                videos_per_channel=args.videos, force=args.force)
+        print(f"Batch {batch_id} created")
+        result = batch.run(batch_id, progress=progress)
+
+    counts = ", ".join(f"{status}={count}" for status, count in sorted(result["counts"].items()))
+    print(f"Batch {result['id']} {result['status']}: {counts}")
+
+
+if __name__ == "__main__":
+    main()
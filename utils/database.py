@@ -1,26 +1,290 @@
 """
 Database management for video production system.
 
-Uses SQLite to store projects, videos, agent logs, and YouTube channel data.
+Uses SQLite to store projects, scenes, videos, agent logs, Veo jobs, and YouTube channel data.
+
+Competitor transcripts live in their own table, one row per video with
+its timed segments zlib-compressed, and are indexed in ~30 s chunks by an
+FTS5 table so hooks and phrases can be searched across channels.
+
+Each thread gets its own connection in WAL mode (readers never block the
+writer), and agent-log writes can go through a background queue that
+commits them in periodic batches instead of one fsync per line.
 """
 
 import sqlite3
 import json
+import hashlib
+import re
+import zlib
+import atexit
+import queue
+import threading
+import time
+from contextlib import nullcontext
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, List, Dict, Any
+import logging
+
 from config.settings import DATABASE_PATH
 
+logger = logging.getLogger(__name__)
+
+# Bumped when a data migration is added to _migrate()
+SCHEMA_VERSION = 2
+
+# Connection tuning applied to every pooled connection
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",  # fsync at checkpoints, not every commit (safe with WAL)
+    "PRAGMA cache_size = -16000",   # 16 MB page cache
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
+# Columns returned by the paginated summary listings (no JSON payloads)
+PROJECT_SUMMARY_COLUMNS = (
+    "id", "project_name", "style", "duration", "format", "status", "created_at", "updated_at"
+)
+VIDEO_SUMMARY_COLUMNS = (
+    "id", "project_id", "video_path", "thumbnail_path", "title", "duration",
+    "format", "status", "created_at"
+)
+AGENT_LOG_SUMMARY_COLUMNS = (
+    "id", "project_id", "agent_name", "status", "error_message", "execution_time", "created_at"
+)
+
+DEFAULT_PAGE_SIZE = 50
+
+# Transcript segments per full-text row: consecutive segments are joined
+# until they span this many seconds (search hits point at the chunk start)
+TRANSCRIPT_CHUNK_SECONDS = 30.0
+
+# Words dropped from free-text transcript queries: they match almost every
+# chunk, so OR-ing them in returns unrelated hits
+TRANSCRIPT_STOPWORDS = frozenset("""
+    the and for you your are but not with this that from have was what how why when who all
+    los las les del con por para una uno unos unas que qué como cómo cuando cuándo donde dónde
+    quien quién sus mis tus ese esa eso esos esas este esta esto estos estas hay muy más mas
+    pero sin sobre entre hasta desde tan todo toda todos todas nos ella ellos ellas son fue
+    ser estar está están tiene tienen puede pueden hace hacer porque sólo solo también tambien
+""".split())
+
+# Scene columns accepted by upsert_scenes / update_scene_assets
+SCENE_FIELDS = (
+    "role", "narration", "visual_prompt", "enhanced_prompt",
+    "audio_path", "image_path", "status"
+)
+
+
+def _text_hash(text: Optional[str]) -> Optional[str]:
+    """Short content hash used to detect edited narration/prompts."""
+    if text is None:
+        return None
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _scene_number(scene: Dict[str, Any], index: int) -> int:
+    """Scene number from a plan entry ('scene_number', 'id' or position)."""
+    for key in ("scene_number", "id"):
+        value = scene.get(key)
+        if isinstance(value, int) or (isinstance(value, str) and value.isdigit()):
+            return int(value)
+    return index + 1
+
+
+def _pack_segments(segments: List[Dict[str, Any]]) -> bytes:
+    """Compress timed segments as zlib JSON rows [start, duration, text]."""
+    rows = [
+        [round(float(seg.get("start") or 0.0), 2), round(float(seg.get("duration") or 0.0), 2), seg.get("text", "")]
+        for seg in segments
+    ]
+    return zlib.compress(json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def _unpack_segments(blob: bytes) -> List[Dict[str, Any]]:
+    """Inverse of _pack_segments."""
+    rows = json.loads(zlib.decompress(blob).decode("utf-8"))
+    return [{"start": start, "duration": duration, "text": text} for start, duration, text in rows]
+
+
+def _transcript_chunks(
+    segments: List[Dict[str, Any]],
+    seconds: float = TRANSCRIPT_CHUNK_SECONDS
+) -> List[tuple]:
+    """Group consecutive segments into (start, text) chunks of about `seconds`."""
+    chunks, texts, chunk_start = [], [], None
+    for seg in segments:
+        text = (seg.get("text") or "").strip()
+        if not text:
+            continue
+        start = float(seg.get("start") or 0.0)
+        if chunk_start is None:
+            chunk_start = start
+        elif start - chunk_start >= seconds:
+            chunks.append((chunk_start, " ".join(texts)))
+            texts, chunk_start = [], start
+        texts.append(text)
+    if texts:
+        chunks.append((chunk_start, " ".join(texts)))
+    return chunks
+
+
+def _fts_query(text: str) -> Optional[str]:
+    """
+    FTS5 query from free text: "quoted phrases" are kept as phrases, other
+    words (3+ characters, not in TRANSCRIPT_STOPWORDS) become quoted terms,
+    all OR-ed together (bm25 ranks chunks matching more of them first).
+    Returns None if nothing is searchable.
+    """
+    phrases = re.findall(r'"([^"]+)"', text)
+    rest = re.sub(r'"[^"]*"', " ", text)
+    terms = [" ".join(re.findall(r"\w+", phrase)) for phrase in phrases]
+    terms += [
+        word for word in re.findall(r"\w+", rest)
+        if len(word) >= 3 and word.lower() not in TRANSCRIPT_STOPWORDS
+    ]
+    terms = [term for term in dict.fromkeys(terms) if term]
+    if not terms:
+        return None
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+class BatchedWriter:
+    """
+    Background writer that coalesces queued statements into one
+    transaction per flush interval (or per max_batch statements).
+    """
+    
+    def __init__(self, db_path: Path, flush_interval: float = 0.5, max_batch: int = 500):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, sql: str, params: tuple = ()):
+        """Queue a write statement (fire and forget)."""
+        self._queue.put((sql, params, None))
+    
+    def flush(self, timeout: float = 10.0):
+        """Block until every statement queued so far is committed."""
+        done = threading.Event()
+        self._queue.put((None, None, done))
+        done.wait(timeout)
+    
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+    
+    def _run(self):
+        conn = _open_connection(self.db_path)
+        stop = False
+        while not stop:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            
+            # Collect whatever else arrived within the flush window
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch and batch[-1] is not None and batch[-1][2] is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            statements, waiters = [], []
+            for entry in batch:
+                if entry is None:
+                    stop = True
+                elif entry[2] is not None:
+                    waiters.append(entry[2])
+                else:
+                    statements.append(entry[:2])
+            try:
+                self._write(conn, statements)
+            finally:
+                for done in waiters:
+                    done.set()
+        conn.close()
+    
+    @staticmethod
+    def _write(conn: sqlite3.Connection, statements: List[tuple]):
+        """
+        Commit statements as one transaction. On error the batch is retried
+        once (e.g. after a lock timeout), then written one statement per
+        transaction so only the failing rows are lost.
+        """
+        for attempt in range(2):
+            try:
+                with conn:
+                    for sql, params in statements:
+                        conn.execute(sql, params)
+                return
+            except sqlite3.Error as e:
+                logger.warning(f"Batched write of {len(statements)} statements failed (attempt {attempt + 1}): {e}")
+        
+        for sql, params in statements:
+            try:
+                with conn:
+                    conn.execute(sql, params)
+            except sqlite3.Error as e:
+                logger.error(f"Dropped batched write ({' '.join(sql.split()[:3])} ...) {params!r}: {e}")
+
+
+def _open_connection(db_path: Path) -> sqlite3.Connection:
+    """Open a tuned connection (WAL, synchronous=NORMAL, larger cache)."""
+    # Each connection is used by a single thread; check_same_thread=False
+    # only lets the pool close connections of threads that have exited
+    conn = sqlite3.connect(str(db_path), timeout=5.0, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
 
 class Database:
     """SQLite database manager for video production system."""
     
-    def __init__(self, db_path: Path = DATABASE_PATH):
-        """Initialize database connection and create tables."""
+    def __init__(self, db_path: Path = DATABASE_PATH, write_queue: bool = False):
+        """
+        Initialize the connection pool and create tables.
+        
+        Args:
+            db_path: SQLite file
+            write_queue: Send agent-log writes through a BatchedWriter
+                (committed in periodic batches by a background thread)
+        """
         self.db_path = db_path
-        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        self._local = threading.local()
+        self._connections: Dict[int, Any] = {}  # thread ident -> (thread, connection)
+        self._pool_lock = threading.Lock()
         self._create_tables()
+        self.writer = BatchedWriter(db_path) if write_queue else None
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Connection owned by the calling thread (opened on first use)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _open_connection(self.db_path)
+            self._local.conn = conn
+            with self._pool_lock:
+                # Release connections left behind by finished worker threads
+                for ident, (thread, old_conn) in list(self._connections.items()):
+                    if not thread.is_alive():
+                        old_conn.close()
+                        del self._connections[ident]
+                self._connections[threading.get_ident()] = (threading.current_thread(), conn)
+        return conn
     
     def _create_tables(self):
         """Create all necessary tables if they don't exist."""
@@ -42,6 +306,28 @@ class Database:
             )
         """)
         
+        # Scenes table (one row per scene; asset updates touch a single row)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scenes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_id INTEGER NOT NULL,
+                scene_number INTEGER NOT NULL,
+                role TEXT,
+                narration TEXT,
+                visual_prompt TEXT,
+                enhanced_prompt TEXT,
+                audio_path TEXT,
+                image_path TEXT,
+                narration_hash TEXT,
+                prompt_hash TEXT,
+                status TEXT DEFAULT 'pending',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (project_id, scene_number),
+                FOREIGN KEY (project_id) REFERENCES projects(id)
+            )
+        """)
+        
         # Videos table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS videos (
@@ -77,6 +363,62 @@ class Database:
             )
         """)
         
+        # Veo jobs table (long-running operations, resumable after reload)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS veo_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_id INTEGER,
+                scene_number INTEGER,
+                prompt TEXT NOT NULL,
+                operation_name TEXT NOT NULL,
+                output_path TEXT,
+                status TEXT DEFAULT 'running',
+                error_message TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (project_id) REFERENCES projects(id)
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_veo_jobs_project_status
+            ON veo_jobs (project_id, status)
+        """)
+        
+        # Agent metrics table (one row per agent/provider call, written in batches)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS agent_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_id INTEGER,
+                agent_name TEXT NOT NULL,
+                provider TEXT,
+                operation TEXT,
+                status TEXT,
+                duration REAL,
+                attempts INTEGER DEFAULT 1,
+                bytes_in INTEGER DEFAULT 0,
+                bytes_out INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Trace spans table (pipeline timeline, see utils.tracing)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS trace_spans (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                trace_id TEXT NOT NULL,
+                span_id TEXT NOT NULL,
+                parent_id TEXT,
+                project_id INTEGER,
+                name TEXT NOT NULL,
+                start_time REAL NOT NULL,
+                duration REAL NOT NULL,
+                status TEXT,
+                attrs TEXT,
+                thread TEXT,
+                pid INTEGER
+            )
+        """)
+        
         # YouTube channels table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS youtube_channels (
@@ -91,6 +433,176 @@ class Database:
             )
         """)
         
+        # Competitor transcripts (segments as zlib JSON, see _pack_segments)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS video_transcripts (
+                video_id TEXT PRIMARY KEY,
+                channel_url TEXT,
+                title TEXT,
+                segments BLOB NOT NULL,
+                char_count INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Multi-channel analysis batches (see utils.channel_batch): one row
+        # per batch and one checkpoint row per channel
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS channel_batches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                status TEXT DEFAULT 'pending',
+                params TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS channel_batch_items (
+                batch_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                channel_url TEXT NOT NULL,
+                status TEXT DEFAULT 'pending',
+                video_count INTEGER,
+                attempts INTEGER DEFAULT 0,
+                error_message TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (batch_id, channel_url),
+                FOREIGN KEY (batch_id) REFERENCES channel_batches(id)
+            )
+        """)
+        
+        # Full-text rows of each video (chunk_id is the rowid in
+        # video_transcripts_fts, so a re-save deletes them by rowid)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS video_transcript_chunks (
+                chunk_id INTEGER PRIMARY KEY,
+                video_id TEXT NOT NULL
+            )
+        """)
+        
+        # Full-text index over transcript chunks (needs SQLite built with FTS5).
+        # It keeps its own copy of the chunk text next to the compressed
+        # segments: snippet() and the returned text need it, and a contentless
+        # table could not delete old rows without rebuilding their text
+        # (SQLite < 3.43 has no contentless_delete)
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS video_transcripts_fts USING fts5(
+                    text,
+                    video_id UNINDEXED,
+                    start UNINDEXED,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+            """)
+            self.fts_enabled = True
+        except sqlite3.OperationalError as e:
+            print(f"[DB] FTS5 no disponible, búsqueda de transcripciones desactivada: {e}")
+            self.fts_enabled = False
+        
+        self._create_indexes(cursor)
+        
+        self.conn.commit()
+        self._migrate()
+    
+    def _create_indexes(self, cursor: sqlite3.Cursor):
+        """Indexes backing the listing queries (status filters, newest-first order)."""
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_projects_created ON projects (created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_projects_status_created ON projects (status, created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_videos_project_created ON videos (project_id, created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_videos_status_created ON videos (status, created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_agents_log_project_created ON agents_log (project_id, created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_agents_log_project_agent ON agents_log (project_id, agent_name)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_agent_metrics_created ON agent_metrics (created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_agent_metrics_project ON agent_metrics (project_id, agent_name)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trace_spans_trace ON trace_spans (trace_id, start_time)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trace_spans_project ON trace_spans (project_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_video_transcripts_channel ON video_transcripts (channel_url)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_video_transcript_chunks_video ON video_transcript_chunks (video_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_channel_batch_items_status ON channel_batch_items (batch_id, status)")
+    
+    def _keyset_page(
+        self,
+        table: str,
+        columns: tuple,
+        filters: Dict[str, Any],
+        limit: int,
+        cursor_key: Optional[tuple],
+        descending: bool = True,
+        extra_columns: str = ""
+    ) -> Dict[str, Any]:
+        """
+        One page of rows ordered by (created_at, id), continuing after cursor_key.
+        
+        Returns:
+            {"items": [...], "next_cursor": (created_at, id) or None}
+        """
+        where, params = [], []
+        for column, value in filters.items():
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        
+        if cursor_key is not None:
+            op = "<" if descending else ">"
+            where.append(f"(created_at, id) {op} (?, ?)")
+            params.extend(cursor_key)
+        
+        order = "DESC" if descending else "ASC"
+        query = f"SELECT {', '.join(columns)}{extra_columns} FROM {table}"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += f" ORDER BY created_at {order}, id {order} LIMIT ?"
+        params.append(limit + 1)
+        
+        rows = [dict(row) for row in self.conn.execute(query, params).fetchall()]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1]["created_at"], rows[-1]["id"])
+        return {"items": rows, "next_cursor": next_cursor}
+    
+    def _migrate(self):
+        """Run data migrations pending for this database file (PRAGMA user_version)."""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        
+        if version < 1:
+            self._migrate_scene_blobs()
+        
+        if version < 2 and self.fts_enabled:
+            self._migrate_transcript_chunks()
+        
+        if version < SCHEMA_VERSION:
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self.conn.commit()
+    
+    def _migrate_transcript_chunks(self):
+        """Map full-text rows indexed before video_transcript_chunks existed."""
+        self.conn.execute("""
+            INSERT OR IGNORE INTO video_transcript_chunks (chunk_id, video_id)
+            SELECT rowid, video_id FROM video_transcripts_fts
+        """)
+        self.conn.commit()
+    
+    def _migrate_scene_blobs(self):
+        """Copy scenes out of production_plan JSON blobs into the scenes table."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT id, production_plan FROM projects
+            WHERE production_plan IS NOT NULL
+              AND id NOT IN (SELECT DISTINCT project_id FROM scenes)
+        """)
+        
+        for project_id, plan_json in cursor.fetchall():
+            try:
+                plan = json.loads(plan_json)
+            except (TypeError, ValueError):
+                continue
+            
+            scenes = plan.get("scenes", []) if isinstance(plan, dict) else plan
+            if isinstance(scenes, list) and scenes:
+                self.upsert_scenes(project_id, [s for s in scenes if isinstance(s, dict)], commit=False)
+        
         self.conn.commit()
     
     # Project methods
@@ -169,6 +681,155 @@ class Database:
         
         return projects
     
+    def list_project_summaries(
+        self,
+        status: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[tuple] = None
+    ) -> Dict[str, Any]:
+        """
+        Newest-first page of projects without their production_plan.
+        
+        Args:
+            status: Optional status filter
+            limit: Page size
+            cursor: next_cursor of the previous page (None for the first page)
+        
+        Returns:
+            {"items": [...], "next_cursor": ...}; items carry scene_count
+        """
+        return self._keyset_page(
+            "projects", PROJECT_SUMMARY_COLUMNS, {"status": status}, limit, cursor,
+            extra_columns=", (SELECT COUNT(*) FROM scenes WHERE scenes.project_id = projects.id) AS scene_count"
+        )
+    
+    def get_project_plan(self, project_id: int) -> Optional[Dict[str, Any]]:
+        """Load the production_plan of one project (lazy counterpart of the summaries)."""
+        row = self.conn.execute(
+            "SELECT production_plan FROM projects WHERE id = ?", (project_id,)
+        ).fetchone()
+        if row is None or not row[0]:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+    
+    # Scene methods
+    def upsert_scenes(
+        self,
+        project_id: int,
+        scenes: List[Dict[str, Any]],
+        commit: bool = True,
+        prune: bool = False
+    ) -> int:
+        """
+        Insert or update a batch of scenes in one transaction.
+        
+        Scene numbers come from 'scene_number', 'id' or list position. Fields
+        missing from a scene dict (or None) keep their stored value. A scene
+        whose narration (or visual prompt) changed goes back to 'pending' and
+        loses its audio (or image) unless the dict brings a new path.
+        
+        Args:
+            commit: Commit the transaction (False joins the caller's one)
+            prune: Delete stored scenes that are not in the list
+        
+        Returns:
+            Number of scenes written
+        """
+        rows = []
+        for index, scene in enumerate(scenes):
+            values = {field: scene.get(field) for field in SCENE_FIELDS}
+            rows.append((
+                project_id,
+                _scene_number(scene, index),
+                *(values[field] for field in SCENE_FIELDS),
+                _text_hash(values["narration"]),
+                _text_hash(values["visual_prompt"]),
+            ))
+        
+        columns = ", ".join(SCENE_FIELDS)
+        placeholders = ", ".join("?" for _ in SCENE_FIELDS)
+        updates = [
+            f"{field} = COALESCE(excluded.{field}, scenes.{field})"
+            for field in SCENE_FIELDS + ("narration_hash", "prompt_hash")
+            if field not in ("audio_path", "image_path", "status")
+        ]
+        # Edited text invalidates the asset built from it; a path equal to
+        # the stored one is the stale asset echoed back, not a new one
+        changed = {
+            "audio_path": "excluded.narration_hash IS NOT NULL AND excluded.narration_hash IS NOT scenes.narration_hash",
+            "image_path": "excluded.prompt_hash IS NOT NULL AND excluded.prompt_hash IS NOT scenes.prompt_hash",
+        }
+        for field, condition in changed.items():
+            updates.append(f"""{field} = CASE
+                    WHEN ({condition}) AND (excluded.{field} IS NULL OR excluded.{field} IS scenes.{field}) THEN NULL
+                    ELSE COALESCE(excluded.{field}, scenes.{field})
+                END""")
+        updates.append(f"""status = CASE
+                    WHEN ({changed["audio_path"]}) OR ({changed["image_path"]}) THEN 'pending'
+                    ELSE COALESCE(excluded.status, scenes.status)
+                END""")
+        updates = ",\n                    ".join(updates)
+        
+        # commit=False runs inside the caller's transaction
+        with self.conn if commit else nullcontext():
+            self.conn.executemany(f"""
+                INSERT INTO scenes (project_id, scene_number, {columns}, narration_hash, prompt_hash)
+                VALUES (?, ?, {placeholders}, ?, ?)
+                ON CONFLICT (project_id, scene_number) DO UPDATE SET
+                    {updates},
+                    updated_at = CURRENT_TIMESTAMP
+            """, rows)
+            
+            # New rows without an explicit status start as 'pending' (the
+            # explicit NULL bound above bypasses the column DEFAULT)
+            self.conn.execute(
+                "UPDATE scenes SET status = 'pending' WHERE project_id = ? AND status IS NULL",
+                (project_id,)
+            )
+            
+            # A pending scene becomes ready once it has both audio and image
+            self.conn.execute("""
+                UPDATE scenes SET status = 'ready'
+                WHERE project_id = ? AND status = 'pending'
+                  AND audio_path IS NOT NULL AND image_path IS NOT NULL
+            """, (project_id,))
+            
+            if prune:
+                numbers = [row[1] for row in rows]
+                self.conn.execute(
+                    f"DELETE FROM scenes WHERE project_id = ? AND scene_number NOT IN ({', '.join('?' for _ in numbers)})",
+                    (project_id, *numbers)
+                )
+        
+        return len(rows)
+    
+    def update_scene_assets(self, project_id: int, scene_number: int, **fields: Any):
+        """
+        Update columns of a single scene row (created if missing).
+        
+        Args:
+            fields: Any of SCENE_FIELDS, e.g. image_path="...", audio_path="..."
+        """
+        unknown = set(fields) - set(SCENE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown scene fields: {', '.join(sorted(unknown))}")
+        
+        scene = dict(fields, scene_number=scene_number)
+        self.upsert_scenes(project_id, [scene])
+    
+    def get_scenes(self, project_id: int) -> List[Dict[str, Any]]:
+        """Get all scenes of a project ordered by scene number."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT * FROM scenes 
+            WHERE project_id = ? 
+            ORDER BY scene_number ASC
+        """, (project_id,))
+        return [dict(row) for row in cursor.fetchall()]
+    
     # Video methods
     def create_video(
         self,
@@ -241,6 +902,18 @@ class Database:
         
         return videos
     
+    def list_video_summaries(
+        self,
+        project_id: Optional[int] = None,
+        status: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[tuple] = None
+    ) -> Dict[str, Any]:
+        """Newest-first page of videos without description/hashtags (see get_video)."""
+        return self._keyset_page(
+            "videos", VIDEO_SUMMARY_COLUMNS, {"project_id": project_id, "status": status}, limit, cursor
+        )
+    
     def update_video_status(self, video_id: int, status: str):
         """Update video status."""
         cursor = self.conn.cursor()
@@ -272,30 +945,55 @@ class Database:
         execution_time: Optional[float] = None
     ):
         """Log agent completion."""
-        cursor = self.conn.cursor()
         output_json = json.dumps(output_data) if output_data else None
         
-        cursor.execute("""
+        self._log_write("""
             UPDATE agents_log 
             SET status = 'completed', output_data = ?, execution_time = ?
             WHERE id = ?
         """, (output_json, execution_time, log_id))
-        
-        self.conn.commit()
     
     def log_agent_error(self, log_id: int, error_message: str):
         """Log agent error."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        self._log_write("""
             UPDATE agents_log 
             SET status = 'error', error_message = ?
             WHERE id = ?
         """, (error_message, log_id))
-        
-        self.conn.commit()
+    
+    def log_agent_event(
+        self,
+        project_id: Optional[int],
+        agent_name: str,
+        status: str = "completed",
+        input_data: Optional[Dict[str, Any]] = None,
+        output_data: Optional[Dict[str, Any]] = None,
+        execution_time: Optional[float] = None,
+        error_message: Optional[str] = None
+    ):
+        """Log a finished agent action as a single row (queued when batching)."""
+        self._log_write("""
+            INSERT INTO agents_log 
+            (project_id, agent_name, status, input_data, output_data, execution_time, error_message)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            project_id, agent_name, status,
+            json.dumps(input_data) if input_data else None,
+            json.dumps(output_data) if output_data else None,
+            execution_time, error_message
+        ))
+    
+    def _log_write(self, sql: str, params: tuple):
+        """Write a log statement through the batch queue, or directly."""
+        if self.writer is not None:
+            self.writer.submit(sql, params)
+        else:
+            self.conn.execute(sql, params)
+            self.conn.commit()
     
     def get_agent_logs(self, project_id: int) -> List[Dict[str, Any]]:
         """Get all agent logs for a project."""
+        self.flush()
         cursor = self.conn.cursor()
         cursor.execute("""
             SELECT * FROM agents_log 
@@ -322,6 +1020,202 @@ class Database:
         
         return logs
     
+    def list_agent_log_summaries(
+        self,
+        project_id: int,
+        agent_name: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[tuple] = None
+    ) -> Dict[str, Any]:
+        """Oldest-first page of a project's agent logs without input/output payloads."""
+        self.flush()
+        return self._keyset_page(
+            "agents_log", AGENT_LOG_SUMMARY_COLUMNS,
+            {"project_id": project_id, "agent_name": agent_name},
+            limit, cursor, descending=False
+        )
+    
+    def get_agent_log_payload(self, log_id: int) -> Optional[Dict[str, Any]]:
+        """Load the input_data/output_data of one agent log entry."""
+        self.flush()
+        row = self.conn.execute(
+            "SELECT input_data, output_data FROM agents_log WHERE id = ?", (log_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        payload = {}
+        for key in ("input_data", "output_data"):
+            try:
+                payload[key] = json.loads(row[key]) if row[key] else None
+            except ValueError:
+                payload[key] = row[key]
+        return payload
+    
+    # Agent metrics methods
+    def insert_agent_metrics(self, rows: List[tuple]):
+        """
+        Insert a batch of metric rows (see utils.metrics.MetricsRegistry.record):
+        (project_id, agent_name, provider, operation, status, duration,
+        attempts, bytes_in, bytes_out, created_at).
+        """
+        self.conn.executemany("""
+            INSERT INTO agent_metrics 
+            (project_id, agent_name, provider, operation, status, duration, 
+             attempts, bytes_in, bytes_out, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        self.conn.commit()
+    
+    def get_agent_metrics_summary(
+        self,
+        project_id: Optional[int] = None,
+        since: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregate metrics per (agent, provider, operation), slowest stage first.
+        
+        Args:
+            project_id: Only calls of this project
+            since: Only calls at or after this UTC timestamp ('YYYY-MM-DD HH:MM:SS')
+        
+        Returns:
+            Rows with calls, failures, retries, total/avg/max duration, bytes
+            in/out and time_share (fraction of the total time of all rows)
+        """
+        query = """
+            SELECT agent_name, provider, operation,
+                   COUNT(*) AS calls,
+                   SUM(status = 'error') AS failures,
+                   SUM(attempts - 1) AS retries,
+                   SUM(duration) AS total_time,
+                   AVG(duration) AS avg_time,
+                   MAX(duration) AS max_time,
+                   SUM(bytes_in) AS bytes_in,
+                   SUM(bytes_out) AS bytes_out
+            FROM agent_metrics WHERE 1=1
+        """
+        params = []
+        
+        if project_id is not None:
+            query += " AND project_id = ?"
+            params.append(project_id)
+        
+        if since:
+            query += " AND created_at >= ?"
+            params.append(since)
+        
+        query += " GROUP BY agent_name, provider, operation ORDER BY total_time DESC"
+        
+        rows = [dict(row) for row in self.conn.execute(query, params).fetchall()]
+        grand_total = sum(row["total_time"] or 0 for row in rows)
+        for row in rows:
+            row["time_share"] = (row["total_time"] or 0) / grand_total if grand_total else 0.0
+        return rows
+    
+    # Trace span methods
+    def insert_trace_spans(self, rows: List[tuple]):
+        """
+        Insert a batch of spans (see utils.tracing): (trace_id, span_id,
+        parent_id, project_id, name, start_time, duration, status, attrs,
+        thread, pid).
+        """
+        self.conn.executemany("""
+            INSERT INTO trace_spans 
+            (trace_id, span_id, parent_id, project_id, name, start_time, 
+             duration, status, attrs, thread, pid)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        self.conn.commit()
+    
+    def get_trace_spans(
+        self,
+        project_id: Optional[int] = None,
+        trace_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Spans of one trace, or of every trace that touched a project (spans
+        recorded before the project existed are included through their trace).
+        """
+        if trace_id is not None:
+            query = "SELECT * FROM trace_spans WHERE trace_id = ? ORDER BY start_time"
+            params = (trace_id,)
+        elif project_id is not None:
+            query = """
+                SELECT * FROM trace_spans 
+                WHERE trace_id IN (SELECT DISTINCT trace_id FROM trace_spans WHERE project_id = ?)
+                ORDER BY start_time
+            """
+            params = (project_id,)
+        else:
+            raise ValueError("project_id or trace_id is required")
+        
+        return [dict(row) for row in self.conn.execute(query, params).fetchall()]
+    
+    # Veo job methods
+    def create_veo_job(
+        self,
+        project_id: Optional[int],
+        scene_number: Optional[int],
+        prompt: str,
+        operation_name: str,
+        output_path: Optional[str] = None
+    ) -> int:
+        """Persist a submitted Veo operation and return the job ID."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            INSERT INTO veo_jobs (project_id, scene_number, prompt, operation_name, output_path)
+            VALUES (?, ?, ?, ?, ?)
+        """, (project_id, scene_number, prompt, operation_name, output_path))
+        
+        self.conn.commit()
+        return cursor.lastrowid
+    
+    def update_veo_job(
+        self,
+        job_id: int,
+        status: str,
+        output_path: Optional[str] = None,
+        error_message: Optional[str] = None
+    ):
+        """Update a Veo job's status (running, downloading, completed, error)."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            UPDATE veo_jobs 
+            SET status = ?, output_path = COALESCE(?, output_path), error_message = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (status, output_path, error_message, job_id))
+        self.conn.commit()
+    
+    def find_veo_job(self, project_id: Optional[int], scene_number: Optional[int], prompt: str) -> Optional[Dict[str, Any]]:
+        """Latest non-failed job for the same project, scene and prompt."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT * FROM veo_jobs 
+            WHERE project_id IS ? AND scene_number IS ? AND prompt = ? AND status != 'error'
+            ORDER BY id DESC LIMIT 1
+        """, (project_id, scene_number, prompt))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    
+    def list_veo_jobs(self, project_id: Optional[int] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List Veo jobs, optionally filtered by project and status."""
+        cursor = self.conn.cursor()
+        query = "SELECT * FROM veo_jobs WHERE 1=1"
+        params = []
+        
+        if project_id is not None:
+            query += " AND project_id = ?"
+            params.append(project_id)
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        
+        query += " ORDER BY id ASC"
+        cursor.execute(query, params)
+        return [dict(row) for row in cursor.fetchall()]
+    
     # YouTube channel methods
     def save_youtube_channel(
         self,
@@ -388,28 +1282,249 @@ class Database:
         
         return channels
     
+    # Channel batch methods
+    def create_channel_batch(
+        self,
+        channel_urls: List[str],
+        name: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Create a batch with one pending item per channel (duplicates dropped) and return its ID."""
+        conn = self.conn
+        cursor = conn.execute(
+            "INSERT INTO channel_batches (name, params) VALUES (?, ?)",
+            (name, json.dumps(params) if params else None)
+        )
+        batch_id = cursor.lastrowid
+        conn.executemany(
+            "INSERT OR IGNORE INTO channel_batch_items (batch_id, position, channel_url) VALUES (?, ?, ?)",
+            [(batch_id, position, url) for position, url in enumerate(dict.fromkeys(channel_urls))]
+        )
+        conn.commit()
+        return batch_id
+    
+    def get_channel_batch(self, batch_id: int) -> Optional[Dict[str, Any]]:
+        """Batch row with params decoded and item counts by status ("counts")."""
+        row = self.conn.execute("SELECT * FROM channel_batches WHERE id = ?", (batch_id,)).fetchone()
+        if row is None:
+            return None
+        batch = dict(row)
+        batch["params"] = json.loads(batch["params"]) if batch.get("params") else {}
+        batch["counts"] = {
+            status: count for status, count in self.conn.execute(
+                "SELECT status, COUNT(*) FROM channel_batch_items WHERE batch_id = ? GROUP BY status",
+                (batch_id,)
+            ).fetchall()
+        }
+        return batch
+    
+    def list_channel_batches(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Batches, newest first (params left as JSON text)."""
+        query = "SELECT * FROM channel_batches"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY id DESC"
+        return [dict(row) for row in self.conn.execute(query, params).fetchall()]
+    
+    def update_channel_batch_status(self, batch_id: int, status: str):
+        """Update a batch's status (pending, running, completed, error)."""
+        self.conn.execute(
+            "UPDATE channel_batches SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (status, batch_id)
+        )
+        self.conn.commit()
+    
+    def get_channel_batch_items(self, batch_id: int, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Items of a batch in their original order, optionally filtered by status."""
+        query = "SELECT * FROM channel_batch_items WHERE batch_id = ?"
+        params: List[Any] = [batch_id]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        query += " ORDER BY position"
+        return [dict(row) for row in self.conn.execute(query, params).fetchall()]
+    
+    def update_channel_batch_item(
+        self,
+        batch_id: int,
+        channel_url: str,
+        status: Optional[str] = None,
+        video_count: Optional[int] = None,
+        error_message: Optional[str] = None
+    ):
+        """
+        Checkpoint one channel of a batch. A status change clears the
+        error; an error_message without status records a failed attempt.
+        """
+        self.conn.execute("""
+            UPDATE channel_batch_items 
+            SET status = COALESCE(?, status),
+                video_count = COALESCE(?, video_count),
+                attempts = attempts + (? IS NOT NULL),
+                error_message = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE batch_id = ? AND channel_url = ?
+        """, (status, video_count, error_message, error_message, batch_id, channel_url))
+        self.conn.commit()
+    
+    # Video transcript methods
+    def save_video_transcript(
+        self,
+        video_id: str,
+        segments: List[Dict[str, Any]],
+        channel_url: Optional[str] = None,
+        title: Optional[str] = None,
+        commit: bool = True
+    ):
+        """
+        Save (or replace) a video's transcript and re-index its chunks.
+        
+        Args:
+            video_id: YouTube video ID
+            segments: Timed segments ({"text", "start", "duration"})
+            channel_url: Channel the video was scraped from
+            title: Video title
+            commit: Commit immediately (False to batch several videos)
+        """
+        conn = self.conn
+        char_count = sum(len(seg.get("text") or "") for seg in segments)
+        conn.execute("""
+            INSERT OR REPLACE INTO video_transcripts 
+            (video_id, channel_url, title, segments, char_count)
+            VALUES (?, ?, ?, ?, ?)
+        """, (video_id, channel_url, title, _pack_segments(segments), char_count))
+        
+        if self.fts_enabled:
+            # video_id is UNINDEXED in the FTS table: find old rows through
+            # the chunk map and delete them by rowid (no full index scan)
+            old_chunks = conn.execute(
+                "SELECT chunk_id FROM video_transcript_chunks WHERE video_id = ?", (video_id,)
+            ).fetchall()
+            conn.executemany("DELETE FROM video_transcripts_fts WHERE rowid = ?", old_chunks)
+            conn.execute("DELETE FROM video_transcript_chunks WHERE video_id = ?", (video_id,))
+            for start, text in _transcript_chunks(segments):
+                chunk_id = conn.execute(
+                    "INSERT INTO video_transcript_chunks (video_id) VALUES (?)", (video_id,)
+                ).lastrowid
+                conn.execute(
+                    "INSERT INTO video_transcripts_fts (rowid, text, video_id, start) VALUES (?, ?, ?, ?)",
+                    (chunk_id, text, video_id, start)
+                )
+        
+        if commit:
+            conn.commit()
+    
+    def get_video_transcripts(self, video_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Stored transcripts by video ID (videos without one are left out).
+        Each value has the row columns with "segments" decompressed.
+        """
+        transcripts = {}
+        ids = list(dict.fromkeys(video_ids))
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT * FROM video_transcripts WHERE video_id IN ({', '.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+            for row in rows:
+                transcript = dict(row)
+                transcript["segments"] = _unpack_segments(transcript["segments"])
+                transcripts[transcript["video_id"]] = transcript
+        return transcripts
+    
+    def get_video_transcript(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """Stored transcript of one video (see get_video_transcripts)."""
+        return self.get_video_transcripts([video_id]).get(video_id)
+    
+    def search_transcripts(
+        self,
+        query: str,
+        limit: int = 20,
+        channel_url: Optional[str] = None,
+        max_rank: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Full-text search over stored transcript chunks, best match first.
+        
+        Args:
+            query: Free text; "quoted phrases" must match as phrases
+            limit: Maximum hits
+            channel_url: Only videos of this channel
+            max_rank: Only hits with a bm25 rank at or below this (e.g. -1.0
+                drops chunks that only match words common to most chunks)
+        
+        Returns:
+            Hits with video_id, title, channel_url, start (seconds into the
+            video), text (the whole chunk), snippet (matches in [brackets])
+            and rank (bm25, lower is better); [] without FTS5
+        """
+        match = _fts_query(query)
+        if not self.fts_enabled or match is None:
+            return []
+        
+        sql = """
+            SELECT f.video_id, t.title, t.channel_url, f.start, f.text,
+                   snippet(video_transcripts_fts, 0, '[', ']', '…', 16) AS snippet,
+                   bm25(video_transcripts_fts) AS rank
+            FROM video_transcripts_fts AS f
+            JOIN video_transcripts AS t ON t.video_id = f.video_id
+            WHERE video_transcripts_fts MATCH ?
+        """
+        params: List[Any] = [match]
+        if channel_url is not None:
+            sql += " AND t.channel_url = ?"
+            params.append(channel_url)
+        if max_rank is not None:
+            sql += " AND bm25(video_transcripts_fts) <= ?"
+            params.append(max_rank)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+        
+        return [dict(row) for row in self.conn.execute(sql, params).fetchall()]
+    
+    def flush(self):
+        """Wait for queued writes to be committed (no-op without write queue)."""
+        if self.writer is not None:
+            self.writer.flush()
+    
     def close(self):
-        """Close database connection."""
-        self.conn.close()
+        """Flush queued writes and close every pooled connection."""
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        with self._pool_lock:
+            for _, conn in self._connections.values():
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
 
 
 # Global database instance
 _db_instance: Optional[Database] = None
+_db_instance_lock = threading.Lock()
 
 def get_db() -> Database:
-    """Get or create global database instance."""
+    """Get or create global database instance (with batched log writes)."""
     global _db_instance
     if _db_instance is None:
-        _db_instance = Database()
+        with _db_instance_lock:
+            if _db_instance is None:
+                _db_instance = Database(write_queue=True)
+                atexit.register(_db_instance.flush)
     return _db_instance
 
 
 # Simplified helper functions for MVP
 def log_agent_action(project_id: int, agent_name: str, message: str):
     """Simplified logging function for agent actions."""
-    db = get_db()
-    log_id = db.log_agent_start(project_id, agent_name, {"message": message})
-    db.log_agent_complete(log_id, {"message": message})
+    get_db().log_agent_event(project_id, agent_name, "completed", {"message": message}, {"message": message})
 
 
 def create_project(topic: str, style: str = "Industrial") -> int:
@@ -427,77 +1542,23 @@ def create_project(topic: str, style: str = "Industrial") -> int:
 
 def update_project_script(project_id: int, script_content):
     """Guarda el guion generado en la base de datos."""
-    import sqlite3
-    from config.settings import DATABASE_PATH
-    
-    conn = sqlite3.connect(str(DATABASE_PATH))
-    c = conn.cursor()
+    db = get_db()
     # Guardamos el script como texto (JSON string)
-    c.execute(
-        "UPDATE projects SET production_plan = ?, status = 'scripted' WHERE id = ?", 
-        (json.dumps(script_content), project_id)
-    )
-    conn.commit()
-    conn.close()
+    db.update_project_plan(project_id, script_content)
+    db.update_project_status(project_id, "scripted")
+    
+    # Escenas normalizadas (una fila por escena)
+    scenes = script_content.get("scenes", []) if isinstance(script_content, dict) else script_content
+    if isinstance(scenes, list) and scenes:
+        # Un guion más corto no deja escenas huérfanas
+        db.upsert_scenes(project_id, scenes, prune=True)
 
 
 def update_scene_image(project_id: int, scene_number: int, image_path: str):
     """Guarda la ruta de la imagen generada para una escena específica."""
-    import sqlite3
-    from config.settings import DATABASE_PATH
-    
-    conn = sqlite3.connect(str(DATABASE_PATH))
-    c = conn.cursor()
-    
-    # Recuperar el script actual
-    c.execute("SELECT production_plan FROM projects WHERE id = ?", (project_id,))
-    row = c.fetchone()
-    
-    if row and row[0]:
-        script = json.loads(row[0])
-        
-        # Buscar la escena y añadir el campo 'image_path'
-        for scene in script:
-            if scene.get('scene_number') == scene_number:
-                scene['image_path'] = str(image_path)
-                break
-        
-        # Guardar el script actualizado
-        c.execute(
-            "UPDATE projects SET production_plan = ? WHERE id = ?", 
-            (json.dumps(script), project_id)
-        )
-        conn.commit()
-    
-    conn.close()
+    get_db().update_scene_assets(project_id, scene_number, image_path=str(image_path))
 
 
 def update_scene_audio(project_id: int, scene_number: int, audio_path: str):
     """Guarda la ruta del audio generado para una escena específica."""
-    import sqlite3
-    from config.settings import DATABASE_PATH
-    
-    conn = sqlite3.connect(str(DATABASE_PATH))
-    c = conn.cursor()
-    
-    # Recuperar el script actual
-    c.execute("SELECT production_plan FROM projects WHERE id = ?", (project_id,))
-    row = c.fetchone()
-    
-    if row and row[0]:
-        script = json.loads(row[0])
-        
-        # Buscar la escena y añadir el campo 'audio_path'
-        for scene in script:
-            if scene.get('scene_number') == scene_number:
-                scene['audio_path'] = str(audio_path)
-                break
-        
-        # Guardar el script actualizado
-        c.execute(
-            "UPDATE projects SET production_plan = ? WHERE id = ?", 
-            (json.dumps(script), project_id)
-        )
-        conn.commit()
-    
-    conn.close()
+    get_db().update_scene_assets(project_id, scene_number, audio_path=str(audio_path))
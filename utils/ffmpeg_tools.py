@@ -0,0 +1,354 @@
+"""
+FFmpeg Utilities
+
+Thin wrappers around the ffmpeg binary bundled with MoviePy (imageio-ffmpeg)
+for operations that don't need a decode/encode round-trip in Python, plus
+FrameEncoder, which pipes raw frames rendered in Python into a single
+ffmpeg encoder through a bounded queue.
+"""
+
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import List, Optional, Sequence, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+PathLike = Union[str, Path]
+
+
+def get_ffmpeg_binary() -> str:
+    """Return the ffmpeg executable MoviePy is configured to use."""
+    try:
+        from moviepy.config import get_setting
+        return get_setting("FFMPEG_BINARY")
+    except Exception:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def run_ffmpeg(args: List[str]) -> None:
+    """
+    Run ffmpeg with the given arguments.
+
+    Args:
+        args: Arguments after the binary name (output path last)
+
+    Raises:
+        RuntimeError: If ffmpeg exits with a non-zero status
+    """
+    cmd = [get_ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y"] + [str(a) for a in args]
+    logger.debug(f"Running: {' '.join(cmd)}")
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"ffmpeg failed ({result.returncode}): {result.stderr.decode('utf-8', 'replace').strip()}"
+        )
+
+
+def concat_segments(segment_paths: List[PathLike], output_path: PathLike) -> Path:
+    """
+    Join encoded segments with the concat demuxer, without re-encoding.
+
+    All segments must share codec, resolution, frame rate and audio layout.
+
+    Args:
+        segment_paths: Segment files in playback order
+        output_path: Output video path
+
+    Returns:
+        Output file path
+    """
+    output_path = Path(output_path)
+    list_path = output_path.with_name(output_path.stem + "_concat.txt")
+
+    with open(list_path, "w", encoding="utf-8") as f:
+        for segment in segment_paths:
+            # Escape single quotes for the concat list syntax
+            escaped = os.path.abspath(segment).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    try:
+        run_ffmpeg([
+            "-f", "concat", "-safe", "0", "-i", list_path,
+            "-c", "copy", "-movflags", "+faststart",
+            output_path
+        ])
+    finally:
+        list_path.unlink(missing_ok=True)
+
+    return output_path
+
+
+def mix_background_music(
+    video_path: PathLike,
+    music_path: PathLike,
+    output_path: PathLike,
+    volume: float = 0.15,
+    audio_bitrate: str = "192k"
+) -> Path:
+    """
+    Mix looped background music under the video's audio track.
+
+    The video stream is copied; only the audio is re-encoded.
+
+    Args:
+        video_path: Input video (with narration audio)
+        music_path: Background music file
+        output_path: Output video path
+        volume: Music gain (0.15 = 15%)
+        audio_bitrate: AAC bitrate for the mixed track
+
+    Returns:
+        Output file path
+    """
+    run_ffmpeg([
+        "-i", video_path,
+        "-stream_loop", "-1", "-i", music_path,
+        "-filter_complex",
+        f"[1:a]volume={volume}[bg];"
+        "[0:a][bg]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[mix]",
+        "-map", "0:v", "-map", "[mix]",
+        "-c:v", "copy", "-c:a", "aac", "-b:a", audio_bitrate,
+        "-movflags", "+faststart",
+        output_path
+    ])
+    return Path(output_path)
+
+
+def decode_audio_pcm(audio_path: PathLike, sample_rate: int = 16000):
+    """
+    Decode an audio file to mono float32 samples in [-1, 1].
+
+    Args:
+        audio_path: Input audio file
+        sample_rate: Output sample rate in Hz
+
+    Returns:
+        NumPy array of samples
+    """
+    import numpy as np
+
+    cmd = [
+        get_ffmpeg_binary(), "-hide_banner", "-loglevel", "error",
+        "-i", str(audio_path),
+        "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sample_rate),
+        "-"
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"ffmpeg failed ({result.returncode}): {result.stderr.decode('utf-8', 'replace').strip()}"
+        )
+    return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def build_narration_track(
+    audio_paths: Sequence[PathLike],
+    durations: Sequence[float],
+    output_path: PathLike,
+    sample_rate: int = 44100,
+    audio_bitrate: str = "192k"
+) -> Path:
+    """
+    Concatenate per-scene narration into one AAC track, trimming or padding
+    each file with silence to its scene duration.
+
+    Args:
+        audio_paths: Narration files in playback order
+        durations: Length of each scene in seconds
+        output_path: Output audio path (.m4a)
+
+    Returns:
+        Output file path
+    """
+    args, filters = [], []
+    for i, (path, duration) in enumerate(zip(audio_paths, durations)):
+        args += ["-i", path]
+        filters.append(
+            f"[{i}:a]aresample={sample_rate},aformat=channel_layouts=stereo,"
+            f"atrim=0:{duration:.6f},apad=whole_dur={duration:.6f}[a{i}]"
+        )
+    inputs = "".join(f"[a{i}]" for i in range(len(filters)))
+    filters.append(f"{inputs}concat=n={len(filters)}:v=0:a=1[out]")
+
+    run_ffmpeg(args + [
+        "-filter_complex", ";".join(filters),
+        "-map", "[out]", "-c:a", "aac", "-b:a", audio_bitrate,
+        output_path
+    ])
+    return Path(output_path)
+
+
+class FrameEncoder:
+    """
+    Single ffmpeg process fed with raw RGB frames through stdin.
+
+    Frames are handed over through a bounded queue to a writer thread, so
+    rendering the next frame overlaps with the pipe write while at most
+    `max_queued` frames are held in memory (~6 MB each at 1080x1920).
+
+    Usage:
+        with FrameEncoder(path, (1080, 1920), 24, audio_path=track) as encoder:
+            for frame in frames:
+                encoder.write(frame)
+    """
+
+    _DONE = object()
+
+    def __init__(
+        self,
+        output_path: PathLike,
+        size: Sequence[int],
+        fps: float,
+        audio_path: Optional[PathLike] = None,
+        music_path: Optional[PathLike] = None,
+        music_volume: float = 0.15,
+        preset: str = "medium",
+        threads: Optional[int] = None,
+        max_queued: int = 8,
+        audio_bitrate: str = "192k",
+        video_args: Optional[Sequence[str]] = None
+    ):
+        """
+        Args:
+            output_path: Output video path
+            size: Frame size (width, height)
+            fps: Frame rate
+            audio_path: Optional audio track muxed with the frames
+            music_path: Optional background music looped under audio_path
+            music_volume: Music gain (0.15 = 15%)
+            preset: x264 preset
+            threads: Encoder threads (default: ffmpeg decides)
+            max_queued: Frames buffered between the renderer and ffmpeg
+            audio_bitrate: AAC bitrate of the output audio
+            video_args: Extra libx264 options (e.g. ["-crf", "20"])
+        """
+        self.size = (int(size[0]), int(size[1]))
+        self.frame_bytes = self.size[0] * self.size[1] * 3
+        self.frames_written = 0
+
+        width, height = self.size
+        args = [
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}",
+            "-r", str(fps), "-i", "pipe:0",
+        ]
+        if audio_path:
+            args += ["-i", audio_path]
+            if music_path:
+                args += [
+                    "-stream_loop", "-1", "-i", music_path,
+                    "-filter_complex",
+                    f"[2:a]volume={music_volume}[bg];"
+                    "[1:a][bg]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[mix]",
+                    "-map", "0:v", "-map", "[mix]",
+                ]
+            else:
+                args += ["-map", "0:v", "-map", "1:a"]
+            args += ["-c:a", "aac", "-b:a", audio_bitrate, "-shortest"]
+        args += ["-c:v", "libx264", "-preset", preset, "-pix_fmt", "yuv420p"]
+        if video_args:
+            args += list(video_args)
+        if threads:
+            args += ["-threads", str(threads)]
+        args += ["-movflags", "+faststart", str(output_path)]
+
+        cmd = [get_ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y"] + [str(a) for a in args]
+        logger.debug(f"Running: {' '.join(cmd)}")
+        # stderr goes to a file: a full pipe would block ffmpeg mid-encode
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr
+        )
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_queued))
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._writer = threading.Thread(target=self._drain, name="frame-encoder", daemon=True)
+        self._writer.start()
+
+    def _drain(self) -> None:
+        stdin = self._process.stdin
+        while True:
+            frame = self._queue.get()
+            if frame is self._DONE:
+                break
+            if self._error is not None:
+                continue  # Keep consuming so write() never blocks forever
+            try:
+                stdin.write(frame)
+            except (BrokenPipeError, OSError) as e:
+                self._error = e
+        try:
+            stdin.close()
+        except OSError:
+            pass
+
+    def write(self, frame) -> None:
+        """
+        Queue one HxWx3 uint8 frame (blocks while the queue is full).
+
+        Raises:
+            RuntimeError: If ffmpeg stopped accepting frames
+        """
+        if self._error is not None:
+            raise RuntimeError(f"ffmpeg stopped accepting frames: {self._stderr_text() or self._error}")
+        import numpy as np
+
+        # Copy: renderers may reuse their frame buffer, and crops are not contiguous
+        data = np.ascontiguousarray(frame, dtype=np.uint8).tobytes()
+        if len(data) != self.frame_bytes:
+            raise ValueError(f"Frame has {len(data)} bytes, expected {self.frame_bytes} for {self.size}")
+        self._queue.put(data)
+        self.frames_written += 1
+
+    def close(self) -> None:
+        """
+        Flush queued frames and wait for ffmpeg to finish.
+
+        Raises:
+            RuntimeError: If ffmpeg exits with a non-zero status
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer.is_alive():
+            self._queue.put(self._DONE)
+            self._writer.join()
+        returncode = self._process.wait()
+        message = self._stderr_text()
+        self._stderr.close()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed ({returncode}): {message}")
+
+    def abort(self) -> None:
+        """Stop the encoder without waiting for pending frames."""
+        if self._closed:
+            return
+        self._closed = True
+        self._error = self._error or RuntimeError("aborted")
+        self._process.kill()
+        if self._writer.is_alive():
+            self._queue.put(self._DONE)
+            self._writer.join()
+        self._process.wait()
+        self._stderr.close()
+
+    def _stderr_text(self) -> str:
+        try:
+            self._stderr.seek(0)
+            return self._stderr.read().decode("utf-8", "replace").strip()
+        except (OSError, ValueError):
+            return ""
+
+    def __enter__(self) -> "FrameEncoder":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
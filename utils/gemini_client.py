@@ -0,0 +1,214 @@
+"""
+Gemini Client
+
+One shared google-genai client per API key (it pools its HTTP connections)
+and a persistent memo cache for deterministic prompt -> text calls. Memo
+entries are keyed on model + hash of the full request, expire after a
+TTL, and the oldest are evicted once the store exceeds its size cap.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+import logging
+
+from utils.metrics import track
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+MEMO_DB_PATH = os.path.join("assets", "cache", "gemini_memo.db")
+MEMO_TTL_SECONDS = 7 * 24 * 3600
+MEMO_MAX_BYTES = 20 * 1024 * 1024
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _default_api_key() -> Optional[str]:
+    try:
+        import streamlit as st
+        if "GOOGLE_API_KEY" in st.secrets:
+            return st.secrets["GOOGLE_API_KEY"]
+    except Exception:
+        pass
+    return os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+
+
+def get_gemini_client(api_key: Optional[str] = None):
+    """
+    Return the shared Gemini client for an API key.
+
+    Args:
+        api_key: API key (default: GOOGLE_API_KEY from secrets or env)
+
+    Returns:
+        genai.Client, or None if no key is configured
+    """
+    api_key = api_key or _default_api_key()
+    if not api_key:
+        return None
+
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            from google import genai
+            client = genai.Client(api_key=api_key)
+            _clients[api_key] = client
+        return client
+
+
+class GeminiMemo:
+    """SQLite-backed memo of Gemini text responses with TTL and size cap."""
+
+    def __init__(self, db_path: str = MEMO_DB_PATH, ttl: float = MEMO_TTL_SECONDS,
+                 max_bytes: int = MEMO_MAX_BYTES):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        if not self._initialized:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS memo (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_memo_created ON memo(created_at)")
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    @staticmethod
+    def key_for(model: str, contents: str, system_instruction: Optional[str] = None) -> str:
+        payload = json.dumps([model, system_instruction, contents], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the memoized response, or None if missing or expired."""
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    row = conn.execute(
+                        "SELECT response, created_at FROM memo WHERE key = ?", (key,)
+                    ).fetchone()
+                finally:
+                    conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Gemini memo read failed: {e}")
+            return None
+
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        """Store a response, then drop expired and oldest entries over the cap."""
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+                conn = self._connect()
+                try:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO memo (key, model, response, size, created_at) VALUES (?, ?, ?, ?, ?)",
+                        (key, model, response, size, now)
+                    )
+                    conn.execute("DELETE FROM memo WHERE created_at < ?", (now - self.ttl,))
+
+                    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM memo").fetchone()[0]
+                    if total > self.max_bytes:
+                        for old_key, old_size in conn.execute(
+                            "SELECT key, size FROM memo ORDER BY created_at"
+                        ).fetchall():
+                            if total <= self.max_bytes:
+                                break
+                            conn.execute("DELETE FROM memo WHERE key = ?", (old_key,))
+                            total -= old_size
+                    conn.commit()
+                finally:
+                    conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Gemini memo write failed: {e}")
+
+
+_memo = None
+
+
+def get_memo() -> GeminiMemo:
+    """Return the process-wide memo store."""
+    global _memo
+    if _memo is None:
+        _memo = GeminiMemo()
+    return _memo
+
+
+def generate_text(
+    contents: str,
+    model: str = DEFAULT_MODEL,
+    system_instruction: Optional[str] = None,
+    memo: bool = True,
+    refresh: bool = False,
+    client=None,
+    agent: str = "gemini_client"
+) -> str:
+    """
+    Run a text generation with the shared client, memoizing the response.
+
+    Args:
+        contents: Prompt text
+        model: Gemini model name
+        system_instruction: Static instructions sent as system instruction
+        memo: Look up / store the response in the memo cache
+        refresh: Skip the lookup but store the new response (e.g. a retry
+            after an unusable answer)
+        client: Client override (default: shared client)
+        agent: Agent name the call is attributed to in metrics
+
+    Returns:
+        Response text
+
+    Raises:
+        RuntimeError: If no Gemini client is configured
+    """
+    key = GeminiMemo.key_for(model, contents, system_instruction)
+    if memo and not refresh:
+        with track(agent, provider="gemini", operation="memo") as t:
+            cached = get_memo().get(key)
+            if cached is None:
+                t.status = "miss"
+        if cached is not None:
+            logger.debug(f"Gemini memo hit ({model})")
+            return cached
+
+    client = client or get_gemini_client()
+    if client is None:
+        raise RuntimeError("Gemini client not configured (GOOGLE_API_KEY missing)")
+
+    config = None
+    if system_instruction:
+        from google.genai import types
+        config = types.GenerateContentConfig(system_instruction=system_instruction)
+
+    with track(agent, provider="gemini", operation=model, bytes_in=len(contents.encode("utf-8"))) as t:
+        response = client.models.generate_content(model=model, contents=contents, config=config)
+        text = response.text
+        t.bytes_out = len(text.encode("utf-8")) if text else 0
+
+    if memo and text:
+        get_memo().put(key, model, text)
+    return text
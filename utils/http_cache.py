@@ -0,0 +1,213 @@
+"""
+HTTP Cache
+
+One shared requests.Session (keep-alive connection pool, browser-like
+headers) and a conditional-GET cache on disk for pages that agents read
+more than once (product pages in ResearcherAgent).
+
+Responses with an ETag or Last-Modified validator are stored as JSON
+entries in an AssetCache namespace ("http"). A later get() of the same URL
+is answered without a request while the entry is fresh (Cache-Control
+max-age, at least min_fresh seconds), and otherwise revalidated with
+If-None-Match / If-Modified-Since: a 304 reuses the stored body, so an
+unchanged page costs one small round trip instead of a download.
+"""
+
+import email.utils
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.asset_cache import AssetCache
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_MB", "100")) * 1024 * 1024
+HTTP_TIMEOUT = 15.0
+MIN_FRESH_SECONDS = 300.0  # Re-reads within this window skip the network
+POOL_SIZE = 8
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+    "Accept-Language": "es-ES,es;q=0.9,en;q=0.8",
+}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide keep-alive session (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.headers.update(DEFAULT_HEADERS)
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+class CachedResponse(NamedTuple):
+    url: str
+    status: int
+    text: str
+    content_type: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    source: str  # "network", "revalidated" (304) or "fresh" (no request)
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 of the body text (a key for work derived from the page)."""
+        return hashlib.sha256(self.text.encode("utf-8")).hexdigest()
+
+    @property
+    def from_cache(self) -> bool:
+        return self.source != "network"
+
+
+def _max_age(cache_control: str) -> Optional[float]:
+    """max-age from a Cache-Control header (0 for no-cache), or None."""
+    if re.search(r"\bno-cache\b", cache_control):
+        return 0.0
+    match = re.search(r"\bmax-age=(\d+)", cache_control)
+    return float(match.group(1)) if match else None
+
+
+class HttpCache:
+    """Conditional-GET cache of text responses keyed by URL."""
+
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        cache: Optional[AssetCache] = None,
+        min_fresh: float = MIN_FRESH_SECONDS,
+        timeout: float = HTTP_TIMEOUT
+    ):
+        """
+        Args:
+            session: HTTP session (default: shared get_session())
+            cache: Entry store (default: AssetCache("http"))
+            min_fresh: Seconds an entry is served without revalidation,
+                even if the server sent a shorter max-age
+            timeout: Seconds per request
+        """
+        self.session = session or get_session()
+        self.cache = cache or AssetCache("http", HTTP_CACHE_MAX_BYTES)
+        self.min_fresh = min_fresh
+        self.timeout = timeout
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        """
+        GET a URL through the cache.
+
+        Raises:
+            requests.RequestException: On network errors and HTTP error statuses
+        """
+        key = AssetCache.key_for(url=url)
+        entry = self._load(key)
+
+        if entry is not None:
+            fresh_for = max(self.min_fresh, entry.get("max_age", 0.0))
+            if time.time() - entry["fetched_at"] < fresh_for:
+                return self._response(entry, "fresh")
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry.get("etag"):
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self.session.get(url, headers=request_headers, timeout=self.timeout)
+        if response.status_code == 304 and entry is not None:
+            entry["fetched_at"] = time.time()
+            entry["max_age"] = self._response_max_age(response)
+            self._store(key, entry)
+            return self._response(entry, "revalidated")
+
+        response.raise_for_status()
+        entry = {
+            "url": url,
+            "status": response.status_code,
+            "text": response.text,
+            "content_type": response.headers.get("Content-Type", ""),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        }
+        entry["max_age"] = self._response_max_age(response)
+        cache_control = response.headers.get("Cache-Control", "")
+        # Without a validator the entry could never be revalidated
+        if (entry["etag"] or entry["last_modified"]) and "no-store" not in cache_control:
+            self._store(key, entry)
+        return self._response(entry, "network")
+
+    @staticmethod
+    def _response_max_age(response: requests.Response) -> float:
+        """Seconds the server allows the response to be reused (0 if unspecified)."""
+        max_age = _max_age(response.headers.get("Cache-Control", ""))
+        if max_age is None and response.headers.get("Expires"):
+            try:
+                expires = email.utils.parsedate_to_datetime(response.headers["Expires"]).timestamp()
+                max_age = max(0.0, expires - time.time())
+            except (TypeError, ValueError):
+                pass
+        return max_age or 0.0
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self.cache.get(key, ".json")
+        if path is None:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable HTTP cache entry {path}: {e}")
+            return None
+
+    def _store(self, key: str, entry: Dict[str, Any]) -> None:
+        fd, tmp_path = tempfile.mkstemp(prefix="http_", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            self.cache.store(key, tmp_path, meta={"url": entry["url"]})
+        except OSError as e:
+            logger.warning(f"Could not cache {entry['url']}: {e}")
+        finally:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _response(entry: Dict[str, Any], source: str) -> CachedResponse:
+        return CachedResponse(
+            entry["url"], entry["status"], entry["text"], entry.get("content_type", ""),
+            entry.get("etag"), entry.get("last_modified"), source
+        )
+
+
+_http_cache: Optional[HttpCache] = None
+
+
+def get_http_cache() -> HttpCache:
+    """Return the process-wide HTTP cache."""
+    global _http_cache
+    if _http_cache is None:
+        _http_cache = HttpCache()
+    return _http_cache
@@ -0,0 +1,327 @@
+"""
+Media Probe
+
+Duration, frame size, frame rate and audio format of media files without
+decoding them. WAV, MP3 and MP4/MOV/M4A headers are parsed directly (a
+few KB read per file: RIFF chunks, MPEG frame header plus Xing/VBRI
+frame count, MP4 moov atoms); other formats fall back to ffprobe JSON, or
+to the stream summary that `ffmpeg -i` prints when ffprobe is not
+installed. Results are memoized by (path, size, mtime), so repeated
+queries on an unchanged file cost one stat().
+"""
+
+import json
+import os
+import re
+import shutil
+import struct
+import subprocess
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Optional, Tuple, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+PathLike = Union[str, Path]
+
+
+class ProbeError(ValueError):
+    """The file is missing or its format could not be read."""
+
+
+class MediaInfo(NamedTuple):
+    duration: float
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fps: Optional[float] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    source: str = "header"  # "header" | "ffprobe" | "ffmpeg"
+
+
+def probe(path: PathLike) -> MediaInfo:
+    """
+    Read the media info of a file (memoized while size and mtime match).
+
+    Raises:
+        ProbeError: If the file does not exist or cannot be probed
+    """
+    try:
+        stat = os.stat(path)
+    except OSError as e:
+        raise ProbeError(f"Cannot probe {path}: {e}") from e
+    return _probe(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+def get_duration(path: PathLike) -> float:
+    """Duration in seconds (see probe)."""
+    return probe(path).duration
+
+
+@lru_cache(maxsize=1024)
+def _probe(path: str, size: int, mtime_ns: int) -> MediaInfo:
+    try:
+        with open(path, "rb") as f:
+            head = f.read(12)
+            f.seek(0)
+            if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+                info = _probe_wav(f)
+            elif head[4:8] in (b"ftyp", b"moov", b"mdat", b"wide", b"free", b"skip"):
+                info = _probe_mp4(f, size)
+            elif path.lower().endswith(".mp3") or head[:3] == b"ID3":
+                info = _probe_mp3(f, size)
+            else:
+                info = None
+    except (OSError, struct.error, ValueError) as e:
+        logger.debug(f"Header parsing failed for {path}: {e}")
+        info = None
+
+    return info or _probe_with_ffmpeg(path)
+
+
+# --- WAV -------------------------------------------------------------------
+
+def _probe_wav(f: BinaryIO) -> Optional[MediaInfo]:
+    f.seek(12)
+    channels = sample_rate = byte_rate = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            return None
+        chunk_id, chunk_size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+        if chunk_id == b"fmt ":
+            fmt = f.read(16)
+            _, channels, sample_rate, byte_rate = struct.unpack("<HHII", fmt[:12])
+            f.seek(chunk_size - 16 + (chunk_size & 1), os.SEEK_CUR)
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            data_start = f.tell()
+            file_end = f.seek(0, os.SEEK_END)
+            # Streamed WAVs leave the data size at 0 / 0xFFFFFFFF
+            data_size = min(chunk_size, file_end - data_start) if chunk_size else file_end - data_start
+            return MediaInfo(data_size / byte_rate, sample_rate=sample_rate, channels=channels)
+        else:
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+
+# --- MP3 -------------------------------------------------------------------
+
+_MP3_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 2.5: (11025, 12000, 8000)}
+_MP3_VERSIONS = {3: 1, 2: 2, 0: 2.5}
+_MP3_LAYERS = {3: 1, 2: 2, 1: 3}
+
+
+def _mp3_frame_header(data: bytes) -> Optional[Tuple[float, int, int, int, int]]:
+    """(version, layer, bitrate kbps, sample rate, channels) of a valid frame header."""
+    if len(data) < 4 or data[0] != 0xFF or data[1] & 0xE0 != 0xE0:
+        return None
+    version = _MP3_VERSIONS.get((data[1] >> 3) & 3)
+    layer = _MP3_LAYERS.get((data[1] >> 1) & 3)
+    bitrate_index, rate_index = data[2] >> 4, (data[2] >> 2) & 3
+    if version is None or layer is None or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    bitrate = _MP3_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index]
+    channels = 1 if data[3] >> 6 == 3 else 2
+    return version, layer, bitrate, _MP3_SAMPLE_RATES[version][rate_index], channels
+
+
+def _probe_mp3(f: BinaryIO, size: int) -> Optional[MediaInfo]:
+    start = 0
+    header = f.read(10)
+    if header[:3] == b"ID3":
+        tag_size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+        start = 10 + tag_size + (10 if header[5] & 0x10 else 0)
+
+    f.seek(start)
+    data = f.read(64 * 1024)
+    for i in range(len(data) - 4):
+        frame = _mp3_frame_header(data[i:i + 4])
+        if frame:
+            break
+    else:
+        return None
+
+    version, layer, bitrate, sample_rate, channels = frame
+    samples_per_frame = 384 if layer == 1 else 1152 if layer == 2 or version == 1 else 576
+
+    # VBR files carry the frame count in a Xing/Info or VBRI header
+    side_info = (32 if channels == 2 else 17) if version == 1 else (17 if channels == 2 else 9)
+    xing = i + 4 + side_info
+    frames = None
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if flags & 1:
+            frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+    elif data[i + 36:i + 40] == b"VBRI":
+        frames = struct.unpack(">I", data[i + 50:i + 54])[0]
+
+    if frames:
+        duration = frames * samples_per_frame / sample_rate
+    else:
+        # Constant bitrate: audio bytes / byte rate (minus a trailing ID3v1 tag)
+        f.seek(max(size - 128, 0))
+        audio_bytes = size - (start + i) - (128 if f.read(3) == b"TAG" else 0)
+        duration = audio_bytes * 8 / (bitrate * 1000)
+    return MediaInfo(duration, sample_rate=sample_rate, channels=channels)
+
+
+# --- MP4 / MOV / M4A -------------------------------------------------------
+
+_MP4_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+
+def _mp4_atoms(f: BinaryIO, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """(type, payload start, atom end) of the atoms between start and end."""
+    position = start
+    while position + 8 <= end:
+        f.seek(position)
+        size, kind = struct.unpack(">I4s", f.read(8))
+        payload = position + 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            payload += 8
+        elif size == 0:
+            size = end - position
+        if size < 8:
+            return
+        yield kind, payload, position + size
+        position += size
+
+
+def _mp4_times(f: BinaryIO, payload: int) -> Tuple[int, int]:
+    """(timescale, duration) of an mvhd or mdhd atom."""
+    f.seek(payload)
+    version = f.read(4)[0]
+    if version == 1:
+        _, _, timescale, duration = struct.unpack(">QQIQ", f.read(28))
+    else:
+        _, _, timescale, duration = struct.unpack(">IIII", f.read(16))
+    return timescale, duration
+
+
+def _probe_mp4(f: BinaryIO, size: int) -> Optional[MediaInfo]:
+    movie: Dict[str, float] = {}
+    tracks = []
+
+    def walk(start: int, end: int, track: Optional[dict]) -> None:
+        for kind, payload, atom_end in _mp4_atoms(f, start, end):
+            if kind == b"trak":
+                track = {}
+                tracks.append(track)
+                walk(payload, atom_end, track)
+            elif kind in _MP4_CONTAINERS:
+                walk(payload, atom_end, track)
+            elif kind == b"mvhd":
+                movie["timescale"], movie["duration"] = _mp4_times(f, payload)
+            elif track is None:
+                continue
+            elif kind == b"tkhd":
+                f.seek(payload)
+                version = f.read(4)[0]
+                f.seek(payload + (88 if version == 1 else 76))
+                width, height = struct.unpack(">II", f.read(8))
+                track["size"] = (width >> 16, height >> 16)
+            elif kind == b"mdhd":
+                track["timescale"], track["duration"] = _mp4_times(f, payload)
+            elif kind == b"hdlr":
+                # QuickTime also has a data handler (alis/url) under minf
+                f.seek(payload + 8)
+                track.setdefault("handler", f.read(4))
+            elif kind == b"stsz":
+                f.seek(payload + 8)
+                track["samples"] = struct.unpack(">I", f.read(4))[0]
+            elif kind == b"stsd":
+                f.seek(payload + 8 + 8 + 16)
+                channels, _, _, _, rate = struct.unpack(">HHHHI", f.read(12))
+                track["audio"] = (rate >> 16, channels)
+
+    for kind, payload, atom_end in _mp4_atoms(f, 0, size):
+        if kind == b"moov":
+            walk(payload, atom_end, None)
+            break
+
+    if not movie.get("timescale"):
+        return None
+    info = {"duration": movie["duration"] / movie["timescale"]}
+    for track in tracks:
+        if track.get("handler") == b"vide" and "width" not in info:
+            info["width"], info["height"] = track.get("size", (None, None))
+            if track.get("samples") and track.get("duration"):
+                info["fps"] = round(track["samples"] * track["timescale"] / track["duration"], 3)
+        elif track.get("handler") == b"soun" and "sample_rate" not in info:
+            info["sample_rate"], info["channels"] = track.get("audio", (None, None))
+    return MediaInfo(**info)
+
+
+# --- ffprobe / ffmpeg fallback ---------------------------------------------
+
+def _probe_with_ffmpeg(path: str) -> MediaInfo:
+    ffprobe = shutil.which("ffprobe")
+    try:
+        if ffprobe:
+            return _probe_ffprobe(ffprobe, path)
+        return _probe_ffmpeg_banner(path)
+    except (OSError, ValueError, KeyError, subprocess.SubprocessError) as e:
+        raise ProbeError(f"Cannot probe {path}: {e}") from e
+
+
+def _probe_ffprobe(ffprobe: str, path: str) -> MediaInfo:
+    result = subprocess.run(
+        [ffprobe, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True
+    )
+    data = json.loads(result.stdout)
+    info = {"duration": float(data["format"]["duration"]), "source": "ffprobe"}
+    for stream in data.get("streams", []):
+        if stream.get("codec_type") == "video" and "width" not in info:
+            info["width"], info["height"] = stream.get("width"), stream.get("height")
+            num, _, den = stream.get("avg_frame_rate", "0/0").partition("/")
+            if den and float(den):
+                info["fps"] = round(float(num) / float(den), 3)
+        elif stream.get("codec_type") == "audio" and "sample_rate" not in info:
+            info["sample_rate"] = int(stream.get("sample_rate") or 0) or None
+            info["channels"] = stream.get("channels")
+    return MediaInfo(**info)
+
+
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_VIDEO_RE = re.compile(r"Stream #.*?Video: .*?(\d{2,5})x(\d{2,5})(?:.*?([\d.]+) fps)?")
+_AUDIO_RE = re.compile(r"Stream #.*?Audio: .*?(\d+) Hz, (mono|stereo|[\d.]+ channels|[\d.]+)")
+
+
+def _probe_ffmpeg_banner(path: str) -> MediaInfo:
+    """Parse the input summary of `ffmpeg -i` (reads headers only, no output)."""
+    from utils.ffmpeg_tools import get_ffmpeg_binary
+
+    result = subprocess.run(
+        [get_ffmpeg_binary(), "-hide_banner", "-i", path],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    banner = result.stderr
+    match = _DURATION_RE.search(banner)
+    if not match:
+        raise ValueError("no duration in ffmpeg output")
+    hours, minutes, seconds = match.groups()
+    info = {"duration": int(hours) * 3600 + int(minutes) * 60 + float(seconds), "source": "ffmpeg"}
+
+    video = _VIDEO_RE.search(banner)
+    if video:
+        info["width"], info["height"] = int(video.group(1)), int(video.group(2))
+        if video.group(3):
+            info["fps"] = float(video.group(3))
+    audio = _AUDIO_RE.search(banner)
+    if audio:
+        layout = audio.group(2)
+        info["sample_rate"] = int(audio.group(1))
+        info["channels"] = {"mono": 1, "stereo": 2}.get(layout) or int(float(layout.split()[0]))
+    return MediaInfo(**info)
@@ -0,0 +1,250 @@
+"""
+Agent Metrics
+
+In-process telemetry for agents and provider calls: latency histograms
+per (agent, provider, operation), call/failure/retry counters and bytes
+in/out. Recording only touches in-memory structures under a lock; the
+individual observations are buffered and written to the agent_metrics
+table in batches (when the buffer fills, every FLUSH_INTERVAL seconds and
+at exit). The in-memory state can be exported in Prometheus text format.
+
+Usage:
+    with track("visual_generator", provider="together", operation="image") as t:
+        data = client.images.generate(...)
+        t.bytes_out = len(data)
+"""
+
+import atexit
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, math.inf)
+
+FLUSH_THRESHOLD = 200
+FLUSH_INTERVAL = 30.0
+
+LabelKey = Tuple[str, str, str]
+
+
+def payload_size(data: Any) -> int:
+    """Approximate size in bytes of a JSON-like payload (0 if not serializable)."""
+    if data is None:
+        return 0
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    if isinstance(data, str):
+        return len(data.encode("utf-8"))
+    try:
+        return len(json.dumps(data, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+class Histogram:
+    """Fixed-bucket histogram (per-bucket counts, cumulated on export)."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Tracker:
+    """Handle yielded by track(); callers fill in what they know."""
+
+    def __init__(self, bytes_in: int = 0, project_id: Optional[int] = None):
+        self.status = "ok"
+        self.attempts = 1
+        self.bytes_in = bytes_in
+        self.bytes_out = 0
+        self.project_id = project_id
+
+    def fail(self) -> None:
+        """Mark the call as failed without raising (agents that return None)."""
+        self.status = "error"
+
+
+class MetricsRegistry:
+    """Thread-safe metric store with a buffered SQLite sink."""
+
+    def __init__(self, flush_threshold: int = FLUSH_THRESHOLD, flush_interval: float = FLUSH_INTERVAL):
+        self.flush_threshold = flush_threshold
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._histograms: Dict[LabelKey, Histogram] = {}
+        self._counters: Dict[str, Dict[Tuple[str, ...], float]] = {}
+        self._pending: List[tuple] = []
+        self._last_flush = time.monotonic()
+
+    def _inc(self, name: str, labels: Tuple[str, ...], value: float = 1) -> None:
+        series = self._counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0) + value
+
+    def record(
+        self,
+        agent: str,
+        duration: float,
+        provider: Optional[str] = None,
+        operation: str = "call",
+        status: str = "ok",
+        attempts: int = 1,
+        bytes_in: int = 0,
+        bytes_out: int = 0,
+        project_id: Optional[int] = None
+    ) -> None:
+        """Record one finished call."""
+        key = (agent, provider or "", operation)
+        row = (
+            project_id, agent, provider, operation, status, duration, attempts,
+            bytes_in, bytes_out, time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        )
+
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(duration)
+
+            self._inc("agent_calls_total", key + (status,))
+            if attempts > 1:
+                self._inc("agent_retries_total", key, attempts - 1)
+            if bytes_in:
+                self._inc("agent_bytes_in_total", key, bytes_in)
+            if bytes_out:
+                self._inc("agent_bytes_out_total", key, bytes_out)
+
+            self._pending.append(row)
+            due = (len(self._pending) >= self.flush_threshold
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+
+        if due:
+            self.flush()
+
+    def flush(self, db=None) -> int:
+        """
+        Write buffered observations to the agent_metrics table.
+
+        Returns:
+            Number of rows written
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+                self._last_flush = time.monotonic()
+            if not rows:
+                return 0
+
+            try:
+                if db is None:
+                    from utils.database import get_db
+                    db = get_db()
+                db.insert_agent_metrics(rows)
+            except Exception as e:
+                logger.warning(f"Could not flush {len(rows)} metric rows: {e}")
+                with self._lock:
+                    self._pending[:0] = rows
+                return 0
+            return len(rows)
+
+    def reset(self) -> None:
+        """Drop in-memory metrics and buffered rows."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._pending.clear()
+
+    def prometheus_text(self) -> str:
+        """Export histograms and counters in Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines.append("# HELP agent_latency_seconds Agent and provider call latency.")
+            lines.append("# TYPE agent_latency_seconds histogram")
+            for key, histogram in sorted(self._histograms.items()):
+                labels = _labels(("agent", "provider", "operation"), key)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if math.isinf(bound) else repr(bound)
+                    lines.append(f'agent_latency_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"agent_latency_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"agent_latency_seconds_count{{{labels}}} {histogram.count}")
+
+            for name, help_text, names in (
+                ("agent_calls_total", "Finished calls by status.", ("agent", "provider", "operation", "status")),
+                ("agent_retries_total", "Retries before a call finished.", ("agent", "provider", "operation")),
+                ("agent_bytes_in_total", "Bytes sent to the agent or provider.", ("agent", "provider", "operation")),
+                ("agent_bytes_out_total", "Bytes produced by the agent or provider.", ("agent", "provider", "operation")),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(self._counters.get(name, {}).items()):
+                    lines.append(f"{name}{{{_labels(names, labels)}}} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    def escape(value: str) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide registry (flushed at exit)."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry()
+                atexit.register(_registry.flush)
+    return _registry
+
+
+@contextmanager
+def track(
+    agent: str,
+    provider: Optional[str] = None,
+    operation: str = "call",
+    bytes_in: int = 0,
+    project_id: Optional[int] = None
+) -> Iterator[Tracker]:
+    """
+    Time a block and record it in the registry. An exception marks the call
+    as failed and is re-raised.
+    """
+    tracker = Tracker(bytes_in=bytes_in, project_id=project_id)
+    start = time.perf_counter()
+    try:
+        yield tracker
+    except BaseException:
+        tracker.status = "error"
+        raise
+    finally:
+        get_metrics().record(
+            agent, time.perf_counter() - start,
+            provider=provider, operation=operation, status=tracker.status,
+            attempts=tracker.attempts, bytes_in=tracker.bytes_in,
+            bytes_out=tracker.bytes_out, project_id=tracker.project_id
+        )
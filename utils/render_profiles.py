@@ -0,0 +1,116 @@
+"""
+Render Profiles
+
+Named encoder settings for VideoEditorAgent. The editor lays out scenes
+on a 1080x1920 base canvas (crop, caption position, font sizes) and
+scales that layout to the profile size, so every profile produces the
+same composition at a different cost:
+
+    preview  540x960, 15 fps, ultrafast x264 (review loop, seconds)
+    final    1080x1920, 24 fps, medium x264 (the default render)
+    social   1080x1920, 30 fps, CRF with a bitrate cap from BITRATE_LADDER
+             (upload-friendly files with a bounded peak bitrate)
+"""
+
+import os
+from typing import List, NamedTuple, Tuple, Union
+
+# Layout reference: positions and sizes in the editor are given for this canvas
+BASE_SIZE = (1080, 1920)
+
+# Peak video bitrate (maxrate, bufsize) by output height for capped CRF
+BITRATE_LADDER = {
+    1920: ("8M", "16M"),
+    1280: ("5M", "10M"),
+    960: ("2500k", "5000k"),
+}
+
+
+class RenderProfile(NamedTuple):
+    name: str
+    label: str
+    width: int
+    height: int
+    fps: int
+    preset: str
+    crf: int
+    audio_bitrate: str
+    zoom_quality: str
+    max_threads: int
+    capped: bool = False  # Cap the CRF bitrate with BITRATE_LADDER
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return (self.width, self.height)
+
+    @property
+    def scale(self) -> float:
+        """Factor from the 1080x1920 base layout to this profile."""
+        return self.width / BASE_SIZE[0]
+
+    def threads(self, workers: int = 1) -> int:
+        """
+        Encoder threads per process when `workers` encoders run at once:
+        the available cores split between them, capped at max_threads
+        (x264 keeps a frame buffer per thread, so more threads means more
+        memory for little gain).
+        """
+        cores = available_cores()
+        return max(1, min(self.max_threads, cores // max(1, workers)))
+
+    def x264_args(self) -> List[str]:
+        """Extra ffmpeg options for libx264 (quality / rate control)."""
+        args = ["-crf", str(self.crf)]
+        if self.capped:
+            maxrate, bufsize = bitrate_cap(self.height)
+            args += ["-maxrate", maxrate, "-bufsize", bufsize]
+        return args
+
+
+PROFILES = {
+    "preview": RenderProfile(
+        "preview", "Preview (540p, rápido)", 540, 960, fps=15, preset="ultrafast", crf=28,
+        audio_bitrate="96k", zoom_quality="fast", max_threads=16
+    ),
+    "final": RenderProfile(
+        "final", "Final (1080p)", 1080, 1920, fps=24, preset="medium", crf=23,
+        audio_bitrate="192k", zoom_quality="balanced", max_threads=8
+    ),
+    "social": RenderProfile(
+        "social", "Social upload (1080p, 30 fps)", 1080, 1920, fps=30, preset="medium", crf=20,
+        audio_bitrate="192k", zoom_quality="balanced", max_threads=8, capped=True
+    ),
+}
+
+DEFAULT_PROFILE = "final"
+
+
+def available_cores() -> int:
+    """CPU cores this process may run on (affinity-aware where supported)."""
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+def bitrate_cap(height: int) -> Tuple[str, str]:
+    """(maxrate, bufsize) of the smallest ladder rung that fits `height`."""
+    for rung in sorted(BITRATE_LADDER):
+        if height <= rung:
+            return BITRATE_LADDER[rung]
+    return BITRATE_LADDER[max(BITRATE_LADDER)]
+
+
+def get_profile(profile: Union[str, RenderProfile, None] = None) -> RenderProfile:
+    """
+    Resolve a profile name (or pass a RenderProfile through).
+
+    Raises:
+        ValueError: If the name is unknown
+    """
+    if isinstance(profile, RenderProfile):
+        return profile
+    name = profile or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown render profile '{name}' (available: {', '.join(PROFILES)})")
+    return PROFILES[name]
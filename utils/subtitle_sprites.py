@@ -0,0 +1,251 @@
+"""
+Subtitle Sprites
+
+Pillow-based caption rasterizer. Each caption is rendered once to a tight
+RGBA sprite (wrapped, centered, with stroke) and cached on disk by content
+hash, so renders don't spawn ImageMagick. Sprites are blended only over
+their bounding box, instead of compositing a full-frame text layer.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+import logging
+
+logger = logging.getLogger(__name__)
+
+SUBTITLE_CACHE_DIR = os.path.join("assets", "cache", "subtitles")
+
+# Bump when rasterization changes so stale sprites are not reused
+SPRITE_VERSION = 1
+
+# Fallbacks when the requested font name is not installed
+FALLBACK_FONTS = [
+    "DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/Library/Fonts/Arial Bold.ttf",
+    "C:/Windows/Fonts/arialbd.ttf",
+]
+
+
+@lru_cache(maxsize=32)
+def load_font(font: str, fontsize: int) -> ImageFont.FreeTypeFont:
+    """
+    Load a TrueType font by name or path, falling back to a bundled font.
+
+    Args:
+        font: Font name ("Arial") or path to a .ttf/.otf file
+        fontsize: Font size in pixels
+    """
+    candidates = [font]
+    if not font.lower().endswith((".ttf", ".otf")):
+        candidates += [f"{font}.ttf", f"{font.lower()}.ttf", f"{font}bd.ttf", f"{font.lower()}bd.ttf"]
+    candidates += FALLBACK_FONTS
+
+    for candidate in candidates:
+        try:
+            return ImageFont.truetype(candidate, fontsize)
+        except OSError:
+            continue
+
+    logger.warning(f"Font '{font}' not found, using Pillow default font")
+    return ImageFont.load_default(fontsize)
+
+
+def wrap_text(text: str, font: ImageFont.FreeTypeFont, max_width: int) -> str:
+    """Greedy word wrap so every line fits within max_width pixels."""
+    lines = []
+    for paragraph in text.splitlines() or [""]:
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}".strip()
+            if line and font.getlength(candidate) > max_width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class SubtitleSprite:
+    """Premultiplied caption bitmap ready for bounding-box blending."""
+
+    def __init__(self, rgba: np.ndarray):
+        """
+        Args:
+            rgba: Sprite pixels (height, width, 4) uint8
+        """
+        self.height, self.width = rgba.shape[:2]
+        self.rgba = rgba
+        alpha = rgba[:, :, 3:4].astype(np.uint16)
+        self.alpha = alpha
+        self.inv_alpha = 255 - alpha
+        self.premultiplied = rgba[:, :, :3].astype(np.uint16) * alpha
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    def to_clip(self):
+        """Return a MoviePy ImageClip with the sprite's alpha as mask."""
+        from moviepy.editor import ImageClip
+
+        mask = ImageClip(self.rgba[:, :, 3] / 255.0, ismask=True)
+        return ImageClip(self.rgba[:, :, :3]).set_mask(mask)
+
+    def blend_onto(self, frame: np.ndarray, x: int, y: int) -> np.ndarray:
+        """
+        Alpha-blend the sprite onto a copy of frame at (x, y).
+
+        Only the sprite's bounding box is touched; the rest of the frame is a
+        plain copy.
+
+        Returns:
+            New frame array
+        """
+        frame_h, frame_w = frame.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + self.width, frame_w), min(y + self.height, frame_h)
+        out = np.array(frame, dtype=np.uint8, copy=True)
+        if x0 >= x1 or y0 >= y1:
+            return out
+
+        sx0, sy0 = x0 - x, y0 - y
+        sx1, sy1 = sx0 + (x1 - x0), sy0 + (y1 - y0)
+
+        region = out[y0:y1, x0:x1].astype(np.uint16)
+        blended = (
+            self.premultiplied[sy0:sy1, sx0:sx1]
+            + region * self.inv_alpha[sy0:sy1, sx0:sx1]
+            + 127
+        ) // 255
+        out[y0:y1, x0:x1] = blended.astype(np.uint8)
+        return out
+
+
+def rasterize_caption(
+    text: str,
+    font: str = "Arial",
+    fontsize: int = 50,
+    color: str = "yellow",
+    stroke_color: str = "black",
+    stroke_width: int = 2,
+    max_width: int = 900,
+    line_spacing: int = 6
+) -> Image.Image:
+    """
+    Render a caption to a tightly cropped RGBA image.
+
+    Args:
+        text: Caption text
+        font: Font name or path
+        fontsize: Font size in pixels
+        color: Fill color (any PIL color name or hex)
+        stroke_color: Outline color
+        stroke_width: Outline width in pixels
+        max_width: Wrap width in pixels
+        line_spacing: Extra pixels between lines
+
+    Returns:
+        RGBA image cropped to the visible text
+    """
+    pil_font = load_font(font, fontsize)
+    wrapped = wrap_text(text, pil_font, max_width)
+
+    measure = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+    left, top, right, bottom = measure.multiline_textbbox(
+        (0, 0), wrapped, font=pil_font, spacing=line_spacing,
+        align="center", stroke_width=stroke_width
+    )
+    pad = stroke_width + 2
+    width = max(max_width, right - left) + 2 * pad
+    height = (bottom - top) + 2 * pad
+
+    image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    ImageDraw.Draw(image).multiline_text(
+        (width / 2, pad - top), wrapped, font=pil_font, fill=color,
+        anchor="ma", spacing=line_spacing, align="center",
+        stroke_width=stroke_width, stroke_fill=stroke_color
+    )
+
+    bbox = image.getbbox()
+    return image.crop(bbox) if bbox else image.crop((0, 0, 1, 1))
+
+
+def caption_cache_key(text: str, **style) -> str:
+    """Content hash for a caption and its style."""
+    payload = json.dumps({"text": text, "style": style, "v": SPRITE_VERSION}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=256)
+def get_caption_sprite(
+    text: str,
+    font: str = "Arial",
+    fontsize: int = 50,
+    color: str = "yellow",
+    stroke_color: str = "black",
+    stroke_width: int = 2,
+    max_width: int = 900,
+    cache_dir: str = SUBTITLE_CACHE_DIR
+) -> SubtitleSprite:
+    """
+    Return the sprite for a caption, rendering it only on a cache miss.
+
+    Sprites are stored as PNG under cache_dir, keyed by a hash of the text
+    and style, and kept in memory for the life of the process.
+    """
+    style = dict(font=font, fontsize=fontsize, color=color, stroke_color=stroke_color,
+                 stroke_width=stroke_width, max_width=max_width)
+    key = caption_cache_key(text, **style)
+    sprite_path = Path(cache_dir) / key[:2] / f"{key}.png"
+
+    if sprite_path.exists():
+        try:
+            with Image.open(sprite_path) as cached:
+                return SubtitleSprite(np.asarray(cached.convert("RGBA")))
+        except OSError:
+            logger.warning(f"Corrupt subtitle sprite, re-rendering: {sprite_path}")
+
+    image = rasterize_caption(text, **style)
+    sprite_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = sprite_path.with_name(f"{sprite_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    image.save(tmp_path, format="PNG")
+    os.replace(tmp_path, sprite_path)
+
+    return SubtitleSprite(np.asarray(image))
+
+
+def overlay_captions(clip, cues: Sequence[Tuple[SubtitleSprite, float, float, Optional[int]]], y: int):
+    """
+    Burn captions into a clip by blending each sprite's bounding box.
+
+    Args:
+        clip: MoviePy video clip
+        cues: (sprite, start, end, x) tuples in clip time; x=None centers
+            the sprite horizontally
+        y: Top edge of the captions in pixels
+
+    Returns:
+        New clip with captions drawn on its frames
+    """
+    cues: List[Tuple[SubtitleSprite, float, float, Optional[int]]] = sorted(cues, key=lambda cue: cue[1])
+    frame_w = clip.w
+
+    def draw(get_frame, t):
+        frame = get_frame(t)
+        for sprite, start, end, x in cues:
+            if start <= t < end:
+                if x is None:
+                    x = (frame_w - sprite.width) // 2
+                frame = sprite.blend_onto(frame, x, y)
+        return frame
+
+    return clip.fl(draw, apply_to=[])
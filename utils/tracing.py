@@ -0,0 +1,281 @@
+"""
+Pipeline Tracing
+
+Lightweight spans for the production pipeline (research, script, asset
+generation, render phases). The active trace and parent span live in a
+contextvar, so nested spans link up on their own; worker threads get a
+copy of the context from AssetScheduler, and render processes receive it
+explicitly (current_context() / attach()).
+
+Finished spans are buffered and written to the trace_spans table when the
+outermost span of the process finishes. render_timeline() turns the spans
+of a project into a self-contained HTML waterfall:
+
+    python -m utils.tracing <project_id> [output.html]
+"""
+
+import atexit
+import html
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+TRACES_DIR = os.path.join("assets", "traces")
+
+FLUSH_THRESHOLD = 200
+
+
+class SpanContext(NamedTuple):
+    trace_id: str
+    span_id: Optional[str]
+    project_id: Optional[int]
+    local: bool  # False for contexts set by start_trace()/attach()
+
+
+_current: ContextVar[Optional[SpanContext]] = ContextVar("trace_span", default=None)
+
+_pending: List[tuple] = []
+_pending_lock = threading.Lock()
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def start_trace(trace_id: Optional[str] = None, project_id: Optional[int] = None) -> str:
+    """
+    Make trace_id the active trace of the current context (one trace per
+    production, kept across Streamlit reruns by the caller).
+
+    Returns:
+        The trace id (a new one if none was given)
+    """
+    trace_id = trace_id or _new_id()
+    _current.set(SpanContext(trace_id, None, project_id, False))
+    return trace_id
+
+
+def current_context() -> Optional[Dict[str, Any]]:
+    """Picklable copy of the active span context (for worker processes)."""
+    ctx = _current.get()
+    if ctx is None:
+        return None
+    return {"trace_id": ctx.trace_id, "span_id": ctx.span_id, "project_id": ctx.project_id}
+
+
+@contextmanager
+def attach(context: Optional[Dict[str, Any]]) -> Iterator[None]:
+    """Continue a trace received from another process; flushes on exit."""
+    if not context:
+        yield
+        return
+    token = _current.set(SpanContext(context["trace_id"], context.get("span_id"),
+                                     context.get("project_id"), False))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+        flush()
+
+
+class Span:
+    """Handle yielded by span(); attributes can be added while it runs."""
+
+    def __init__(self, name: str, context: SpanContext, attrs: Dict[str, Any]):
+        self.name = name
+        self.context = context
+        self.attrs = attrs
+        self.status = "ok"
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span]:
+    """
+    Time a block as a child of the active span. Without an active trace a
+    new one is started, so spans are never lost.
+    """
+    parent = _current.get()
+    if parent is None:
+        parent = SpanContext(_new_id(), None, None, False)
+
+    ctx = SpanContext(parent.trace_id, _new_id(), attrs.pop("project_id", parent.project_id), True)
+    current = Span(name, ctx, attrs)
+    token = _current.set(ctx)
+    started_at = time.time()
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.attrs.setdefault("error", str(e)[:200])
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _current.reset(token)
+        _record((
+            ctx.trace_id, ctx.span_id, parent.span_id, ctx.project_id, name,
+            started_at, duration, current.status,
+            json.dumps(current.attrs, default=str) if current.attrs else None,
+            threading.current_thread().name, os.getpid()
+        ), outermost=not parent.local)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator form of span(); the default name is Class.method."""
+    def decorator(fn: Callable) -> Callable:
+        span_name = name or fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _record(row: tuple, outermost: bool) -> None:
+    with _pending_lock:
+        _pending.append(row)
+        due = outermost or len(_pending) >= FLUSH_THRESHOLD
+    if due:
+        flush()
+
+
+def flush(db=None) -> int:
+    """
+    Write buffered spans to the trace_spans table.
+
+    Returns:
+        Number of spans written
+    """
+    global _pending
+    with _pending_lock:
+        rows, _pending = _pending, []
+    if not rows:
+        return 0
+
+    try:
+        if db is None:
+            from utils.database import get_db
+            db = get_db()
+        db.insert_trace_spans(rows)
+    except Exception as e:
+        logger.warning(f"Could not write {len(rows)} trace spans: {e}")
+        return 0
+    return len(rows)
+
+
+atexit.register(flush)
+
+
+def render_timeline(spans: List[Dict[str, Any]], title: str = "Pipeline trace") -> str:
+    """
+    Build an HTML waterfall of spans (rows ordered by start, indented by
+    depth) plus a table of total time per span name.
+
+    Args:
+        spans: Rows from Database.get_trace_spans()
+
+    Returns:
+        HTML document
+    """
+    if not spans:
+        return f"<html><body><h1>{html.escape(title)}</h1><p>No spans recorded.</p></body></html>"
+
+    by_id = {s["span_id"]: s for s in spans}
+
+    def depth(s: Dict[str, Any]) -> int:
+        level, parent = 0, s.get("parent_id")
+        while parent in by_id and level < 32:
+            level += 1
+            parent = by_id[parent].get("parent_id")
+        return level
+
+    t0 = min(s["start_time"] for s in spans)
+    t1 = max(s["start_time"] + s["duration"] for s in spans)
+    total = max(t1 - t0, 1e-6)
+
+    rows = []
+    for s in sorted(spans, key=lambda s: (s["start_time"], -s["duration"])):
+        left = (s["start_time"] - t0) / total * 100
+        width = max(s["duration"] / total * 100, 0.15)
+        color = "#d9534f" if s["status"] == "error" else "#4a90d9"
+        tip = html.escape(f"{s['name']} {s['duration']:.3f}s {s.get('attrs') or ''} [{s.get('thread')}/{s.get('pid')}]")
+        rows.append(
+            f'<tr><td style="padding-left:{depth(s) * 14}px">{html.escape(s["name"])}</td>'
+            f'<td class="num">{s["duration"]:.2f}s</td>'
+            f'<td class="lane"><div class="bar" title="{tip}" '
+            f'style="left:{left:.3f}%;width:{width:.3f}%;background:{color}"></div></td></tr>'
+        )
+
+    totals: Dict[str, List[float]] = {}
+    for s in spans:
+        entry = totals.setdefault(s["name"], [0, 0.0])
+        entry[0] += 1
+        entry[1] += s["duration"]
+    summary = "".join(
+        f'<tr><td>{html.escape(name)}</td><td class="num">{count}</td><td class="num">{seconds:.2f}s</td></tr>'
+        for name, (count, seconds) in sorted(totals.items(), key=lambda item: -item[1][1])
+    )
+
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>
+<style>
+body {{ font-family: sans-serif; font-size: 13px; margin: 20px; }}
+table {{ border-collapse: collapse; width: 100%; }}
+td, th {{ padding: 2px 6px; border-bottom: 1px solid #eee; white-space: nowrap; text-align: left; }}
+.num {{ text-align: right; width: 70px; }}
+.lane {{ position: relative; width: 65%; }}
+.bar {{ position: absolute; top: 3px; height: 12px; border-radius: 2px; }}
+</style></head><body>
+<h1>{html.escape(title)}</h1>
+<p>Wall time: {total:.2f}s &middot; {len(spans)} spans</p>
+<table><tr><th>Span</th><th class="num">Time</th><th>Timeline</th></tr>{''.join(rows)}</table>
+<h2>Time per span</h2>
+<table><tr><th>Span</th><th class="num">Count</th><th class="num">Total</th></tr>{summary}</table>
+</body></html>
+"""
+
+
+def write_project_report(project_id: int, output_path: Optional[str] = None, db=None) -> Optional[str]:
+    """
+    Write the timeline of every trace of a project to an HTML file.
+
+    Returns:
+        Report path, or None if the project has no spans
+    """
+    flush(db)
+    if db is None:
+        from utils.database import get_db
+        db = get_db()
+
+    spans = db.get_trace_spans(project_id=project_id)
+    if not spans:
+        return None
+
+    output_path = output_path or os.path.join(TRACES_DIR, f"project_{project_id}.html")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(render_timeline(spans, title=f"Project {project_id}"))
+    return output_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m utils.tracing <project_id> [output.html]")
+        sys.exit(1)
+    path = write_project_report(int(sys.argv[1]), sys.argv[2] if len(sys.argv) > 2 else None)
+    print(path or "No spans recorded for this project")
@@ -0,0 +1,233 @@
+"""
+Veo Job Manager
+
+Tracks Google Veo long-running operations outside the Streamlit script
+flow. Operations are submitted without waiting, persisted in the veo_jobs
+table, and polled with exponential backoff; several jobs are waited on
+concurrently, so a batch of clips takes about as long as the slowest one.
+After a page reload or crash, jobs still marked running are picked up
+again by operation name instead of being resubmitted.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+from utils.database import get_db
+from utils.metrics import track
+
+logger = logging.getLogger(__name__)
+
+POLL_INITIAL_SECONDS = 5.0
+POLL_MAX_SECONDS = 30.0
+POLL_BACKOFF = 1.5
+JOB_TIMEOUT_SECONDS = 15 * 60
+
+# Statuses of jobs whose operation may still be waited on
+ACTIVE_STATUSES = ("running", "downloading")
+
+
+class VeoJobError(RuntimeError):
+    """A Veo operation failed, returned no video, or timed out."""
+
+
+class VeoJobManager:
+    """Submit, persist, poll and download Veo operations."""
+
+    def __init__(
+        self,
+        agent,
+        db=None,
+        poll_initial: float = POLL_INITIAL_SECONDS,
+        poll_max: float = POLL_MAX_SECONDS,
+        timeout: float = JOB_TIMEOUT_SECONDS,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Args:
+            agent: VeoGeneratorAgent (submit_video_clip, get_operation,
+                download_video)
+            db: Database instance (default: shared get_db())
+            poll_initial: First polling interval in seconds
+            poll_max: Upper bound for the backoff interval
+            timeout: Seconds to wait for one job before giving up (the job
+                stays "running" and can be resumed later)
+            sleep: Sleep function (injectable for tests)
+        """
+        self.agent = agent
+        self.db = db or get_db()
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.timeout = timeout
+        self.sleep = sleep
+
+    def submit(
+        self,
+        prompt: str,
+        output_path: str,
+        project_id: Optional[int] = None,
+        scene_number: Optional[int] = None,
+        aspect_ratio: str = "9:16"
+    ) -> Dict[str, Any]:
+        """
+        Submit a Veo operation, or reuse the persisted job for the same
+        project, scene and prompt.
+
+        Returns:
+            Job row (id, operation_name, output_path, status, ...)
+        """
+        if project_id is not None:
+            existing = self.db.find_veo_job(project_id, scene_number, prompt)
+            if existing:
+                if existing["status"] in ACTIVE_STATUSES:
+                    logger.info(f"Resuming Veo job {existing['id']} ({existing['operation_name']})")
+                    return existing
+                if existing["status"] == "completed" and existing.get("output_path") \
+                        and os.path.exists(existing["output_path"]):
+                    return existing
+
+        operation_name = self.agent.submit_video_clip(prompt, aspect_ratio=aspect_ratio)
+        job_id = self.db.create_veo_job(project_id, scene_number, prompt, operation_name, output_path)
+        logger.info(f"Submitted Veo job {job_id} ({operation_name})")
+        return {
+            "id": job_id,
+            "project_id": project_id,
+            "scene_number": scene_number,
+            "prompt": prompt,
+            "operation_name": operation_name,
+            "output_path": output_path,
+            "status": "running",
+        }
+
+    def wait(self, job: Dict[str, Any]) -> str:
+        """
+        Poll a job with exponential backoff and download its video.
+
+        Returns:
+            Path of the downloaded clip
+
+        Raises:
+            VeoJobError: If the operation fails, returns no video or times out
+        """
+        output_path = job["output_path"]
+        if job.get("status") == "completed" and output_path and os.path.exists(output_path):
+            return output_path
+
+        deadline = time.monotonic() + self.timeout
+        delay = self.poll_initial
+
+        with track("veo_generator", provider="veo", operation="wait", project_id=job.get("project_id")) as t:
+            while True:
+                operation = self.agent.get_operation(job["operation_name"])
+                if operation.done:
+                    break
+                if time.monotonic() + delay > deadline:
+                    raise VeoJobError(f"Veo job {job['id']} still running after {self.timeout:.0f}s")
+                self.sleep(delay)
+                delay = min(delay * POLL_BACKOFF, self.poll_max)
+            if operation.error:
+                t.fail()
+
+        if operation.error:
+            message = str(operation.error)
+            self.db.update_veo_job(job["id"], "error", error_message=message)
+            raise VeoJobError(f"Veo job {job['id']} failed: {message}")
+
+        result = operation.response or operation.result
+        videos = getattr(result, "generated_videos", None) if result else None
+        if not videos:
+            self.db.update_veo_job(job["id"], "error", error_message="no video generated")
+            raise VeoJobError(f"Veo job {job['id']} returned no video")
+
+        self.db.update_veo_job(job["id"], "downloading")
+        self.agent.download_video(videos[0].video, output_path)
+        self.db.update_veo_job(job["id"], "completed", output_path=output_path)
+        return output_path
+
+    def run(self, prompt: str, output_path: str, **submit_kwargs) -> str:
+        """Submit (or resume) one job and wait for its clip."""
+        return self.wait(self.submit(prompt, output_path, **submit_kwargs))
+
+    def run_all(
+        self,
+        requests: List[Dict[str, Any]],
+        project_id: Optional[int] = None,
+        on_done: Optional[Callable[[Dict[str, Any], Optional[str], Optional[Exception]], None]] = None
+    ) -> List[Optional[str]]:
+        """
+        Submit every request up front, then wait for all of them concurrently.
+
+        Args:
+            requests: Dicts with prompt, output_path and optional scene_number
+                and aspect_ratio
+            project_id: Project the jobs belong to
+            on_done: Callback (request, path, error) as each job finishes
+
+        Returns:
+            Clip paths in request order (None for failed jobs)
+        """
+        jobs = []
+        for request in requests:
+            try:
+                jobs.append(self.submit(
+                    request["prompt"], request["output_path"],
+                    project_id=project_id,
+                    scene_number=request.get("scene_number"),
+                    aspect_ratio=request.get("aspect_ratio", "9:16")
+                ))
+            except Exception as e:
+                logger.error(f"Veo submit failed: {e}")
+                jobs.append(e)
+
+        def wait_one(index: int) -> Optional[str]:
+            job = jobs[index]
+            path, error = None, job if isinstance(job, Exception) else None
+            if error is None:
+                try:
+                    path = self.wait(job)
+                except Exception as e:
+                    error = e
+            if on_done:
+                on_done(requests[index], path, error)
+            return path
+
+        if not jobs:
+            return []
+        with ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="veo-poll") as executor:
+            return list(executor.map(wait_one, range(len(jobs))))
+
+    def pending_jobs(self, project_id: int) -> List[Dict[str, Any]]:
+        """Jobs of a project whose operation may still be waited on."""
+        jobs = self.db.list_veo_jobs(project_id=project_id)
+        return [job for job in jobs if job["status"] in ACTIVE_STATUSES]
+
+    def resume(
+        self,
+        project_id: int,
+        on_done: Optional[Callable[[Dict[str, Any], Optional[str], Optional[Exception]], None]] = None
+    ) -> Dict[Optional[int], Optional[str]]:
+        """
+        Wait for every pending job of a project (e.g. after a page reload).
+
+        Returns:
+            {scene_number: clip path or None}
+        """
+        jobs = self.pending_jobs(project_id)
+        results = {}
+
+        def wait_one(job: Dict[str, Any]):
+            path, error = None, None
+            try:
+                path = self.wait(job)
+            except Exception as e:
+                error = e
+            results[job["scene_number"]] = path
+            if on_done:
+                on_done(job, path, error)
+
+        if jobs:
+            with ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="veo-poll") as executor:
+                list(executor.map(wait_one, jobs))
+        return results
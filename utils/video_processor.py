@@ -9,6 +9,8 @@ from typing import Optional, Tuple
 from PIL import Image
 import logging
 
+from utils.media_probe import probe
+
 logger = logging.getLogger(__name__)
 
 
@@ -71,7 +73,8 @@ def generate_thumbnail(video_path: Path, output_path: Path, timestamp: float = 1
 
 def get_video_info(video_path: Path) -> dict:
     """
-    Get video information.
+    Get video information from the container headers (no decoding, memoized
+    per file version; see utils.media_probe).
     
     Args:
         video_path: Video file path
@@ -80,18 +83,13 @@ def get_video_info(video_path: Path) -> dict:
         Dictionary with video info (duration, width, height, fps)
     """
     try:
-        from moviepy.editor import VideoFileClip
-        
-        video = VideoFileClip(str(video_path))
-        info = {
-            "duration": video.duration,
-            "width": video.w,
-            "height": video.h,
-            "fps": video.fps
+        info = probe(video_path)
+        return {
+            "duration": info.duration,
+            "width": info.width,
+            "height": info.height,
+            "fps": info.fps
         }
-        video.close()
-        
-        return info
     except Exception as e:
         logger.error(f"Error getting video info: {str(e)}")
         raise
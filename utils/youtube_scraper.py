@@ -2,31 +2,165 @@
 YouTube Scraper Utility
 
 Scrapes YouTube channels and videos using scrapetube and youtube-transcript-api.
+
+Transcripts are fetched by a bounded thread pool while the channel listing
+is still being paged, with a timeout on every HTTP request, and come back
+in listing order. The video listing and the transcript fetcher are
+injectable, so scrape_channel can be exercised offline with stand-ins.
+
+refresh_channel() uses the youtube_channels table as a cache: listing
+stops at the first already stored video, only new videos get transcript
+requests, and the Gemini analysis is re-run only when the video set
+changed. Transcripts keep their timed segments and are saved to the
+video_transcripts store (compressed, full-text indexed) rather than into
+the channel's videos_data blob; analyze_channel sees each video's opening
+hook and closing lines instead of a character prefix.
 """
 
 import json
-from typing import Dict, Any, List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Union
 from urllib.parse import urlparse, parse_qs
+import logging
+
+import requests
 import scrapetube
 from youtube_transcript_api import YouTubeTranscriptApi
 from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
-from google import genai
-from google.genai import types
-from config.settings import GEMINI_API_KEY, GEMINI_MODEL
 from config.prompts import YOUTUBE_ANALYSIS_PROMPT
+from utils.gemini_client import DEFAULT_MODEL, get_gemini_client
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_LANGUAGES = ("es", "en")
+TRANSCRIPT_WORKERS = 8
+TRANSCRIPT_TIMEOUT = 15.0  # Seconds per HTTP request
+
+# Transcript excerpt sent to analyze_channel per video
+HOOK_SECONDS = 20.0     # Opening lines (the hook)
+CLOSING_SECONDS = 10.0  # Closing lines (the call to action)
+EXCERPT_CHARS = 500
+
+# Keys holding transcripts in video dicts (kept out of videos_data)
+TRANSCRIPT_KEYS = ("transcript", "transcript_segments")
+
+# video_source(channel_id=..., channel_url=...) -> channel video renderers
+VideoSource = Callable[..., Iterable[Dict[str, Any]]]
+# Timed transcript segment: {"text": str, "start": float, "duration": float}
+Segment = Dict[str, Any]
+# fetcher(video_id, languages, timeout) -> segments (or plain text) or None
+TranscriptFetcher = Callable[[str, Sequence[str], float], Union[List[Segment], str, None]]
+
+
+class _TimeoutSession(requests.Session):
+    """requests.Session that applies a default timeout to every request."""
+
+    timeout = TRANSCRIPT_TIMEOUT
+
+    def request(self, *args, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(*args, **kwargs)
+
+
+_local = threading.local()
+
+
+def fetch_transcript(
+    video_id: str,
+    languages: Sequence[str] = TRANSCRIPT_LANGUAGES,
+    timeout: float = TRANSCRIPT_TIMEOUT
+) -> Optional[List[Segment]]:
+    """
+    Fetch a video's transcript with youtube-transcript-api. Each worker
+    thread keeps its own HTTP session (connection reuse across videos).
+
+    Returns:
+        Timed segments, or None if the video has no transcript
+    """
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = _TimeoutSession()
+    session.timeout = timeout
+
+    try:
+        fetched = YouTubeTranscriptApi(http_client=session).fetch(video_id, languages=languages)
+    except (TranscriptsDisabled, NoTranscriptFound):
+        return None
+    return fetched.to_raw_data()
+
+
+def transcript_text(segments: Optional[List[Segment]]) -> str:
+    """Plain text of a transcript."""
+    return " ".join(seg["text"].strip() for seg in segments or () if seg.get("text"))
+
+
+def transcript_excerpt(segments: Optional[List[Segment]], max_chars: int = EXCERPT_CHARS) -> Dict[str, str]:
+    """
+    The parts of a short that carry its structure: the hook (segments
+    starting in the first HOOK_SECONDS) and the closing lines (the last
+    CLOSING_SECONDS), trimmed at a word boundary to share max_chars.
+    Untimed transcripts (a single segment) only yield a hook.
+    """
+    if not segments:
+        return {"hook": "", "closing": ""}
+    end = max(float(seg.get("start") or 0.0) + float(seg.get("duration") or 0.0) for seg in segments)
+    hook = [seg for seg in segments if float(seg.get("start") or 0.0) < HOOK_SECONDS]
+    closing = [
+        seg for seg in segments[len(hook):]
+        if float(seg.get("start") or 0.0) >= end - CLOSING_SECONDS
+    ]
+    hook_budget = max_chars if not closing else max_chars * 2 // 3
+    return {
+        "hook": _trim_words(transcript_text(hook), hook_budget),
+        "closing": _trim_words(transcript_text(closing), max_chars - hook_budget),
+    }
+
+
+def _trim_words(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + "…"
+
+
+def _video_segments(video: Mapping[str, Any]) -> Optional[List[Segment]]:
+    """Segments of a video dict (older stored videos only have "transcript" text)."""
+    if video.get("transcript_segments"):
+        return video["transcript_segments"]
+    if video.get("transcript"):
+        return [{"text": video["transcript"], "start": 0.0, "duration": 0.0}]
+    return None
 
 
 class YouTubeScraper:
     """Scraper for YouTube channels and videos."""
     
-    def __init__(self):
-        """Initialize YouTube scraper."""
-        if GEMINI_API_KEY:
-            self.client = genai.Client(api_key=GEMINI_API_KEY)
-            self.model_name = GEMINI_MODEL or "gemini-2.0-flash"
-        else:
-            self.client = None
-            self.model_name = None
+    def __init__(
+        self,
+        video_source: Optional[VideoSource] = None,
+        transcript_fetcher: Optional[TranscriptFetcher] = None,
+        max_workers: int = TRANSCRIPT_WORKERS,
+        transcript_timeout: float = TRANSCRIPT_TIMEOUT,
+        languages: Sequence[str] = TRANSCRIPT_LANGUAGES
+    ):
+        """
+        Initialize YouTube scraper.
+        
+        Args:
+            video_source: Channel listing (default: scrapetube.get_channel)
+            transcript_fetcher: Transcript transport (default: fetch_transcript)
+            max_workers: Concurrent transcript requests
+            transcript_timeout: Timeout in seconds for each HTTP request
+            languages: Preferred transcript languages, in order
+        """
+        self.video_source = video_source or scrapetube.get_channel
+        self.transcript_fetcher = transcript_fetcher or fetch_transcript
+        self.max_workers = max(1, max_workers)
+        self.transcript_timeout = transcript_timeout
+        self.languages = tuple(languages)
+        
+        self.client = get_gemini_client()
+        self.model_name = DEFAULT_MODEL if self.client else None
     
     def extract_channel_id(self, channel_url: str) -> Optional[str]:
         """Extract channel ID from URL."""
@@ -46,79 +180,274 @@ class YouTubeScraper:
         except Exception:
             return None
     
-    def scrape_channel(self, channel_url: str, max_videos: int = 10) -> Dict[str, Any]:
+    def scrape_channel(
+        self,
+        channel_url: str,
+        max_videos: int = 10,
+        known_videos: Optional[Mapping[str, Dict[str, Any]]] = None,
+        stop_at_known: bool = False
+    ) -> Dict[str, Any]:
         """
         Scrape channel videos.
         
         Args:
             channel_url: YouTube channel URL
             max_videos: Maximum number of videos to scrape
+            known_videos: Previously scraped videos by video_id; they are
+                reused as-is (no transcript request)
+            stop_at_known: Stop listing at the first known video (the
+                listing is newest first, so everything after it is known)
         
         Returns:
-            Dictionary with channel data and videos
+            Dictionary with channel data and videos (plus new_video_ids)
         """
         try:
             channel_id = self.extract_channel_id(channel_url)
             
             # Get videos
-            videos = []
-            video_count = 0
-            
             if channel_id:
-                video_generator = scrapetube.get_channel(channel_id)
+                video_generator = self.video_source(channel_id=channel_id)
             else:
-                # For custom URLs, try to use the URL directly
-                video_generator = scrapetube.get_channel(channel_url)
-            
-            for video in video_generator:
-                if video_count >= max_videos:
-                    break
-                
-                video_id = video.get("videoId")
-                if not video_id:
-                    continue
-                
-                video_data = {
-                    "video_id": video_id,
-                    "title": video.get("title", {}).get("runs", [{}])[0].get("text", ""),
-                    "url": f"https://www.youtube.com/watch?v={video_id}",
-                    "view_count": video.get("viewCountText", {}).get("simpleText", ""),
-                    "published_time": video.get("publishedTimeText", {}).get("simpleText", ""),
-                    "length": video.get("lengthText", {}).get("simpleText", ""),
-                }
-                
-                # Try to get transcript
-                try:
-                    transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=['es', 'en'])
-                    video_data["transcript"] = " ".join([item["text"] for item in transcript])
-                except (TranscriptsDisabled, NoTranscriptFound):
-                    video_data["transcript"] = None
-                
-                videos.append(video_data)
-                video_count += 1
+                # For custom URLs, let scrapetube resolve the URL
+                video_generator = self.video_source(channel_url=channel_url)
             
-            # Extract channel name
+            known_videos = known_videos or {}
+            videos = []
+            transcripts = []
+            new_video_ids = []
             channel_name = None
-            if videos:
-                # Try to get channel name from first video
-                try:
-                    first_video_gen = scrapetube.get_channel(channel_id if channel_id else channel_url)
-                    first_video = next(first_video_gen)
-                    channel_name = first_video.get("channelName", "")
-                except:
-                    pass
+            
+            # Transcripts are requested while the listing is still paging
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="transcripts") as executor:
+                for video in video_generator:
+                    if len(videos) >= max_videos:
+                        break
+                    
+                    video_id = video.get("videoId")
+                    if not video_id:
+                        continue
+                    
+                    # Channel name comes with the first listed video
+                    if channel_name is None:
+                        channel_name = video.get("channelName", "")
+                    
+                    if video_id in known_videos:
+                        if stop_at_known:
+                            break
+                        videos.append(dict(known_videos[video_id]))
+                        transcripts.append(None)
+                        continue
+                    
+                    new_video_ids.append(video_id)
+                    videos.append({
+                        "video_id": video_id,
+                        "title": video.get("title", {}).get("runs", [{}])[0].get("text", ""),
+                        "url": f"https://www.youtube.com/watch?v={video_id}",
+                        "view_count": video.get("viewCountText", {}).get("simpleText", ""),
+                        "published_time": video.get("publishedTimeText", {}).get("simpleText", ""),
+                        "length": video.get("lengthText", {}).get("simpleText", ""),
+                    })
+                    transcripts.append(executor.submit(self._transcript, video_id))
+                
+                for video_data, transcript in zip(videos, transcripts):
+                    if transcript is not None:
+                        segments = transcript.result()
+                        video_data["transcript_segments"] = segments
+                        video_data["transcript"] = transcript_text(segments) if segments else None
             
             return {
                 "channel_url": channel_url,
                 "channel_id": channel_id,
                 "channel_name": channel_name,
                 "videos": videos,
-                "video_count": len(videos)
+                "video_count": len(videos),
+                "new_video_ids": new_video_ids
             }
         
         except Exception as e:
             raise Exception(f"Error scraping channel: {str(e)}") from e
     
+    def refresh_channel(
+        self,
+        channel_url: str,
+        max_videos: int = 10,
+        db=None,
+        force: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Scrape and analyze a channel incrementally against the stored result.
+        
+        The scrape is sync_channel(); analyze_channel runs only when the
+        video set changed or no analysis is stored.
+        
+        Args:
+            channel_url: YouTube channel URL
+            max_videos: Videos kept per channel
+            db: Database instance (default: shared get_db())
+            force: Ignore the stored result (full scrape and analysis)
+        
+        Returns:
+            Channel data with "analysis", "new_video_ids" and
+            "analysis_reused"
+        """
+        if db is None:
+            from utils.database import get_db
+            db = get_db()
+        channel_data = self.sync_channel(channel_url, max_videos, db=db, force=force)
+        
+        analysis = channel_data.pop("stored_analysis")
+        legacy_migrated = channel_data.pop("legacy_migrated")
+        analysis_reused = isinstance(analysis, dict) and bool(analysis) and not channel_data["video_set_changed"]
+        
+        # Re-analyze and store only when the video set changed (or no analysis is stored)
+        if not analysis_reused:
+            analysis = self.analyze_channel(channel_data)
+            self.save_channel(db, channel_data, analysis)
+        elif legacy_migrated:
+            # Drop the migrated transcripts from the stored blob
+            self.save_channel(db, channel_data, analysis)
+        
+        channel_data["analysis"] = analysis
+        channel_data["analysis_reused"] = analysis_reused
+        return channel_data
+    
+    def sync_channel(
+        self,
+        channel_url: str,
+        max_videos: int = 10,
+        db=None,
+        force: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Scrape a channel incrementally against the stored result, without
+        analyzing it or writing the youtube_channels row.
+        
+        Listing stops at the first stored video when the stored window
+        already holds max_videos videos; otherwise the channel is listed in
+        full but stored videos still reuse their transcripts. New videos are
+        merged in front of the stored ones (newest first, max_videos kept)
+        and their transcripts saved to the transcript store.
+        
+        Args:
+            channel_url: YouTube channel URL
+            max_videos: Videos kept per channel
+            db: Database instance (default: shared get_db())
+            force: Ignore the stored result (full scrape)
+        
+        Returns:
+            Channel data (videos with transcripts) plus "new_video_ids",
+            "video_set_changed", "stored_analysis" (None if not stored) and
+            "legacy_migrated" (stored row still holds transcripts; rewrite
+            it with save_channel)
+        """
+        if db is None:
+            from utils.database import get_db
+            db = get_db()
+        stored = None if force else db.get_youtube_channel(channel_url)
+        stored_videos = stored.get("videos_data") if stored else None
+        if not isinstance(stored_videos, list):
+            stored_videos = []
+        known = {video["video_id"]: video for video in stored_videos if video.get("video_id")}
+        
+        # Videos stored before the transcript store kept their text in the blob
+        legacy = [video for video in known.values() if video.get("transcript")]
+        for video in legacy:
+            db.save_video_transcript(
+                video["video_id"], _video_segments(video),
+                channel_url=channel_url, title=video.get("title"), commit=False
+            )
+        if legacy:
+            db.conn.commit()
+        
+        channel_data = self.scrape_channel(
+            channel_url, max_videos, known_videos=known,
+            stop_at_known=len(known) >= max_videos
+        )
+        
+        new_ids = set(channel_data["new_video_ids"])
+        saved = False
+        for video in channel_data["videos"]:
+            if video["video_id"] in new_ids and video.get("transcript_segments"):
+                db.save_video_transcript(
+                    video["video_id"], video["transcript_segments"],
+                    channel_url=channel_url, title=video.get("title"), commit=False
+                )
+                saved = True
+        if saved:
+            db.conn.commit()
+        
+        listed_ids = {video["video_id"] for video in channel_data["videos"]}
+        merged = channel_data["videos"] + [v for v in stored_videos if v.get("video_id") not in listed_ids]
+        merged = merged[:max_videos]
+        
+        # videos_data keeps metadata only; transcripts come from the store
+        stored_transcripts = db.get_video_transcripts(
+            [v["video_id"] for v in merged if v["video_id"] not in new_ids]
+        )
+        for video in merged:
+            if video["video_id"] in stored_transcripts:
+                segments = stored_transcripts[video["video_id"]]["segments"]
+                video["transcript_segments"] = segments
+                video["transcript"] = transcript_text(segments)
+            video["has_transcript"] = bool(video.get("transcript_segments"))
+        channel_data["videos"] = merged
+        channel_data["video_count"] = len(merged)
+        if not channel_data.get("channel_name") and stored:
+            channel_data["channel_name"] = stored.get("channel_name")
+        
+        channel_data["video_set_changed"] = (
+            [v["video_id"] for v in merged] != [v.get("video_id") for v in stored_videos[:max_videos]]
+        )
+        channel_data["stored_analysis"] = stored.get("analysis_data") if stored else None
+        channel_data["legacy_migrated"] = bool(legacy)
+        return channel_data
+    
+    @staticmethod
+    def save_channel(db, channel_data: Dict[str, Any], analysis: Optional[Dict[str, Any]]):
+        """
+        Write the youtube_channels row: videos without their transcripts
+        (those live in the transcript store) and the analysis (None clears
+        a stale one).
+        """
+        insights = None
+        if isinstance(analysis, dict) and isinstance(analysis.get("insights"), str):
+            insights = analysis["insights"]
+        db.save_youtube_channel(
+            channel_data["channel_url"],
+            channel_name=channel_data.get("channel_name"),
+            analysis_data=analysis,
+            videos_data=[
+                {key: value for key, value in video.items() if key not in TRANSCRIPT_KEYS}
+                for video in channel_data["videos"]
+            ],
+            insights=insights
+        )
+    
+    def fetch_transcripts(self, video_ids: Sequence[str]) -> List[Optional[List[Segment]]]:
+        """
+        Fetch transcripts concurrently (at most max_workers at a time).
+        
+        Returns:
+            Timed segments (or None) for each video id, in input order
+        """
+        if not video_ids:
+            return []
+        workers = min(self.max_workers, len(video_ids))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transcripts") as executor:
+            return list(executor.map(self._transcript, video_ids))
+    
+    def _transcript(self, video_id: str) -> Optional[List[Segment]]:
+        """One transcript; failures (timeouts, blocked requests) count as missing."""
+        try:
+            transcript = self.transcript_fetcher(video_id, self.languages, self.transcript_timeout)
+        except Exception as e:
+            logger.warning(f"Transcript for {video_id} failed: {e}")
+            return None
+        if isinstance(transcript, str):
+            # Plain-text fetchers: one untimed segment
+            return [{"text": transcript, "start": 0.0, "duration": 0.0}] if transcript else None
+        return transcript or None
+    
     def analyze_channel(self, channel_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Analyze channel data with Gemini AI.
@@ -142,10 +471,12 @@ class YouTubeScraper:
             # Prepare videos data
             videos_data = []
             for video in channel_data.get("videos", [])[:10]:
+                excerpt = transcript_excerpt(_video_segments(video))
                 videos_data.append({
                     "title": video.get("title", ""),
                     "view_count": video.get("view_count", ""),
-                    "transcript": video.get("transcript", "")[:500] if video.get("transcript") else ""
+                    "hook": excerpt["hook"],
+                    "closing": excerpt["closing"]
                 })
             
             videos_json = json.dumps(videos_data, indent=2)